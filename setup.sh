@@ -38,6 +38,7 @@ KAFKA_BOOTSTRAP_SERVERS=localhost:9092
 KAFKA_TOPIC_TAXI_DATA=taxi_data
 KAFKA_TOPIC_AGGREGATED=taxi_aggregated
 KAFKA_TOPIC_ANOMALIES=taxi_anomalies
+KAFKA_TOPIC_FORECASTS=taxi_forecasts
 
 # NYC Taxi API Configuration
 NYC_API_BASE_URL=https://data.cityofnewyork.us/resource
@@ -48,6 +49,13 @@ NYC_API_LIMIT=1000
 SPARK_MASTER=local[*]
 SPARK_APP_NAME=TaxiDemandForecasting
 
+# Stream Processor Configuration (spark or numpy)
+PROCESSOR_ENGINE=spark
+PROCESSOR_BATCH_INTERVAL=1.0
+PROCESSOR_MAX_RECORDS=50000
+PROCESSOR_KAFKA_PARTITIONS=1
+PROCESSOR_METRICS_PORT=9108
+
 # Dashboard Configuration
 DASHBOARD_HOST=0.0.0.0
 DASHBOARD_PORT=8050
@@ -17,6 +17,8 @@ class TaxiDataProducer:
         self.topic_taxi_data = self.kafka_config['topic_taxi_data']
         self.topic_aggregated = self.kafka_config['topic_aggregated']
         self.topic_anomalies = self.kafka_config['topic_anomalies']
+        self.topic_grid = self.kafka_config['topic_grid']
+        self.topic_forecasts = self.kafka_config['topic_forecasts']
         
         # Initialize Kafka producer
         self.producer = None
@@ -179,6 +181,36 @@ class TaxiDataProducer:
             logger.error(f"Error sending heatmap data to Kafka: {e}")
             return False
     
+    def send_records(self, topic: str, records: List[Dict[str, Any]], key_prefix: str) -> bool:
+        """
+        Send a batch of records to a topic with a single flush.
+        
+        Args:
+            topic: Destination Kafka topic
+            records: Records to send
+            key_prefix: Prefix for the message keys
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.producer:
+            logger.error("Kafka producer not initialized")
+            return False
+        
+        try:
+            key = f"{key_prefix}_{int(time.time())}"
+            for record in records:
+                self.producer.send(topic=topic, key=key, value=record)
+            
+            # One flush per batch instead of waiting on every future
+            self.producer.flush(timeout=10)
+            logger.debug(f"Sent {len(records)} records to {topic}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error sending records to {topic}: {e}")
+            return False
+    
     def close(self):
         """Close the Kafka producer."""
         if self.producer:
@@ -1,9 +1,11 @@
 import random
 import time
 import logging
+import numpy as np
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from src.utils.config import config
+from src.utils.geo_grid import grid_from_config
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,16 @@ class MockTaxiDataGenerator:
         self.vendor_ids = ['CMT', 'VTS', 'DDS']
         self.payment_types = ['1', '2', '3', '4', '5', '6']
         
+        # Fixed centroid per zone so pickup coordinates agree with zone IDs
+        zone_random = random.Random(42)
+        self.zone_centroids = {
+            location_id: (zone_random.uniform(40.6, 40.9), zone_random.uniform(-74.1, -73.7))
+            for location_id in self.location_ids
+        }
+        
+        self.grid_config = config.get_grid_config()
+        self.grid = grid_from_config(self.grid_config)
+        
     def generate_taxi_data(self, count: int = 100) -> List[Dict[str, Any]]:
         """
         Generate mock taxi trip data.
@@ -39,11 +51,11 @@ class MockTaxiDataGenerator:
             trip_duration = random.randint(5, 60)
             dropoff_time = pickup_time + timedelta(minutes=trip_duration)
             
-            # Generate random coordinates in NYC area
-            pickup_lat = random.uniform(40.6, 40.9)
-            pickup_lon = random.uniform(-74.1, -73.7)
-            dropoff_lat = random.uniform(40.6, 40.9)
-            dropoff_lon = random.uniform(-74.1, -73.7)
+            # Generate coordinates scattered around the zone centroids
+            pickup_location_id = random.choice(self.location_ids)
+            dropoff_location_id = random.choice(self.location_ids)
+            pickup_lat, pickup_lon = self._point_in_zone(pickup_location_id)
+            dropoff_lat, dropoff_lon = self._point_in_zone(dropoff_location_id)
             
             # Calculate distance
             distance = self._calculate_distance(
@@ -60,8 +72,8 @@ class MockTaxiDataGenerator:
                 'trip_id': f"mock_trip_{int(time.time() * 1000) + i}",
                 'pickup_datetime': pickup_time.isoformat(),
                 'dropoff_datetime': dropoff_time.isoformat(),
-                'pickup_location_id': random.choice(self.location_ids),
-                'dropoff_location_id': random.choice(self.location_ids),
+                'pickup_location_id': pickup_location_id,
+                'dropoff_location_id': dropoff_location_id,
                 'passenger_count': random.randint(1, 6),
                 'trip_distance': round(distance, 2),
                 'fare_amount': round(distance_fare, 2),
@@ -90,6 +102,11 @@ class MockTaxiDataGenerator:
         logger.info(f"Generated {len(data)} mock taxi records")
         return data
     
+    def _point_in_zone(self, location_id: int):
+        """Random point near a zone's centroid."""
+        lat, lon = self.zone_centroids[location_id]
+        return lat + random.gauss(0, 0.004), lon + random.gauss(0, 0.005)
+    
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate approximate distance between two points."""
         # Simple distance calculation (not exact but good for mock data)
@@ -113,9 +130,8 @@ class MockTaxiDataGenerator:
             trip_count = random.randint(1, 25)
             avg_fare = random.uniform(10, 50)
             
-            # Generate coordinates for this location
-            lat = random.uniform(40.6, 40.9)
-            lon = random.uniform(-74.1, -73.7)
+            # Use the zone's centroid
+            lat, lon = self.zone_centroids[location_id]
             
             heatmap_data.append({
                 'location_id': location_id,
@@ -156,4 +172,23 @@ class MockTaxiDataGenerator:
             'passenger_count': int(trip_count * avg_passengers),
             'avg_passengers': avg_passengers,
             'timestamp': datetime.now().isoformat()
-        } 
\ No newline at end of file
+        } 
+    
+    def get_grid_heatmap_data(self, hours: int = 1, count: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Generate mock per-cell pickup counts on the hierarchical grid.
+        
+        Args:
+            hours: Time window in hours
+            count: Number of mock trips to bin
+        
+        Returns:
+            One message per configured resolution with non-empty cells only
+        """
+        trips = self.generate_taxi_data(count=count)
+        latitudes = np.array([t['pickup_latitude'] for t in trips])
+        longitudes = np.array([t['pickup_longitude'] for t in trips])
+        fares = np.array([t['fare_amount'] for t in trips])
+        
+        binned = self.grid.bin_points(latitudes, longitudes, self.grid_config['resolutions'], weights=fares)
+        return self.grid.to_records(binned)
@@ -1,11 +1,13 @@
 import requests
 import pandas as pd
+import numpy as np
 import json
-import time
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from src.utils.config import config
+from src.utils.geo_grid import grid_from_config
+from src.processors.deduplicator import trip_key
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,9 @@ class NYCTaxiCollector:
         self.dataset_id = self.api_config['dataset_id']
         self.limit = self.api_config['limit']
         
+        self.grid_config = config.get_grid_config()
+        self.grid = grid_from_config(self.grid_config)
+        
     def fetch_taxi_data(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Fetch taxi data from NYC Open Data API.
@@ -68,7 +73,7 @@ class NYCTaxiCollector:
             try:
                 # Extract and validate key fields
                 processed_record = {
-                    'trip_id': record.get('trip_id', f"trip_{int(time.time() * 1000)}"),
+                    'trip_id': record.get('trip_id'),
                     'pickup_datetime': record.get('pickup_datetime'),
                     'dropoff_datetime': record.get('dropoff_datetime'),
                     'pickup_location_id': record.get('pulocationid'),
@@ -90,6 +95,11 @@ class NYCTaxiCollector:
                     'data_source': 'nyc_open_data'
                 }
                 
+                # The API has no trip_id; key the trip on its content so
+                # deduplication drops re-fetched trips and only those
+                if not processed_record['trip_id']:
+                    processed_record['trip_id'] = trip_key(processed_record)
+                
                 # Add time-based features
                 if processed_record['pickup_datetime']:
                     pickup_dt = datetime.fromisoformat(processed_record['pickup_datetime'].replace('Z', '+00:00'))
@@ -236,4 +246,25 @@ class NYCTaxiCollector:
                     'demand_level': 'high' if data['trip_count'] > 10 else 'medium' if data['trip_count'] > 5 else 'low'
                 })
         
-        return heatmap_data 
\ No newline at end of file
+        return heatmap_data 
+    
+    def get_grid_heatmap_data(self, hours: int = 1) -> List[Dict[str, Any]]:
+        """
+        Get per-cell pickup counts on the hierarchical grid.
+        
+        Args:
+            hours: Time window in hours
+        
+        Returns:
+            One message per configured resolution with non-empty cells only
+        """
+        trips = self.get_recent_trips(hours)
+        if not trips:
+            return []
+        
+        latitudes = np.fromiter((t.get('pickup_latitude') or 0 for t in trips), dtype=np.float64, count=len(trips))
+        longitudes = np.fromiter((t.get('pickup_longitude') or 0 for t in trips), dtype=np.float64, count=len(trips))
+        fares = np.fromiter((t.get('fare_amount') or 0 for t in trips), dtype=np.float64, count=len(trips))
+        
+        binned = self.grid.bin_points(latitudes, longitudes, self.grid_config['resolutions'], weights=fares)
+        return self.grid.to_records(binned)
@@ -0,0 +1,478 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, NamedTuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Dashboard columns kept per aggregate record and per anomaly
+DEMAND_FIELDS = {
+    'timestamp': np.float64,
+    'pickup_location_id': np.int64,
+    'trip_count': np.int64,
+    'total_fare': np.float64,
+    'avg_fare': np.float64
+}
+# Panels with their own data version, in push-signal order
+PANELS = ['demand', 'anomalies', 'heatmap', 'forecast', 'stats']
+
+# Anomalies carried in each snapshot for the alert cards
+RECENT_ANOMALIES = 10
+
+ANOMALY_FIELDS = {
+    'timestamp': np.float64,
+    'location_id': np.int64,
+    'type': object,
+    'value': np.float64,
+    'threshold': np.float64
+}
+
+
+def to_epoch(value: Any) -> float:
+    """Epoch seconds of a numeric or ISO timestamp; the current time if missing or unparseable."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+class ColumnarRingBuffer:
+    """Fixed-capacity ring buffer with one typed NumPy column per field."""
+    
+    def __init__(self, fields: Dict[str, Any], capacity: int):
+        self.fields = fields
+        self.capacity = capacity
+        
+        # Every value is written twice, at i and i + capacity, so the most
+        # recent n values are always one contiguous slice
+        self.columns = {
+            name: np.zeros(2 * capacity, dtype=dtype) if dtype is not object
+            else np.full(2 * capacity, None, dtype=object)
+            for name, dtype in fields.items()
+        }
+        self.head = 0
+        self.size = 0
+        self.total = 0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def _coerce(self, name: str, value: Any) -> Any:
+        if name == 'timestamp':
+            return to_epoch(value)
+        if self.fields[name] is object:
+            return value
+        return value if value is not None else 0
+    
+    def append(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Write one record, evicting the oldest when full.
+        
+        Args:
+            record: Field values; missing fields are stored as zero
+        
+        Returns:
+            The evicted row, or None if the buffer wasn't full
+        """
+        evicted = self.row(0) if self.size == self.capacity else None
+        
+        head = self.head
+        for name, column in self.columns.items():
+            value = self._coerce(name, record.get(name))
+            try:
+                column[head] = column[head + self.capacity] = value
+            except (TypeError, ValueError):
+                column[head] = column[head + self.capacity] = 0
+        
+        self.head = (head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.total += 1
+        return evicted
+    
+    def to_columns(self, records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Typed columns for a batch of records, coerced the same way append does.
+        
+        Args:
+            records: Decoded messages; missing fields are stored as zero
+        
+        Returns:
+            One array per field, in record order
+        """
+        n = len(records)
+        columns = {}
+        for name, dtype in self.fields.items():
+            values = [record.get(name) for record in records]
+            if name == 'timestamp':
+                columns[name] = np.fromiter((to_epoch(value) for value in values), dtype=np.float64, count=n)
+            elif dtype is object:
+                column = np.empty(n, dtype=object)
+                column[:] = values
+                columns[name] = column
+            else:
+                try:
+                    columns[name] = np.array([value if value is not None else 0 for value in values], dtype=dtype)
+                except (TypeError, ValueError):
+                    # Fall back per value so one malformed field doesn't lose the batch
+                    columns[name] = np.array([self._scalar(dtype, value) for value in values], dtype=dtype)
+        return columns
+    
+    @staticmethod
+    def _scalar(dtype: Any, value: Any) -> Any:
+        try:
+            return np.array(value if value is not None else 0, dtype=dtype).item()
+        except (TypeError, ValueError):
+            return 0
+    
+    def extend(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Write a batch of rows with one slice assignment per column.
+        
+        Args:
+            columns: Typed columns of equal length, e.g. from to_columns
+        
+        Returns:
+            Copies of the rows the batch evicted, oldest first (empty
+            columns if the buffer had room)
+        """
+        n = len(columns['timestamp'])
+        
+        # Only the newest capacity rows of an oversized batch are kept
+        kept = min(n, self.capacity)
+        evicted_count = max(0, self.size + kept - self.capacity)
+        evicted = {name: view[:evicted_count].copy() for name, view in self.last().items()}
+        
+        positions = (self.head + np.arange(kept)) % self.capacity
+        for name, column in self.columns.items():
+            values = columns[name][n - kept:]
+            column[positions] = values
+            column[positions + self.capacity] = values
+        
+        self.head = (self.head + kept) % self.capacity
+        self.size = min(self.size + kept, self.capacity)
+        self.total += n
+        return evicted
+    
+    def last(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Zero-copy views of the most recent n rows, oldest first.
+        
+        The views alias the buffer, so they change as new rows arrive;
+        copy them if they must outlive the next append.
+        """
+        n = self.size if n is None else min(n, self.size)
+        end = self.head + self.capacity
+        return {name: column[end - n:end] for name, column in self.columns.items()}
+    
+    def row(self, index: int) -> Dict[str, Any]:
+        """One row by position, 0 being the oldest retained."""
+        position = self.head + self.capacity - self.size + index
+        return {
+            name: column[position] if self.fields[name] is object else column[position].item()
+            for name, column in self.columns.items()
+        }
+    
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """The most recently written row, as stored."""
+        return self.row(self.size - 1) if self.size else None
+    
+    def rows(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The most recent n rows as dicts, oldest first."""
+        n = self.size if n is None else min(n, self.size)
+        return [self.row(index) for index in range(self.size - n, self.size)]
+
+
+class DemandStats:
+    """Running totals over the rows currently held in a demand buffer."""
+    
+    def __init__(self):
+        self.total_trips = 0
+        self.location_counts: Dict[int, int] = {}
+        self.fare_sum = 0.0
+        self.fare_count = 0
+    
+    def update(self, added: Dict[str, Any], evicted: Optional[Dict[str, Any]] = None):
+        """
+        Fold in a newly buffered row and back out the row it evicted.
+        
+        Args:
+            added: Row as stored in the buffer
+            evicted: Row the append pushed out, if any
+        """
+        self._apply(added, 1)
+        if evicted is not None:
+            self._apply(evicted, -1)
+    
+    def update_columns(self, added: Dict[str, np.ndarray], evicted: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Batch form of update: fold in buffered rows and back out evicted ones.
+        
+        Args:
+            added: Columns of the rows the batch left in the buffer
+            evicted: Columns of the rows it pushed out, if any
+        """
+        self._apply_columns(added, 1)
+        if evicted is not None:
+            self._apply_columns(evicted, -1)
+    
+    def _apply_columns(self, columns: Dict[str, np.ndarray], sign: int):
+        if not len(columns['trip_count']):
+            return
+        self.total_trips += sign * int(columns['trip_count'].sum())
+        self.fare_sum += sign * float(columns['avg_fare'].sum())
+        self.fare_count += sign * len(columns['avg_fare'])
+        
+        location_ids, counts = np.unique(columns['pickup_location_id'], return_counts=True)
+        for location_id, count in zip(location_ids.tolist(), counts.tolist()):
+            count = self.location_counts.get(location_id, 0) + sign * count
+            if count:
+                self.location_counts[location_id] = count
+            else:
+                del self.location_counts[location_id]
+    
+    def _apply(self, row: Dict[str, Any], sign: int):
+        self.total_trips += sign * row['trip_count']
+        self.fare_sum += sign * row['avg_fare']
+        self.fare_count += sign
+        
+        location_id = row['pickup_location_id']
+        count = self.location_counts.get(location_id, 0) + sign
+        if count:
+            self.location_counts[location_id] = count
+        else:
+            del self.location_counts[location_id]
+    
+    @property
+    def active_locations(self) -> int:
+        return len(self.location_counts)
+    
+    @property
+    def avg_fare(self) -> float:
+        return self.fare_sum / self.fare_count if self.fare_count else 0.0
+
+
+class ZoneGeometry(NamedTuple):
+    """Zones the heatmap can place, with their centroids; replaced whole when a zone is added."""
+    version: int
+    location_ids: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+
+
+class ZoneHeatmap:
+    """Demand binned per taxi zone over fixed zone centroids."""
+    
+    def __init__(self, num_zones: int, zone_lookup=None):
+        self.num_zones = num_zones
+        self.latitudes = np.full(num_zones, np.nan)
+        self.longitudes = np.full(num_zones, np.nan)
+        self.values = np.zeros(num_zones)
+        
+        # Centroids from the zone dimension table when it has them; the
+        # rest are learned from the coordinates heatmap points carry
+        if zone_lookup is not None and 'zone_latitude' in zone_lookup.columns:
+            self.latitudes = np.array(zone_lookup.columns['zone_latitude'], dtype=np.float64)
+            self.longitudes = np.array(zone_lookup.columns['zone_longitude'], dtype=np.float64)
+        self.geometry = self._geometry(0)
+    
+    def _geometry(self, version: int) -> ZoneGeometry:
+        known = np.flatnonzero(~np.isnan(self.latitudes) & ~np.isnan(self.longitudes))
+        geometry = ZoneGeometry(version, known, self.latitudes[known], self.longitudes[known])
+        for array in geometry[1:]:
+            array.flags.writeable = False
+        return geometry
+    
+    def update(self, points: List[Dict[str, Any]]):
+        """
+        Replace the per-zone values with one heatmap message's trip counts.
+        
+        Args:
+            points: Heatmap points with location_id, trip_count and
+                optionally latitude/longitude
+        """
+        n = len(points)
+        location_ids = np.fromiter((p.get('location_id') or -1 for p in points), dtype=np.int64, count=n)
+        trip_counts = np.fromiter((p.get('trip_count') or 0 for p in points), dtype=np.float64, count=n)
+        latitudes = np.fromiter((p.get('latitude') or np.nan for p in points), dtype=np.float64, count=n)
+        longitudes = np.fromiter((p.get('longitude') or np.nan for p in points), dtype=np.float64, count=n)
+        
+        valid = (location_ids >= 0) & (location_ids < self.num_zones)
+        location_ids, trip_counts = location_ids[valid], trip_counts[valid]
+        latitudes, longitudes = latitudes[valid], longitudes[valid]
+        
+        values = np.zeros(self.num_zones)
+        np.add.at(values, location_ids, trip_counts)
+        self.values = values
+        
+        # Only a zone seen for the first time changes the geometry
+        new = np.isnan(self.latitudes[location_ids]) & ~np.isnan(latitudes) & ~np.isnan(longitudes)
+        if new.any():
+            self.latitudes = self.latitudes.copy()
+            self.longitudes = self.longitudes.copy()
+            self.latitudes[location_ids[new]] = latitudes[new]
+            self.longitudes[location_ids[new]] = longitudes[new]
+            self.geometry = self._geometry(self.geometry.version + 1)
+            logger.info(f"Heatmap geometry version {self.geometry.version}: {len(self.geometry.location_ids)} zones")
+
+
+class StaleSnapshot(Exception):
+    """A snapshot's shared-memory views were overwritten while it was being read."""
+
+
+class DashboardSnapshot:
+    """
+    Read-only dashboard data as of one publish.
+    
+    Snapshots from DashboardStore own their arrays. Snapshots from a shared
+    store view memory the writer recycles a few publishes later, so code
+    reading their demand columns calls check() once it has finished and
+    retries on a newer snapshot if that raises StaleSnapshot.
+    """
+    
+    def __init__(self, demand: Dict[str, np.ndarray], demand_total: int, recent_anomalies: List[Dict[str, Any]],
+                 anomaly_total: int, heatmap_geometry: ZoneGeometry, heatmap_values: np.ndarray,
+                 total_trips: int, active_locations: int, avg_fare: float, versions: Dict[str, int],
+                 published_at: Optional[float] = None, consistent: Optional[Callable[[], bool]] = None):
+        self.demand = demand
+        self.demand_total = demand_total
+        self.recent_anomalies = tuple(recent_anomalies)
+        self.anomaly_total = anomaly_total
+        self.heatmap_geometry = heatmap_geometry
+        self.heatmap_values = heatmap_values
+        self.total_trips = total_trips
+        self.active_locations = active_locations
+        self.avg_fare = avg_fare
+        self.versions = dict(versions)
+        self.published_at = time.time() if published_at is None else published_at
+        self._consistent = consistent
+    
+    @property
+    def demand_rows(self) -> int:
+        return len(self.demand['timestamp'])
+    
+    def check(self):
+        """Raise StaleSnapshot if the demand columns changed since this snapshot was taken."""
+        if self._consistent is not None and not self._consistent():
+            raise StaleSnapshot(f"Snapshot published at {self.published_at} was overwritten")
+    
+    def scalars(self) -> Dict[str, Any]:
+        """The JSON-ready fields, i.e. everything except the arrays."""
+        return {
+            'demand_rows': self.demand_rows,
+            'demand_total': self.demand_total,
+            'recent_anomalies': list(self.recent_anomalies),
+            'anomaly_total': self.anomaly_total,
+            'geometry_version': self.heatmap_geometry.version,
+            'total_trips': self.total_trips,
+            'active_locations': self.active_locations,
+            'avg_fare': self.avg_fare,
+            'versions': self.versions,
+            'published_at': self.published_at
+        }
+
+
+class DashboardStore:
+    """
+    Ingest-side buffers that publish immutable snapshots for the callbacks.
+    
+    The collector thread writes into the ring buffers; publish() copies
+    them into a new snapshot and swaps it in with one assignment. Readers
+    take the snapshot attribute once per callback and never lock, so they
+    always see one consistent publish. The lock only orders writes against
+    publish.
+    """
+    
+    def __init__(self, history_size: int, anomaly_history_size: int, num_zones: int, zone_lookup=None):
+        self.demand = ColumnarRingBuffer(DEMAND_FIELDS, history_size)
+        self.anomalies = ColumnarRingBuffer(ANOMALY_FIELDS, anomaly_history_size)
+        self.heatmap = ZoneHeatmap(num_zones, zone_lookup)
+        
+        # Statistics cards, maintained as rows enter and leave the buffer
+        self.demand_stats = DemandStats()
+        
+        self.versions = {panel: 0 for panel in PANELS}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.snapshot = self._build()
+    
+    def _bump(self, *panels: str):
+        for panel in panels:
+            self.versions[panel] += 1
+        self.dirty = True
+    
+    def add_demand(self, record: Dict[str, Any]):
+        """Buffer one aggregate record."""
+        with self.lock:
+            evicted = self.demand.append(record)
+            self.demand_stats.update(self.demand.latest(), evicted)
+            self._bump('demand', 'stats')
+    
+    def add_demand_batch(self, records: List[Dict[str, Any]]):
+        """Buffer a batch of aggregate records with one columnar append."""
+        if not records:
+            return
+        columns = self.demand.to_columns(records)
+        with self.lock:
+            evicted = self.demand.extend(columns)
+            added = self.demand.last(min(len(records), self.demand.capacity))
+            self.demand_stats.update_columns(added, evicted)
+            self._bump('demand', 'stats')
+    
+    def add_anomaly(self, record: Dict[str, Any]):
+        """Buffer one anomaly."""
+        with self.lock:
+            self.anomalies.append(record)
+            self._bump('anomalies', 'stats')
+    
+    def add_anomaly_batch(self, records: List[Dict[str, Any]]):
+        """Buffer a batch of anomalies with one columnar append."""
+        if not records:
+            return
+        columns = self.anomalies.to_columns(records)
+        with self.lock:
+            self.anomalies.extend(columns)
+            self._bump('anomalies', 'stats')
+    
+    def set_heatmap(self, points: List[Dict[str, Any]]):
+        """Re-bin the heatmap from one heatmap message."""
+        with self.lock:
+            self.heatmap.update(points)
+            self._bump('heatmap')
+    
+    def mark_updated(self, *panels: str):
+        """Bump panels whose data lives outside the store (e.g. the forecast cache)."""
+        with self.lock:
+            self._bump(*panels)
+    
+    def _build(self) -> DashboardSnapshot:
+        demand = {}
+        for name, view in self.demand.last().items():
+            column = view.copy()
+            column.flags.writeable = False
+            demand[name] = column
+        
+        geometry = self.heatmap.geometry
+        heatmap_values = self.heatmap.values[geometry.location_ids]
+        heatmap_values.flags.writeable = False
+        
+        stats = self.demand_stats
+        return DashboardSnapshot(
+            demand, self.demand.total, self.anomalies.rows(RECENT_ANOMALIES), self.anomalies.total,
+            geometry, heatmap_values, int(stats.total_trips), stats.active_locations, stats.avg_fare, self.versions
+        )
+    
+    def publish(self) -> bool:
+        """Swap in a snapshot of everything written since the last publish; False if nothing was."""
+        with self.lock:
+            if not self.dirty:
+                return False
+            snapshot = self._build()
+            self.dirty = False
+        self.snapshot = snapshot
+        return True
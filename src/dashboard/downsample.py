@@ -0,0 +1,125 @@
+import logging
+from collections import OrderedDict
+from typing import Hashable, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-triangle-three-buckets downsampling.
+    
+    Keeps the first and last points and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket.
+    
+    Args:
+        x: Sorted x values (e.g. epoch seconds)
+        y: Values
+        threshold: Points to keep
+    
+    Returns:
+        Indices of the kept points, ascending
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        
+        # Twice the triangle area; the constant factor doesn't change the argmax
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[bucket + 1] = a
+    
+    return kept
+
+
+def minmax(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Min/max decimation: the lowest and highest point of each of threshold // 2 buckets.
+    
+    Args:
+        y: Values
+        threshold: Points to keep
+    
+    Returns:
+        Indices of the kept points, ascending
+    """
+    n = len(y)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return np.arange(n)
+    
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    kept = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            segment = y[start:end]
+            kept.extend((start + int(np.argmin(segment)), start + int(np.argmax(segment))))
+    
+    return np.unique(kept)
+
+
+DOWNSAMPLERS = {
+    'lttb': lambda x, y, threshold: lttb(x, y, threshold),
+    'minmax': lambda x, y, threshold: minmax(y, threshold)
+}
+
+
+class DownsampleCache:
+    """Recently downsampled series, keyed by (data version, range, width)."""
+    
+    def __init__(self, method: str = 'lttb', max_entries: int = 32):
+        if method not in DOWNSAMPLERS:
+            raise ValueError(f"Unknown downsampling method {method}; expected one of {list(DOWNSAMPLERS)}")
+        self.method = method
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+    
+    def get(self, key: Hashable, x: np.ndarray, y: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The series reduced to about one point per pixel, computed once per key.
+        
+        Args:
+            key: Identifies the data version and range the series was cut from
+            x: Sorted x values
+            y: Values
+            width: Chart width in pixels
+        
+        Returns:
+            Tuple of (x, y) for the kept points
+        """
+        cache_key = (key, width)
+        cached = self.entries.get(cache_key)
+        if cached is not None:
+            self.entries.move_to_end(cache_key)
+            return cached
+        
+        kept = DOWNSAMPLERS[self.method](x, y, width)
+        cached = (x[kept], y[kept])
+        self.entries[cache_key] = cached
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        
+        logger.debug(f"Downsampled {len(x)} points to {len(kept)} ({self.method}) for {cache_key}")
+        return cached
+
+    def discard(self, key: Hashable, width: int):
+        """Forget one entry, e.g. one computed from data that changed underneath it."""
+        self.entries.pop((key, width), None)
@@ -0,0 +1,30 @@
+import logging
+from typing import Dict, Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FigureCache:
+    """Built panel outputs keyed by the data version they were built from."""
+    
+    def __init__(self):
+        self.built: Dict[str, Tuple[int, Any]] = {}
+    
+    def get(self, panel: str, version: int, build: Callable[[], Any]) -> Any:
+        """
+        Panel output for a data version, building it on the first request.
+        
+        Args:
+            panel: Panel name
+            version: Data version the caller's snapshot carries
+            build: Builds the output from that snapshot
+        
+        Returns:
+            The cached or freshly built output
+        """
+        cached = self.built.get(panel)
+        if cached is None or cached[0] != version:
+            cached = (version, build())
+            self.built[panel] = cached
+            logger.debug(f"Rebuilt {panel} panel at version {version}")
+        return cached[1]
@@ -0,0 +1,172 @@
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+from kafka import KafkaConsumer
+from src.utils.config import config
+from src.utils.zone_lookup import zone_lookup_from_config
+from src.processors.forecasting import ForecastCache
+from src.dashboard.data_store import DashboardStore
+
+logger = logging.getLogger(__name__)
+
+# How long one poll waits for records before returning an empty batch
+POLL_TIMEOUT_MS = 500
+
+
+def decode_batch(values: List[bytes]) -> List[Any]:
+    """
+    Decode a batch of JSON message values with one parse.
+    
+    Args:
+        values: Raw message values
+    
+    Returns:
+        Decoded messages, in order; malformed ones are logged and dropped
+    """
+    values = [value for value in values if value]
+    try:
+        return json.loads(b'[' + b','.join(values) + b']')
+    except ValueError:
+        # Isolate the malformed message(s) so the rest of the batch survives
+        decoded = []
+        for value in values:
+            try:
+                decoded.append(json.loads(value))
+            except ValueError as e:
+                logger.error(f"Error decoding message: {e}")
+        return decoded
+
+
+class DashboardIngest:
+    """Consumes the dashboard topics into a DashboardStore and publishes its snapshots."""
+    
+    def __init__(self, writer=None):
+        self.dashboard_config = config.get_dashboard_config()
+        self.kafka_config = config.get_kafka_config()
+        processor_config = config.get_processor_config()
+        
+        # Columnar history the collector thread writes and publishes as
+        # immutable snapshots
+        self.store = DashboardStore(
+            self.dashboard_config['history_size'],
+            self.dashboard_config['anomaly_history_size'],
+            processor_config['num_zones'],
+            zone_lookup_from_config(processor_config)
+        )
+        
+        # Latest per-window forecasts published by the stream processor
+        self.forecast_cache = ForecastCache()
+        self.forecast_message: Optional[Dict[str, Any]] = None
+        
+        # Optional shared-memory copy of every publish for other processes
+        self.writer = writer
+        
+        self.consumer = None
+        self._initialize_kafka_consumer()
+        self.running = False
+        self.data_thread = None
+    
+    def _initialize_kafka_consumer(self):
+        """Initialize Kafka consumer for real-time data."""
+        try:
+            self.consumer = KafkaConsumer(
+                self.kafka_config['topic_aggregated'],
+                self.kafka_config['topic_anomalies'],
+                self.kafka_config['topic_forecasts'],
+                bootstrap_servers=self.kafka_config['bootstrap_servers'],
+                auto_offset_reset='latest',
+                enable_auto_commit=True,
+                group_id='dashboard_consumer'
+            )
+            logger.info("Kafka consumer initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize Kafka consumer: {e}")
+            raise
+    
+    def start(self):
+        """Start the data collection thread."""
+        self.running = True
+        self.data_thread = threading.Thread(target=self._collect_data, daemon=True)
+        self.data_thread.start()
+    
+    def _collect_data(self):
+        """Collect data from Kafka topics, one poll batch at a time."""
+        max_records = self.dashboard_config['poll_max_records']
+        while self.running:
+            try:
+                batch = self.consumer.poll(timeout_ms=POLL_TIMEOUT_MS, max_records=max_records)
+            except Exception as e:
+                if self.running:
+                    logger.error(f"Error in data collection: {e}")
+                    time.sleep(1)
+                continue
+            
+            # Group the batch by topic so each topic is decoded and applied once
+            by_topic: Dict[str, List[bytes]] = {}
+            for partition, messages in batch.items():
+                by_topic.setdefault(partition.topic, []).extend(message.value for message in messages)
+            
+            for topic, values in by_topic.items():
+                try:
+                    self._apply(topic, decode_batch(values))
+                except Exception as e:
+                    logger.error(f"Error processing {len(values)} messages from {topic}: {e}")
+    
+    def _apply(self, topic: str, messages: List[Any]):
+        """Apply one topic's decoded batch to the store."""
+        if not messages:
+            return
+        
+        if topic == self.kafka_config['topic_aggregated']:
+            records, heatmaps = [], []
+            for data in messages:
+                if isinstance(data, dict) and data.get('type') == 'heatmap':
+                    heatmaps.append(data)
+                elif isinstance(data, dict):
+                    records.append(data)
+            self.store.add_demand_batch(records)
+            # Each heatmap message replaces the last, so only the newest counts
+            if heatmaps:
+                self.store.set_heatmap(heatmaps[-1].get('data', []))
+        
+        elif topic == self.kafka_config['topic_anomalies']:
+            self.store.add_anomaly_batch([data for data in messages if isinstance(data, dict)])
+        
+        elif topic == self.kafka_config['topic_forecasts']:
+            # Likewise only the latest forecast window is shown
+            data = messages[-1]
+            self.forecast_cache.publish(data)
+            self.forecast_message = data
+            self.store.mark_updated('forecast')
+    
+    def publish(self) -> bool:
+        """Publish a snapshot of new data (and copy it to shared memory); False if nothing changed."""
+        if not self.store.publish():
+            return False
+        if self.writer is not None:
+            self.writer.write(self.store.snapshot, self.forecast_message)
+        return True
+    
+    def run_forever(self):
+        """Collect and publish once per push interval; the body of the ingest process."""
+        self.start()
+        logger.info("Dashboard ingest started")
+        try:
+            while True:
+                time.sleep(self.dashboard_config['push_interval'])
+                self.publish()
+        except KeyboardInterrupt:
+            logger.info("Stopping dashboard ingest...")
+        finally:
+            self.stop()
+    
+    def stop(self):
+        """Close the consumer and the shared-memory segment."""
+        self.running = False
+        if self.consumer:
+            self.consumer.close()
+        if self.writer is not None:
+            self.writer.close()
+        logger.info("Dashboard ingest stopped")
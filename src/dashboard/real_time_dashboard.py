@@ -1,64 +1,121 @@
 import dash
-from dash import dcc, html, Input, Output, callback
+from dash import dcc, html, Input, Output, State, Patch, callback
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+from flask_socketio import SocketIO
 import plotly.graph_objs as go
-import plotly.express as px
-import pandas as pd
-import json
+import numpy as np
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
-from kafka import KafkaConsumer
+from typing import Dict, Any, List, Optional
+from flask import request
 import threading
 import time
 from src.utils.config import config
+from src.processors.forecasting import ForecastCache
+from src.dashboard.figure_cache import FigureCache
+from src.dashboard.downsample import DownsampleCache
+from src.dashboard.data_store import DashboardSnapshot, StaleSnapshot
+from src.dashboard.ingest import DashboardIngest
+from src.dashboard.shared_store import SharedSnapshotReader
 
 logger = logging.getLogger(__name__)
 
+# Points the demand overview keeps; the browser trims extended data to this
+DEMAND_OVERVIEW_POINTS = 50
+
+# Newer snapshots a callback tries when the shared store recycles the one it read
+STALE_SNAPSHOT_RETRIES = 3
+
+# Demand history ranges in seconds (0 for everything retained), and the
+# chart width assumed until the browser reports its own
+HISTORY_RANGES = [('15 min', 900), ('1 hour', 3600), ('6 hours', 21600), ('24 hours', 86400), ('All', 0)]
+DEFAULT_CHART_WIDTH = 800
+
+# Reports the history graph's pixel width on load and on resize
+CHART_WIDTH = """
+function (relayout) {
+    var graph = document.getElementById('demand-history');
+    return graph && graph.offsetWidth ? graph.offsetWidth : window.dash_clientside.no_update;
+}
+"""
+
+SOCKETIO_CLIENT = 'https://cdn.socket.io/4.7.5/socket.io.min.js'
+
+# Runs in the browser every push-interval tick without touching the server:
+# forwards pushed versions to the per-panel push stores (only the panels
+# that moved) and disables the polling intervals while the socket is up
+PUSH_RELAY = """
+function (n, demand, anomalies, heatmap, forecast, stats) {
+    var push = window.taxiPush;
+    if (!push) {
+        push = window.taxiPush = {connected: false, versions: {}};
+        if (typeof io !== 'undefined') {
+            // WebSocket only: a long-polling session would need sticky routing
+            // across the multi-process server's workers
+            var socket = io({transports: ['websocket']});
+            socket.on('connect', function () { push.connected = true; });
+            socket.on('disconnect', function () { push.connected = false; });
+            socket.on('versions', function (versions) { push.versions = versions; });
+        }
+    }
+    var seen = [demand, anomalies, heatmap, forecast, stats];
+    var signals = ['demand', 'anomalies', 'heatmap', 'forecast', 'stats'].map(function (panel, i) {
+        var version = push.versions[panel];
+        return (version === undefined || version === seen[i]) ? window.dash_clientside.no_update : version;
+    });
+    var intervalsDisabled = [1, 2, 3, 4].map(function () { return push.connected; });
+    return signals.concat(intervalsDisabled);
+}
+"""
+
 class RealTimeDashboard:
     """Real-time dashboard for taxi demand visualization."""
     
-    def __init__(self):
+    def __init__(self, shared_store: Optional[str] = None):
         self.dashboard_config = config.get_dashboard_config()
-        self.kafka_config = config.get_kafka_config()
         
         # Initialize Dash app
-        self.app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+        self.app = dash.Dash(
+            __name__,
+            external_stylesheets=[dbc.themes.BOOTSTRAP],
+            external_scripts=[SOCKETIO_CLIENT]
+        )
         self.app.title = "Real-Time Taxi Demand Forecasting"
         
-        # Data storage
-        self.demand_data = []
-        self.anomaly_data = []
-        self.heatmap_data = []
+        # Push channel on the Dash Flask server; browsers fall back to
+        # interval polling while it's disconnected
+        self.socketio = SocketIO(self.app.server, async_mode='threading')
+        
+        # Data storage: in a single process an ingest thread fills a local
+        # store; with shared_store set, this is one of several workers reading
+        # the snapshots an ingest process publishes to that shared-memory segment
+        self.ingest = None
+        if shared_store:
+            self.forecast_cache = ForecastCache()
+            self.store = SharedSnapshotReader(shared_store, self.forecast_cache)
+        else:
+            self.ingest = DashboardIngest()
+            self.forecast_cache = self.ingest.forecast_cache
+            self.store = self.ingest.store
         
-        # Kafka consumer
-        self.consumer = None
-        self._initialize_kafka_consumer()
+        # Built figures per panel; callbacks skip panels whose data hasn't changed
+        self.figure_cache = FigureCache()
+        
+        # Long demand histories reduced to about one point per pixel
+        self.downsample_cache = DownsampleCache(self.dashboard_config['downsample_method'])
         
         # Setup dashboard layout
         self._setup_layout()
         self._setup_callbacks()
         
         # Start data collection thread
-        self.data_thread = threading.Thread(target=self._collect_data, daemon=True)
-        self.data_thread.start()
-    
-    def _initialize_kafka_consumer(self):
-        """Initialize Kafka consumer for real-time data."""
-        try:
-            self.consumer = KafkaConsumer(
-                self.kafka_config['topic_aggregated'],
-                self.kafka_config['topic_anomalies'],
-                bootstrap_servers=self.kafka_config['bootstrap_servers'],
-                value_deserializer=lambda x: json.loads(x.decode('utf-8')),
-                auto_offset_reset='latest',
-                enable_auto_commit=True,
-                group_id='dashboard_consumer'
-            )
-            logger.info("Kafka consumer initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Kafka consumer: {e}")
-            raise
+        if self.ingest is not None:
+            self.ingest.start()
+        
+        # Publish snapshots and broadcast panel versions as data arrives
+        self.push_thread = threading.Thread(target=self._push_updates, daemon=True)
+        self.push_thread.start()
     
     def _setup_layout(self):
         """Setup the dashboard layout."""
@@ -105,6 +162,26 @@ class RealTimeDashboard:
                 ], width=6)
             ], className="mb-4"),
             
+            # Demand History
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardHeader("📈 Demand History"),
+                        dbc.CardBody([
+                            dcc.Dropdown(
+                                id='history-range',
+                                options=[{'label': label, 'value': seconds} for label, seconds in HISTORY_RANGES],
+                                value=3600,
+                                clearable=False
+                            ),
+                            dcc.Graph(id='demand-history'),
+                            dcc.Store(id='history-width'),
+                            dcc.Store(id='history-key')
+                        ])
+                    ])
+                ], width=12)
+            ], className="mb-4"),
+            
             # Heatmap and Forecast
             dbc.Row([
                 # Demand Heatmap
@@ -172,180 +249,419 @@ class RealTimeDashboard:
                         ])
                     ])
                 ], width=3)
-            ])
+            ]),
+            
+            # Pushed versions per panel and the client-side relay tick
+            dcc.Store(id='demand-push'),
+            dcc.Store(id='anomaly-push'),
+            dcc.Store(id='heatmap-push'),
+            dcc.Store(id='forecast-push'),
+            dcc.Store(id='stats-push'),
+            dcc.Interval(id='push-interval', interval=500, n_intervals=0),
+            
+            # Data version each panel last rendered in this browser
+            dcc.Store(id='demand-cursor'),
+            dcc.Store(id='anomaly-version'),
+            dcc.Store(id='heatmap-version'),
+            dcc.Store(id='forecast-version'),
+            dcc.Store(id='stats-version')
         ], fluid=True)
     
     def _setup_callbacks(self):
         """Setup dashboard callbacks."""
         
+        self.app.clientside_callback(
+            PUSH_RELAY,
+            [Output('demand-push', 'data'),
+             Output('anomaly-push', 'data'),
+             Output('heatmap-push', 'data'),
+             Output('forecast-push', 'data'),
+             Output('stats-push', 'data'),
+             Output('demand-interval', 'disabled'),
+             Output('anomaly-interval', 'disabled'),
+             Output('heatmap-interval', 'disabled'),
+             Output('forecast-interval', 'disabled')],
+            Input('push-interval', 'n_intervals'),
+            [State('demand-push', 'data'),
+             State('anomaly-push', 'data'),
+             State('heatmap-push', 'data'),
+             State('forecast-push', 'data'),
+             State('stats-push', 'data')]
+        )
+        
+        @self.socketio.on('connect')
+        def send_versions():
+            """Bring a newly connected browser up to date."""
+            self.socketio.emit('versions', self.store.snapshot.versions, to=request.sid)
+        
         @self.app.callback(
-            Output('demand-overview-graph', 'figure'),
-            Input('demand-interval', 'n_intervals')
+            [Output('demand-overview-graph', 'figure'),
+             Output('demand-overview-graph', 'extendData'),
+             Output('demand-cursor', 'data')],
+            [Input('demand-interval', 'n_intervals'),
+             Input('demand-push', 'data'),
+             Input('demand-overview-graph', 'relayoutData')],
+            State('demand-cursor', 'data')
         )
-        def update_demand_overview(n):
-            """Update demand overview graph."""
-            if not self.demand_data:
-                return self._create_empty_figure("No demand data available")
-            
-            # Create time series of demand
-            df = pd.DataFrame(self.demand_data[-50:])  # Last 50 records
-            
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=df.get('timestamp', []),
-                y=df.get('trip_count', []),
-                mode='lines+markers',
-                name='Trip Count',
-                line=dict(color='blue', width=2)
-            ))
-            
-            fig.update_layout(
-                title="Real-Time Trip Demand",
-                xaxis_title="Time",
-                yaxis_title="Number of Trips",
-                height=400,
-                showlegend=True
-            )
+        def update_demand_overview(n, pushed, relayout, cursor):
+            """Send the full graph on first load or resize, otherwise only the new points."""
+            triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+            resized = 'demand-overview-graph.relayoutData' in triggered and 'autosize' in (relayout or {})
+            return self._read_snapshot(lambda snapshot: self._demand_overview_update(snapshot, cursor, resized))
+        
+        self.app.clientside_callback(
+            CHART_WIDTH,
+            Output('history-width', 'data'),
+            Input('demand-history', 'relayoutData')
+        )
+        
+        @self.app.callback(
+            [Output('demand-history', 'figure'),
+             Output('history-key', 'data')],
+            [Input('history-range', 'value'),
+             Input('history-width', 'data'),
+             Input('demand-interval', 'n_intervals'),
+             Input('demand-push', 'data')],
+            State('history-key', 'data')
+        )
+        def update_demand_history(range_seconds, width, n, pushed, client_key):
+            """Downsampled demand history for the selected range and chart width."""
+            def read(snapshot):
+                key = [snapshot.versions['demand'], range_seconds, int(width or DEFAULT_CHART_WIDTH)]
+                if key == client_key:
+                    return dash.no_update, dash.no_update
+                return self._demand_history_figure(snapshot, range_seconds, key[2]), key
             
-            return fig
+            return self._read_snapshot(read)
         
         @self.app.callback(
-            Output('anomaly-alerts', 'children'),
-            Input('anomaly-interval', 'n_intervals')
+            [Output('anomaly-alerts', 'children'),
+             Output('anomaly-version', 'data')],
+            [Input('anomaly-interval', 'n_intervals'),
+             Input('anomaly-push', 'data')],
+            State('anomaly-version', 'data')
         )
-        def update_anomaly_alerts(n):
+        def update_anomaly_alerts(n, pushed, client_version):
             """Update anomaly alerts."""
-            if not self.anomaly_data:
-                return html.P("No anomalies detected", className="text-muted")
-            
-            alerts = []
-            for anomaly in self.anomaly_data[-10:]:  # Last 10 anomalies
-                alert_color = "danger" if anomaly.get('type') == 'high_demand' else "warning"
-                alert_icon = "🚨" if anomaly.get('type') == 'high_demand' else "⚠️"
-                
-                alerts.append(
-                    dbc.Alert([
-                        html.Strong(f"{alert_icon} {anomaly.get('type', 'Unknown')}"),
-                        html.Br(),
-                        f"Location: {anomaly.get('location_id', 'Unknown')}",
-                        html.Br(),
-                        f"Value: {anomaly.get('value', 0)}",
-                        html.Br(),
-                        f"Threshold: {anomaly.get('threshold', 0)}"
-                    ], color=alert_color, className="mb-2")
-                )
-            
-            return alerts
+            return self._cached_output('anomalies', client_version, self._anomaly_alerts)
         
         @self.app.callback(
-            Output('demand-heatmap', 'figure'),
-            Input('heatmap-interval', 'n_intervals')
+            [Output('demand-heatmap', 'figure'),
+             Output('heatmap-version', 'data')],
+            [Input('heatmap-interval', 'n_intervals'),
+             Input('heatmap-push', 'data')],
+            State('heatmap-version', 'data')
         )
-        def update_demand_heatmap(n):
-            """Update demand heatmap."""
-            if not self.heatmap_data:
-                return self._create_empty_figure("No heatmap data available")
-            
-            df = pd.DataFrame(self.heatmap_data)
-            
-            if df.empty:
-                return self._create_empty_figure("No heatmap data available")
-            
-            fig = px.scatter_mapbox(
-                df,
-                lat='latitude',
-                lon='longitude',
-                size='trip_count',
-                color='trip_count',
-                hover_name='location_id',
-                hover_data=['trip_count', 'avg_fare'],
-                color_continuous_scale='Reds',
-                zoom=10,
-                center={'lat': 40.7128, 'lon': -74.0060}  # NYC coordinates
-            )
-            
-            fig.update_layout(
-                mapbox_style='open-street-map',
-                title="Taxi Demand Heatmap",
-                height=400
-            )
-            
-            return fig
+        def update_demand_heatmap(n, pushed, client_version):
+            """Send the zone geometry once, then only the per-zone values."""
+            return self._heatmap_update(client_version)
         
         @self.app.callback(
-            Output('demand-forecast', 'figure'),
-            Input('forecast-interval', 'n_intervals')
+            [Output('demand-forecast', 'figure'),
+             Output('forecast-version', 'data')],
+            [Input('forecast-interval', 'n_intervals'),
+             Input('forecast-push', 'data')],
+            State('forecast-version', 'data')
         )
-        def update_demand_forecast(n):
-            """Update demand forecast."""
-            if not self.demand_data:
-                return self._create_empty_figure("No forecast data available")
-            
-            # Simple forecasting visualization
-            df = pd.DataFrame(self.demand_data[-20:])  # Last 20 records
-            
-            if df.empty:
-                return self._create_empty_figure("No forecast data available")
-            
-            fig = go.Figure()
-            
-            # Current demand
-            fig.add_trace(go.Scatter(
-                x=df.get('timestamp', []),
-                y=df.get('trip_count', []),
-                mode='lines+markers',
-                name='Current Demand',
-                line=dict(color='blue', width=2)
-            ))
-            
-            # Forecast (simple extrapolation)
-            if len(df) > 1:
-                last_demand = df['trip_count'].iloc[-1]
-                forecast_values = [last_demand * 1.1, last_demand * 1.2, last_demand * 1.3]
-                forecast_times = [
-                    datetime.now() + timedelta(hours=1),
-                    datetime.now() + timedelta(hours=2),
-                    datetime.now() + timedelta(hours=3)
-                ]
-                
-                fig.add_trace(go.Scatter(
-                    x=forecast_times,
-                    y=forecast_values,
-                    mode='lines+markers',
-                    name='Forecast',
-                    line=dict(color='red', width=2, dash='dash')
-                ))
-            
-            fig.update_layout(
-                title="Demand Forecast (Next 3 Hours)",
-                xaxis_title="Time",
-                yaxis_title="Predicted Trips",
-                height=400,
-                showlegend=True
-            )
-            
-            return fig
+        def update_demand_forecast(n, pushed, client_version):
+            """Update demand forecast from the latest cached window."""
+            return self._cached_output('forecast', client_version, self._forecast_figure)
         
         @self.app.callback(
             [Output('total-trips', 'children'),
              Output('active-locations', 'children'),
              Output('avg-fare', 'children'),
-             Output('anomaly-count', 'children')],
-            Input('demand-interval', 'n_intervals')
+             Output('anomaly-count', 'children'),
+             Output('stats-version', 'data')],
+            [Input('demand-interval', 'n_intervals'),
+             Input('stats-push', 'data')],
+            State('stats-version', 'data')
         )
-        def update_statistics(n):
+        def update_statistics(n, pushed, client_version):
             """Update statistics cards."""
-            if not self.demand_data:
-                return "0", "0", "$0.00", "0"
-            
-            df = pd.DataFrame(self.demand_data)
-            
-            total_trips = df['trip_count'].sum() if 'trip_count' in df.columns else 0
-            active_locations = len(df['pickup_location_id'].unique()) if 'pickup_location_id' in df.columns else 0
-            avg_fare = f"${df['avg_fare'].mean():.2f}" if 'avg_fare' in df.columns else "$0.00"
-            anomaly_count = len(self.anomaly_data)
+            return self._cached_output('stats', client_version, self._statistics, outputs=4)
+    
+    def _cached_output(self, panel: str, client_version, build, outputs: int = 1):
+        """
+        Panel output for a callback, built at most once per data version.
+        
+        Args:
+            panel: Panel name in the figure cache
+            client_version: Version the browser last rendered (from its dcc.Store)
+            build: Builds the panel output from a snapshot
+            outputs: Number of component outputs the builder returns
+        
+        Returns:
+            The panel outputs followed by their version, or no_update for
+            every output when the browser already shows this version
+        """
+        snapshot = self.store.snapshot
+        version = snapshot.versions[panel]
+        if client_version == version:
+            return [dash.no_update] * (outputs + 1)
+        
+        built = self.figure_cache.get(panel, version, lambda: build(snapshot))
+        return [*built, version] if outputs > 1 else [built, version]
+    
+    def _read_snapshot(self, read):
+        """
+        Run a callback body on the latest snapshot, retrying on a newer one if it went stale.
+        
+        Args:
+            read: Takes a snapshot and returns the callback outputs; calls
+                snapshot.check() after reading its demand columns
+        
+        Returns:
+            The outputs of the first read that saw consistent data
+        """
+        for _ in range(STALE_SNAPSHOT_RETRIES):
+            try:
+                return read(self.store.snapshot)
+            except StaleSnapshot as e:
+                logger.debug(f"Retrying callback: {e}")
+        raise PreventUpdate
+    
+    def _demand_overview_update(self, snapshot: DashboardSnapshot, cursor, resized: bool):
+        """
+        Figure, extendData and cursor outputs for the demand overview.
+        
+        Args:
+            snapshot: Published dashboard data
+            cursor: Buffer row count the browser's graph reflects
+            resized: Whether the graph was resized and needs a full redraw
+        
+        Returns:
+            The full figure when the browser has none (or an empty one), was
+            resized, fell too far behind or is ahead of the store (a tab left
+            open across an ingest restart); otherwise just the rows appended
+            since its cursor as an extendData payload
+        """
+        total = snapshot.demand_total
+        
+        if resized or not cursor or total < cursor or total - cursor > DEMAND_OVERVIEW_POINTS:
+            figure, built_at = self.figure_cache.get(
+                'demand', snapshot.versions['demand'], lambda: self._demand_overview_figure(snapshot)
+            )
+            if built_at == cursor and not resized:
+                return dash.no_update, dash.no_update, dash.no_update
+            return figure, dash.no_update, built_at
+        
+        if total == cursor:
+            return dash.no_update, dash.no_update, dash.no_update
+        
+        new = total - cursor
+        timestamps = np.datetime_as_string((snapshot.demand['timestamp'][-new:] * 1000).astype('datetime64[ms]'))
+        extend = {'x': [timestamps.tolist()], 'y': [snapshot.demand['trip_count'][-new:].tolist()]}
+        snapshot.check()
+        return dash.no_update, [extend, [0], DEMAND_OVERVIEW_POINTS], total
+    
+    def _demand_overview_figure(self, snapshot: DashboardSnapshot):
+        """Time series of the most recent aggregate records, with the row count it reflects."""
+        total = snapshot.demand_total
+        if not snapshot.demand_rows:
+            return self._create_empty_figure("No demand data available"), total
+        
+        # Create time series of demand
+        recent = {name: column[-DEMAND_OVERVIEW_POINTS:] for name, column in snapshot.demand.items()}
+        
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=(recent['timestamp'] * 1000).astype('datetime64[ms]'),
+            y=recent['trip_count'],
+            mode='lines+markers',
+            name='Trip Count',
+            line=dict(color='blue', width=2)
+        ))
+        snapshot.check()
+        
+        fig.update_layout(
+            title="Real-Time Trip Demand",
+            xaxis_title="Time",
+            yaxis_title="Number of Trips",
+            height=400,
+            showlegend=True
+        )
+        
+        return fig, total
+    
+    def _demand_history_figure(self, snapshot: DashboardSnapshot, range_seconds: int, width: int):
+        """
+        Demand over a time range, downsampled to the chart width.
+        
+        Args:
+            snapshot: Published dashboard data
+            range_seconds: Seconds back from the newest record, 0 for all
+            width: Chart width in pixels
+        
+        Returns:
+            Figure whose payload size depends on the width, not the range
+        """
+        timestamps = snapshot.demand['timestamp']
+        if not len(timestamps):
+            return self._create_empty_figure("No demand data available")
+        
+        # Rows are in ingest order, so the range start is a binary search
+        start = int(np.searchsorted(timestamps, timestamps[-1] - range_seconds)) if range_seconds else 0
+        key = (snapshot.versions['demand'], range_seconds)
+        x, y = self.downsample_cache.get(key, timestamps[start:], snapshot.demand['trip_count'][start:], width)
+        try:
+            snapshot.check()
+        except StaleSnapshot:
+            self.downsample_cache.discard(key, width)
+            raise
+        
+        fig = go.Figure()
+        fig.add_trace(go.Scattergl(
+            x=(x * 1000).astype('datetime64[ms]'),
+            y=y,
+            mode='lines',
+            name='Trip Count',
+            line=dict(color='blue', width=1)
+        ))
+        
+        fig.update_layout(
+            title=f"Demand History ({len(x)} of {len(timestamps) - start} points)",
+            xaxis_title="Time",
+            yaxis_title="Number of Trips",
+            height=400
+        )
+        
+        return fig
+    
+    def _anomaly_alerts(self, snapshot: DashboardSnapshot):
+        """Alert cards for the most recent anomalies."""
+        if not snapshot.recent_anomalies:
+            return html.P("No anomalies detected", className="text-muted")
+        
+        alerts = []
+        for anomaly in snapshot.recent_anomalies:
+            alert_color = "danger" if anomaly.get('type') == 'high_demand' else "warning"
+            alert_icon = "🚨" if anomaly.get('type') == 'high_demand' else "⚠️"
             
-            return str(total_trips), str(active_locations), avg_fare, str(anomaly_count)
+            alerts.append(
+                dbc.Alert([
+                    html.Strong(f"{alert_icon} {anomaly.get('type', 'Unknown')}"),
+                    html.Br(),
+                    f"Location: {anomaly.get('location_id', 'Unknown')}",
+                    html.Br(),
+                    f"Value: {anomaly.get('value', 0)}",
+                    html.Br(),
+                    f"Threshold: {anomaly.get('threshold', 0)}"
+                ], color=alert_color, className="mb-2")
+            )
+        
+        return alerts
+    
+    def _heatmap_update(self, client_version):
+        """
+        Figure and version outputs for the heatmap.
+        
+        Args:
+            client_version: [geometry version, data version] the browser last rendered
+        
+        Returns:
+            The full figure when the browser has no figure or an older zone
+            geometry; otherwise a Patch that replaces only the values array
+        """
+        snapshot = self.store.snapshot
+        geometry = snapshot.heatmap_geometry
+        version = [geometry.version, snapshot.versions['heatmap']]
+        if client_version == version:
+            return dash.no_update, dash.no_update
+        
+        if not client_version or client_version[0] != geometry.version:
+            figure = self.figure_cache.get('heatmap', version[1], lambda: self._heatmap_figure(snapshot))
+            return figure, version
+        
+        patch = Patch()
+        patch['data'][0]['z'] = snapshot.heatmap_values.tolist()
+        return patch, version
+    
+    def _heatmap_figure(self, snapshot: DashboardSnapshot):
+        """Density layer over the zone centroids; the browser keeps it and only swaps values."""
+        geometry = snapshot.heatmap_geometry
+        if not len(geometry.location_ids):
+            return self._create_empty_figure("No heatmap data available")
+        
+        fig = go.Figure(go.Densitymapbox(
+            lat=geometry.latitudes,
+            lon=geometry.longitudes,
+            z=snapshot.heatmap_values,
+            customdata=geometry.location_ids,
+            hovertemplate='Zone %{customdata}: %{z} trips<extra></extra>',
+            radius=25,
+            colorscale='Reds'
+        ))
+        
+        fig.update_layout(
+            mapbox_style='open-street-map',
+            mapbox_center={'lat': 40.7128, 'lon': -74.0060},  # NYC coordinates
+            mapbox_zoom=10,
+            title="Taxi Demand Heatmap",
+            height=400,
+            uirevision='heatmap'  # keep the viewer's pan/zoom across updates
+        )
+        
+        return fig
+    
+    def _forecast_figure(self, snapshot: DashboardSnapshot):
+        """All-zone forecast with its prediction interval (the forecast cache swaps its own snapshots)."""
+        forecast = self.forecast_cache.latest
+        if forecast is None or not forecast.totals:
+            return self._create_empty_figure("No forecast data available")
+        
+        window_start = datetime.fromtimestamp(forecast.window_start)
+        forecast_times = [window_start + timedelta(minutes=t['minutes']) for t in forecast.totals]
+        
+        fig = go.Figure()
+        
+        # Prediction interval
+        fig.add_trace(go.Scatter(
+            x=forecast_times + forecast_times[::-1],
+            y=[t['upper'] for t in forecast.totals] + [t['lower'] for t in forecast.totals][::-1],
+            fill='toself',
+            fillcolor='rgba(255, 0, 0, 0.1)',
+            line=dict(color='rgba(255, 0, 0, 0)'),
+            name='Prediction Interval'
+        ))
+        
+        # Current demand and forecast
+        fig.add_trace(go.Scatter(
+            x=[window_start],
+            y=[forecast.current_total],
+            mode='markers',
+            name='Current Demand',
+            marker=dict(color='blue', size=10)
+        ))
+        fig.add_trace(go.Scatter(
+            x=[window_start] + forecast_times,
+            y=[forecast.current_total] + [t['forecast'] for t in forecast.totals],
+            mode='lines+markers',
+            name='Forecast',
+            line=dict(color='red', width=2, dash='dash')
+        ))
+        
+        fig.update_layout(
+            title="Demand Forecast (All Zones)",
+            xaxis_title="Time",
+            yaxis_title="Predicted Trips",
+            height=400,
+            showlegend=True
+        )
+        
+        return fig
+    
+    def _statistics(self, snapshot: DashboardSnapshot):
+        """Values for the four statistics cards."""
+        if not snapshot.demand_rows:
+            return "0", "0", "$0.00", "0"
+        
+        total_trips = snapshot.total_trips
+        active_locations = snapshot.active_locations
+        avg_fare = f"${snapshot.avg_fare:.2f}"
+        anomaly_count = snapshot.anomaly_total
+        
+        return str(total_trips), str(active_locations), avg_fare, str(anomaly_count)
     
     def _create_empty_figure(self, message: str):
         """Create an empty figure with a message."""
@@ -364,45 +680,24 @@ class RealTimeDashboard:
         )
         return fig
     
-    def _collect_data(self):
-        """Collect data from Kafka topics."""
-        try:
-            for message in self.consumer:
-                try:
-                    data = message.value
-                    topic = message.topic
-                    
-                    if topic == self.kafka_config['topic_aggregated']:
-                        if isinstance(data, dict) and data.get('type') == 'heatmap':
-                            self.heatmap_data = data.get('data', [])
-                        else:
-                            self.demand_data.append(data)
-                    
-                    elif topic == self.kafka_config['topic_anomalies']:
-                        self.anomaly_data.append(data)
-                    
-                    # Keep only recent data
-                    if len(self.demand_data) > 1000:
-                        self.demand_data = self.demand_data[-500:]
-                    
-                    if len(self.anomaly_data) > 100:
-                        self.anomaly_data = self.anomaly_data[-50:]
-                    
-                except Exception as e:
-                    logger.error(f"Error processing message: {e}")
-                    continue
-                    
-        except Exception as e:
-            logger.error(f"Error in data collection: {e}")
+    def _push_updates(self):
+        """Once per push interval, pick up a snapshot of new data and broadcast its panel versions."""
+        while True:
+            time.sleep(self.dashboard_config['push_interval'])
+            updated = self.ingest.publish() if self.ingest is not None else self.store.refresh()
+            if updated:
+                self.socketio.emit('versions', self.store.snapshot.versions)
     
     def run(self):
         """Run the dashboard."""
         try:
             logger.info(f"Starting dashboard on {self.dashboard_config['host']}:{self.dashboard_config['port']}")
-            self.app.run(
+            self.socketio.run(
+                self.app.server,
                 host=self.dashboard_config['host'],
                 port=self.dashboard_config['port'],
-                debug=False
+                debug=False,
+                allow_unsafe_werkzeug=True
             )
         except Exception as e:
             logger.error(f"Error running dashboard: {e}")
@@ -410,6 +705,8 @@ class RealTimeDashboard:
     
     def stop(self):
         """Stop the dashboard."""
-        if self.consumer:
-            self.consumer.close()
-            logger.info("Dashboard stopped") 
\ No newline at end of file
+        if self.ingest is not None:
+            self.ingest.stop()
+        else:
+            self.store.close()
+        logger.info("Dashboard stopped") 
\ No newline at end of file
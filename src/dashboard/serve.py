@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Multi-process dashboard serving
+
+One ingest process consumes the dashboard topics and publishes each snapshot
+to a shared-memory store; gunicorn workers serve the dashboard from
+zero-copy views of that store, so every worker shows the complete data.
+
+Usage:
+    python -m src.dashboard.serve
+    python -m src.dashboard.serve --workers 8
+"""
+
+import sys
+import signal
+import argparse
+import logging
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+from src.utils.config import config
+from src.dashboard.ingest import DashboardIngest
+from src.dashboard.shared_store import SharedSnapshotWriter
+
+logger = logging.getLogger(__name__)
+
+
+def run_ingest(ready):
+    """Body of the ingest process: create the shared store, then consume and publish into it."""
+    config.setup_logging()
+    # terminate() from the parent unwinds through DashboardIngest.stop
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    dashboard_config = config.get_dashboard_config()
+    writer = SharedSnapshotWriter(
+        dashboard_config['shared_store'],
+        dashboard_config['history_size'],
+        config.get_processor_config()['num_zones'],
+        dashboard_config['shared_meta_bytes']
+    )
+    ingest = DashboardIngest(writer)
+    ready.set()
+    ingest.run_forever()
+
+
+def create_server():
+    """Gunicorn app factory; each worker attaches to the shared store the ingest process created."""
+    from src.dashboard.real_time_dashboard import RealTimeDashboard
+    config.setup_logging()
+    dashboard = RealTimeDashboard(shared_store=config.get_dashboard_config()['shared_store'])
+    return dashboard.app.server
+
+
+class DashboardApplication(BaseApplication):
+    """Gunicorn with settings from our config instead of its command line."""
+    
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+    
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+    
+    def load(self):
+        return create_server()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboard from several worker processes")
+    parser.add_argument('--workers', type=int, default=None, help="web workers (default: DASHBOARD_WORKERS)")
+    args = parser.parse_args()
+    
+    config.setup_logging()
+    dashboard_config = config.get_dashboard_config()
+    workers = args.workers or dashboard_config['workers']
+    
+    ready = multiprocessing.Event()
+    ingest = multiprocessing.Process(target=run_ingest, args=(ready,), name='dashboard-ingest', daemon=True)
+    ingest.start()
+    if not ready.wait(timeout=60):
+        logger.error("Dashboard ingest process failed to start")
+        ingest.terminate()
+        return 1
+    
+    logger.info(f"Starting dashboard on {dashboard_config['host']}:{dashboard_config['port']} with {workers} workers")
+    try:
+        # Threaded workers keep each browser's WebSocket on the worker that
+        # accepted it
+        DashboardApplication({
+            'bind': f"{dashboard_config['host']}:{dashboard_config['port']}",
+            'workers': workers,
+            'worker_class': 'gthread',
+            'threads': 100
+        }).run()
+    finally:
+        ingest.terminate()
+        ingest.join()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
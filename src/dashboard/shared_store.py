@@ -0,0 +1,250 @@
+import json
+import logging
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from src.dashboard.data_store import DashboardSnapshot, ZoneGeometry, DEMAND_FIELDS, PANELS
+
+logger = logging.getLogger(__name__)
+
+# Publishes rotate through this many slots, so the slot a reader holds is
+# rewritten only two publishes after it stopped being the active one
+SLOTS = 3
+
+# Header: int64 fields at the start of the segment, ending with one
+# sequence number per slot (odd while the writer is rewriting it)
+_ACTIVE, _GENERATION, _CAPACITY, _NUM_ZONES, _META_BYTES, _SEQUENCE = range(6)
+HEADER_FIELDS = _SEQUENCE + SLOTS
+
+# Attempts at reading a consistent slot before keeping the previous snapshot
+REFRESH_RETRIES = 5
+
+# Segments this process created; attaching to one of those must leave the
+# resource tracker registration to the writer
+_OWNED = set()
+
+ZONE_ARRAYS = ['heatmap_values', 'zone_latitudes', 'zone_longitudes']
+
+
+def _slot_arrays(buffer, offset: int, capacity: int, num_zones: int, meta_bytes: int) -> Tuple[Dict[str, np.ndarray], int]:
+    arrays = {}
+    for name, dtype in DEMAND_FIELDS.items():
+        arrays[name] = np.ndarray(capacity, dtype=dtype, buffer=buffer, offset=offset)
+        offset += capacity * np.dtype(dtype).itemsize
+    for name in ZONE_ARRAYS:
+        arrays[name] = np.ndarray(num_zones, dtype=np.float64, buffer=buffer, offset=offset)
+        offset += num_zones * 8
+    arrays['meta_length'] = np.ndarray(1, dtype=np.int64, buffer=buffer, offset=offset)
+    offset += 8
+    arrays['meta'] = np.ndarray(meta_bytes, dtype=np.uint8, buffer=buffer, offset=offset)
+    offset += meta_bytes
+    return arrays, offset
+
+
+def _layout(buffer, capacity: int, num_zones: int, meta_bytes: int) -> Tuple[np.ndarray, List[Dict[str, np.ndarray]], int]:
+    """Header and per-slot arrays over a segment buffer, plus the total size."""
+    header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=buffer) if buffer is not None else None
+    offset = HEADER_FIELDS * 8
+    slots = []
+    for _ in range(SLOTS):
+        if buffer is None:
+            offset += sum(capacity * np.dtype(dtype).itemsize for dtype in DEMAND_FIELDS.values())
+            offset += len(ZONE_ARRAYS) * num_zones * 8 + 8 + meta_bytes
+            continue
+        arrays, offset = _slot_arrays(buffer, offset, capacity, num_zones, meta_bytes)
+        slots.append(arrays)
+    return header, slots, offset
+
+
+class SharedSnapshotWriter:
+    """Copies each published dashboard snapshot into a shared-memory segment."""
+    
+    def __init__(self, name: str, capacity: int, num_zones: int, meta_bytes: int = 4 << 20):
+        self.name = name
+        self.meta_bytes = meta_bytes
+        size = _layout(None, capacity, num_zones, meta_bytes)[2]
+        
+        # A segment left behind by a crashed ingest process is replaced
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.header, self.slots, _ = _layout(self.shm.buf, capacity, num_zones, meta_bytes)
+        self.header[:] = 0
+        self.header[_CAPACITY] = capacity
+        self.header[_NUM_ZONES] = num_zones
+        self.header[_META_BYTES] = meta_bytes
+        _OWNED.add(name)
+        logger.info(f"Created shared dashboard store {name} ({size / 1e6:.1f} MB)")
+    
+    def write(self, snapshot: DashboardSnapshot, forecast_message: Optional[Dict[str, Any]] = None):
+        """
+        Write a snapshot into the next slot, then make it the active one.
+        
+        Args:
+            snapshot: Published dashboard snapshot
+            forecast_message: Latest forecast topic message, if any
+        """
+        index = (int(self.header[_ACTIVE]) + 1) % SLOTS
+        slot = self.slots[index]
+        
+        # Odd sequence: readers still holding this slot see it as changing
+        self.header[_SEQUENCE + index] += 1
+        
+        rows = snapshot.demand_rows
+        for name in DEMAND_FIELDS:
+            slot[name][:rows] = snapshot.demand[name]
+        
+        geometry = snapshot.heatmap_geometry
+        slot['zone_latitudes'][:] = np.nan
+        slot['zone_longitudes'][:] = np.nan
+        slot['heatmap_values'][:] = 0
+        slot['zone_latitudes'][geometry.location_ids] = geometry.latitudes
+        slot['zone_longitudes'][geometry.location_ids] = geometry.longitudes
+        slot['heatmap_values'][geometry.location_ids] = snapshot.heatmap_values
+        
+        meta = json.dumps({**snapshot.scalars(), 'forecast': forecast_message}, default=str).encode('utf-8')
+        if len(meta) > self.meta_bytes:
+            logger.warning(f"Snapshot metadata ({len(meta)} bytes) exceeds the shared slot; dropping the forecast")
+            meta = json.dumps({**snapshot.scalars(), 'forecast': None}, default=str).encode('utf-8')
+        slot['meta'][:len(meta)] = np.frombuffer(meta, dtype=np.uint8)
+        slot['meta_length'][0] = len(meta)
+        
+        # Close the write, flip readers to the new slot, then announce it
+        self.header[_SEQUENCE + index] += 1
+        self.header[_ACTIVE] = index
+        self.header[_GENERATION] += 1
+    
+    def close(self):
+        """Release and remove the segment."""
+        self.header = self.slots = None
+        self.shm.close()
+        self.shm.unlink()
+        _OWNED.discard(self.name)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Open an existing segment without letting this process's exit remove it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the segment for cleanup;
+        # unless this process created it (and will unlink it), undo that
+        shm = shared_memory.SharedMemory(name=name)
+        if name not in _OWNED:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class SharedSnapshotReader:
+    """
+    Zero-copy dashboard snapshots from the ingest process's shared-memory segment.
+    
+    A snapshot's demand columns stay valid until the writer comes back round
+    to their slot, two publishes after a newer one. Each slot carries a
+    sequence number the writer bumps before and after rewriting it; the
+    snapshot's check() compares it against the value seen when the snapshot
+    was taken, so a reader that held it too long retries instead of using
+    torn data.
+    """
+    
+    def __init__(self, name: str, forecast_cache=None):
+        self.shm = _attach(name)
+        header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=self.shm.buf)
+        self.header, self.slots, _ = _layout(
+            self.shm.buf, int(header[_CAPACITY]), int(header[_NUM_ZONES]), int(header[_META_BYTES])
+        )
+        self.forecast_cache = forecast_cache
+        self.forecast_version = None
+        self.generation = -1
+        self._snapshot: Optional[DashboardSnapshot] = None
+        self.refresh()
+    
+    @property
+    def snapshot(self) -> DashboardSnapshot:
+        """The latest published snapshot; its demand columns are views of shared memory."""
+        self.refresh()
+        return self._snapshot
+    
+    def _unchanged(self, index: int, sequence: int) -> bool:
+        header = self.header
+        return header is not None and int(header[_SEQUENCE + index]) == sequence
+    
+    def refresh(self) -> bool:
+        """Pick up a newer publish if there is one; return True if there was."""
+        for _ in range(REFRESH_RETRIES):
+            generation = int(self.header[_GENERATION])
+            if generation == self.generation:
+                return False
+            
+            index = int(self.header[_ACTIVE])
+            sequence = int(self.header[_SEQUENCE + index])
+            if sequence % 2:
+                # The writer lapped us and is rewriting this slot; re-read the header
+                continue
+            
+            snapshot, meta = self._read_slot(index, sequence)
+            if not self._unchanged(index, sequence):
+                continue
+            
+            self.generation = generation
+            if snapshot is None:
+                # Nothing published yet
+                self._snapshot = self._empty()
+                return False
+            
+            self._snapshot = snapshot
+            forecast_version = meta['versions'].get('forecast')
+            if self.forecast_cache is not None and meta['forecast'] and forecast_version != self.forecast_version:
+                self.forecast_cache.publish(meta['forecast'])
+                self.forecast_version = forecast_version
+            return True
+        
+        logger.warning("Shared dashboard store kept changing under the reader; keeping the previous snapshot")
+        if self._snapshot is None:
+            self._snapshot = self._empty()
+        return False
+    
+    def _read_slot(self, index: int, sequence: int) -> Tuple[Optional[DashboardSnapshot], Any]:
+        """Copy a slot's metadata and zone arrays and view its demand columns."""
+        slot = self.slots[index]
+        try:
+            meta = json.loads(slot['meta'][:int(slot['meta_length'][0])].tobytes() or b'null')
+        except ValueError:
+            # Torn metadata; the sequence check sends the caller round again
+            return None, None
+        if meta is None:
+            return None, None
+        
+        demand = {}
+        for name in DEMAND_FIELDS:
+            view = slot[name][:meta['demand_rows']]
+            view.flags.writeable = False
+            demand[name] = view
+        
+        latitudes, longitudes = slot['zone_latitudes'], slot['zone_longitudes']
+        known = np.flatnonzero(~np.isnan(latitudes))
+        geometry = ZoneGeometry(meta['geometry_version'], known, latitudes[known], longitudes[known])
+        
+        snapshot = DashboardSnapshot(
+            demand, meta['demand_total'], meta['recent_anomalies'], meta['anomaly_total'],
+            geometry, slot['heatmap_values'][known], meta['total_trips'], meta['active_locations'],
+            meta['avg_fare'], meta['versions'], meta['published_at'],
+            consistent=lambda: self._unchanged(index, sequence)
+        )
+        return snapshot, meta
+    
+    def _empty(self) -> DashboardSnapshot:
+        demand = {name: np.zeros(0, dtype=dtype) for name, dtype in DEMAND_FIELDS.items()}
+        empty = np.zeros(0, dtype=np.int64)
+        geometry = ZoneGeometry(0, empty, empty.astype(np.float64), empty.astype(np.float64))
+        return DashboardSnapshot(demand, 0, [], 0, geometry, np.zeros(0), 0, 0, 0.0, {panel: 0 for panel in PANELS})
+    
+    def close(self):
+        """Detach from the segment."""
+        self.header = self.slots = self._snapshot = None
+        self.shm.close()
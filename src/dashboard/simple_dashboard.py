@@ -12,6 +12,7 @@ import threading
 import time
 from src.utils.config import config
 from src.collectors.mock_data_generator import MockTaxiDataGenerator
+from src.processors.forecasting import forecaster_from_config, forecast_message, ForecastCache
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,12 @@ class SimpleDashboard:
         # Mock data generator
         self.mock_generator = MockTaxiDataGenerator()
         
+        # Forecasts from the streaming forecaster fed with the mock trips
+        self.forecaster = forecaster_from_config(
+            config.get_forecast_config(), config.get_processor_config()['num_zones']
+        )
+        self.forecast_cache = ForecastCache()
+        
         # Setup dashboard layout
         self._setup_layout()
         self._setup_callbacks()
@@ -258,47 +265,44 @@ class SimpleDashboard:
             Input('forecast-interval', 'n_intervals')
         )
         def update_demand_forecast(n):
-            """Update demand forecast."""
-            if not self.demand_data:
+            """Update demand forecast from the latest cached window."""
+            snapshot = self.forecast_cache.latest
+            if snapshot is None or not snapshot.totals:
                 return self._create_empty_figure("No forecast data available")
             
-            # Simple forecasting visualization
-            df = pd.DataFrame(self.demand_data[-20:])  # Last 20 records
-            
-            if df.empty:
-                return self._create_empty_figure("No forecast data available")
+            window_start = datetime.fromtimestamp(snapshot.window_start)
+            forecast_times = [window_start + timedelta(minutes=t['minutes']) for t in snapshot.totals]
             
             fig = go.Figure()
             
-            # Current demand
+            # Prediction interval
             fig.add_trace(go.Scatter(
-                x=df.get('timestamp', []),
-                y=df.get('trip_count', []),
-                mode='lines+markers',
-                name='Current Demand',
-                line=dict(color='blue', width=2)
+                x=forecast_times + forecast_times[::-1],
+                y=[t['upper'] for t in snapshot.totals] + [t['lower'] for t in snapshot.totals][::-1],
+                fill='toself',
+                fillcolor='rgba(255, 0, 0, 0.1)',
+                line=dict(color='rgba(255, 0, 0, 0)'),
+                name='Prediction Interval'
             ))
             
-            # Forecast (simple extrapolation)
-            if len(df) > 1:
-                last_demand = df['trip_count'].iloc[-1] if 'trip_count' in df.columns else 10
-                forecast_values = [last_demand * 1.1, last_demand * 1.2, last_demand * 1.3]
-                forecast_times = [
-                    datetime.now() + timedelta(hours=1),
-                    datetime.now() + timedelta(hours=2),
-                    datetime.now() + timedelta(hours=3)
-                ]
-                
-                fig.add_trace(go.Scatter(
-                    x=forecast_times,
-                    y=forecast_values,
-                    mode='lines+markers',
-                    name='Forecast',
-                    line=dict(color='red', width=2, dash='dash')
-                ))
+            # Current demand and forecast
+            fig.add_trace(go.Scatter(
+                x=[window_start],
+                y=[snapshot.current_total],
+                mode='markers',
+                name='Current Demand',
+                marker=dict(color='blue', size=10)
+            ))
+            fig.add_trace(go.Scatter(
+                x=[window_start] + forecast_times,
+                y=[snapshot.current_total] + [t['forecast'] for t in snapshot.totals],
+                mode='lines+markers',
+                name='Forecast',
+                line=dict(color='red', width=2, dash='dash')
+            ))
             
             fig.update_layout(
-                title="Demand Forecast (Next 3 Hours) - Mock Data",
+                title="Demand Forecast (All Zones) - Mock Data",
                 xaxis_title="Time",
                 yaxis_title="Predicted Trips",
                 height=400,
@@ -363,6 +367,13 @@ class SimpleDashboard:
                     }
                     self.demand_data.append(demand_record)
                 
+                # Publish forecasts whenever a forecast window closes
+                location_ids = [trip['pickup_location_id'] for trip in taxi_data]
+                if self.forecaster.observe(location_ids, [1] * len(location_ids)):
+                    self.forecast_cache.publish(
+                        forecast_message(self.forecaster.to_records(), self.forecaster.window_start)
+                    )
+                
                 # Generate mock anomalies
                 if len(self.demand_data) > 0:
                     last_record = self.demand_data[-1]
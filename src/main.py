@@ -13,7 +13,6 @@ from typing import List
 from src.utils.config import config
 from src.collectors.nyc_taxi_collector import NYCTaxiCollector
 from src.collectors.kafka_producer import TaxiDataProducer
-from src.processors.spark_streaming_processor import SparkStreamingProcessor
 from src.dashboard.real_time_dashboard import RealTimeDashboard
 
 logger = logging.getLogger(__name__)
@@ -63,9 +62,17 @@ class TaxiDemandSystem:
             self.producer = TaxiDataProducer()
             logger.info("✅ Kafka Producer initialized")
             
-            # Initialize Spark processor
-            self.processor = SparkStreamingProcessor()
-            logger.info("✅ Spark Streaming Processor initialized")
+            # Initialize stream processor (imported lazily so the NumPy
+            # engine never pays for the pyspark import)
+            started = time.perf_counter()
+            if config.get_processor_config()['engine'] == 'numpy':
+                from src.processors.numpy_stream_processor import NumpyStreamProcessor
+                self.processor = NumpyStreamProcessor()
+                logger.info(f"✅ NumPy Stream Processor initialized in {time.perf_counter() - started:.2f}s")
+            else:
+                from src.processors.spark_streaming_processor import SparkStreamingProcessor
+                self.processor = SparkStreamingProcessor()
+                logger.info(f"✅ Spark Streaming Processor initialized in {time.perf_counter() - started:.2f}s")
             
             # Initialize dashboard
             self.dashboard = RealTimeDashboard()
@@ -97,6 +104,11 @@ class TaxiDemandSystem:
                         if heatmap_data:
                             self.producer.send_heatmap_data(heatmap_data)
                             logger.info(f"🗺️ Sent heatmap data for {len(heatmap_data)} locations")
+                        
+                        # Get grid cell counts
+                        grid_data = self.collector.get_grid_heatmap_data(hours=1)
+                        if grid_data:
+                            self.producer.send_records(self.producer.topic_grid, grid_data, 'grid')
                     
                     # Wait before next collection
                     time.sleep(30)  # Collect every 30 seconds
@@ -110,17 +122,17 @@ class TaxiDemandSystem:
         logger.info("🚀 Data collection started")
     
     def start_streaming_processing(self):
-        """Start the Spark streaming processing."""
+        """Start the stream processing."""
         def run_processor():
-            """Run Spark streaming processor."""
+            """Run the configured stream processor."""
             try:
                 self.processor.start_streaming()
             except Exception as e:
-                logger.error(f"Error in Spark streaming: {e}")
+                logger.error(f"Error in stream processing: {e}")
         
         self.processor_thread = threading.Thread(target=run_processor, daemon=True)
         self.processor_thread.start()
-        logger.info("🚀 Spark streaming processing started")
+        logger.info("🚀 Stream processing started")
     
     def start_dashboard(self):
         """Start the real-time dashboard."""
@@ -182,7 +194,7 @@ class TaxiDemandSystem:
             
             if self.processor:
                 self.processor.stop_streaming()
-                logger.info("✅ Spark processor stopped")
+                logger.info("✅ Stream processor stopped")
             
             if self.producer:
                 self.producer.close()
@@ -0,0 +1 @@
+# Offline-trained demand models and the versioned model store 
\ No newline at end of file
@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from statistics import NormalDist
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LATEST_POINTER = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+COEFFICIENTS_FILE = 'coefficients.npy'
+INTERCEPTS_FILE = 'intercepts.npy'
+
+
+def time_features(window_start: np.ndarray) -> np.ndarray:
+    """Hour-of-day and day-of-week encodings for window start times, shape (n, 5)."""
+    window_start = np.asarray(window_start, dtype=np.float64)
+    hours = (window_start % 86400) / 3600
+    days = (window_start // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+    return np.column_stack([
+        np.sin(2 * np.pi * hours / 24),
+        np.cos(2 * np.pi * hours / 24),
+        np.sin(2 * np.pi * days / 7),
+        np.cos(2 * np.pi * days / 7),
+        (days >= 5).astype(np.float64)
+    ])
+
+
+def build_features(history: np.ndarray, window_start: float) -> np.ndarray:
+    """
+    Feature matrix for every zone at one point in time.
+    
+    Args:
+        history: Demand per zone for the most recent windows, shape
+            (zones, lags), oldest first
+        window_start: Start time of the window being forecast from
+    
+    Returns:
+        Array of shape (zones, lags + 5)
+    """
+    calendar = np.broadcast_to(time_features([window_start]), (history.shape[0], 5))
+    return np.hstack([history, calendar])
+
+
+class DemandModel:
+    """One loaded model version: per-zone linear coefficients for each horizon."""
+    
+    def __init__(self, version: str, manifest: Dict[str, Any],
+                 coefficients: np.ndarray, intercepts: np.ndarray):
+        self.version = version
+        self.manifest = manifest
+        self.coefficients = coefficients  # (horizons, zones, features)
+        self.intercepts = intercepts      # (horizons, zones)
+        self.horizons_minutes = manifest['horizons_minutes']
+        self.lags = manifest['lags']
+        self.window_seconds = manifest['window_seconds']
+        self.residual_std = np.asarray(manifest['residual_std'], dtype=np.float64)
+    
+    @property
+    def num_zones(self) -> int:
+        return self.coefficients.shape[1]
+    
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Score every zone for every horizon in one call, shape (zones, horizons)."""
+        predictions = np.einsum('zf,hzf->zh', features, self.coefficients) + self.intercepts.T
+        return np.maximum(predictions, 0)
+
+
+class ModelStore:
+    """Versioned on-disk model store: one directory per version plus a LATEST pointer."""
+    
+    def __init__(self, root: str):
+        self.root = root
+    
+    def save(self, coefficients: np.ndarray, intercepts: np.ndarray, manifest: Dict[str, Any],
+             version: Optional[str] = None) -> str:
+        """
+        Write a new model version and point LATEST at it.
+        
+        Args:
+            coefficients: Array of shape (horizons, zones, features)
+            intercepts: Array of shape (horizons, zones)
+            manifest: Model metadata (horizons_minutes, lags, window_seconds,
+                residual_std, ...)
+            version: Version name (defaults to a UTC timestamp)
+        
+        Returns:
+            The version written
+        """
+        version = version or datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        path = os.path.join(self.root, version)
+        os.makedirs(path, exist_ok=False)
+        
+        np.save(os.path.join(path, COEFFICIENTS_FILE), np.ascontiguousarray(coefficients, dtype=np.float64))
+        np.save(os.path.join(path, INTERCEPTS_FILE), np.ascontiguousarray(intercepts, dtype=np.float64))
+        with open(os.path.join(path, MANIFEST_FILE), 'w') as f:
+            json.dump({**manifest, 'version': version, 'created_at': time.time()}, f, indent=2)
+        
+        # Readers only ever see a complete version
+        pointer = os.path.join(self.root, LATEST_POINTER)
+        with open(pointer + '.tmp', 'w') as f:
+            f.write(version)
+        os.replace(pointer + '.tmp', pointer)
+        
+        logger.info(f"Saved demand model version {version} to {path}")
+        return version
+    
+    def latest_version(self) -> Optional[str]:
+        """Version LATEST points at, or None for an empty store."""
+        try:
+            with open(os.path.join(self.root, LATEST_POINTER)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def versions(self) -> List[str]:
+        """All versions in the store, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, MANIFEST_FILE))
+        )
+    
+    def load(self, version: Optional[str] = None) -> Optional[DemandModel]:
+        """Load a version (default LATEST); coefficient arrays are memory-mapped."""
+        version = version or self.latest_version()
+        if version is None:
+            return None
+        
+        path = os.path.join(self.root, version)
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        
+        return DemandModel(
+            version,
+            manifest,
+            np.load(os.path.join(path, COEFFICIENTS_FILE), mmap_mode='r'),
+            np.load(os.path.join(path, INTERCEPTS_FILE), mmap_mode='r')
+        )
+
+
+class ModelScorer:
+    """Scores the latest model version once per window and hot-swaps new versions."""
+    
+    def __init__(self, store: ModelStore, num_zones: int, window_seconds: int,
+                 check_interval: float = 30.0, confidence: float = 0.9):
+        self.store = store
+        self.num_zones = num_zones
+        self.window_seconds = window_seconds
+        self.check_interval = check_interval
+        self.interval_z = NormalDist().inv_cdf((1 + confidence) / 2)
+        
+        self.model: Optional[DemandModel] = None
+        self.history: Optional[np.ndarray] = None
+        self.windows_seen = 0
+        self.seen_version: Optional[str] = None
+        self.last_check = 0.0
+        self.refresh(force=True)
+    
+    def refresh(self, force: bool = False) -> bool:
+        """Swap in a newer version if LATEST moved; return True on a swap."""
+        now = time.time()
+        if not force and now - self.last_check < self.check_interval:
+            return False
+        self.last_check = now
+        
+        # Each version is tried once, so a rejected one isn't reloaded every check
+        version = self.store.latest_version()
+        if version is None or version == self.seen_version:
+            return False
+        self.seen_version = version
+        
+        try:
+            model = self.store.load(version)
+        except Exception as e:
+            logger.error(f"Failed to load demand model version {version}: {e}")
+            return False
+        
+        if model.window_seconds != self.window_seconds or model.num_zones != self.num_zones:
+            logger.warning(
+                f"Ignoring demand model {version}: trained for {model.num_zones} zones and "
+                f"{model.window_seconds}s windows, processor uses {self.num_zones} and {self.window_seconds}s"
+            )
+            return False
+        
+        # Keep the lag history across versions when the lag count agrees
+        if self.history is None or self.history.shape[1] != model.lags:
+            self.history = np.zeros((self.num_zones, model.lags))
+            self.windows_seen = 0
+        
+        # A single reference assignment, so a concurrent scorer sees either
+        # the old or the new model, never a mix
+        self.model = model
+        logger.info(f"Loaded demand model version {version}")
+        return True
+    
+    def push(self, window_counts: np.ndarray):
+        """Append one closed window's per-zone demand to the lag history."""
+        if self.history is None:
+            return
+        self.history = np.roll(self.history, -1, axis=1)
+        self.history[:, -1] = window_counts
+        self.windows_seen += 1
+    
+    def score(self, window_start: float) -> Optional[Dict[str, Any]]:
+        """Batched predictions for all zones, or None until a model and full lag history exist."""
+        self.refresh()
+        model = self.model
+        if model is None or self.windows_seen < model.lags:
+            return None
+        
+        mean = model.predict(build_features(self.history, window_start))
+        spread = self.interval_z * model.residual_std
+        return {
+            'version': model.version,
+            'horizons_minutes': model.horizons_minutes,
+            'mean': mean,
+            'lower': np.maximum(mean - spread, 0),
+            'upper': mean + spread
+        }
+    
+    def apply(self, records: List[Dict[str, Any]], predictions: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Replace the streaming forecasts in records with model predictions where horizons match."""
+        columns = {minutes: h for h, minutes in enumerate(predictions['horizons_minutes'])}
+        for record in records:
+            zone = record['location_id']
+            for horizon in record['horizons']:
+                h = columns.get(horizon['minutes'])
+                if h is None:
+                    continue
+                horizon['forecast'] = round(float(predictions['mean'][zone, h]), 2)
+                horizon['lower'] = round(float(predictions['lower'][zone, h]), 2)
+                horizon['upper'] = round(float(predictions['upper'][zone, h]), 2)
+                if horizon['minutes'] == 60:
+                    record['forecast_1_hour'] = horizon['forecast']
+                elif horizon['minutes'] == 120:
+                    record['forecast_2_hours'] = horizon['forecast']
+            record['model_version'] = predictions['version']
+        return records
+    
+    def score_window(self, window_counts: np.ndarray, window_start: float,
+                     records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Record a closed window and overlay model predictions on its forecast records."""
+        self.push(window_counts)
+        predictions = self.score(window_start)
+        if predictions is None:
+            return records
+        return self.apply(records, predictions)
+
+
+def scorer_from_config(forecast_config: Dict[str, Any], num_zones: int) -> ModelScorer:
+    """Build a model scorer from the forecast configuration section."""
+    return ModelScorer(
+        ModelStore(forecast_config['model_store_path']),
+        num_zones=num_zones,
+        window_seconds=forecast_config['window_seconds'],
+        check_interval=forecast_config['model_check_interval'],
+        confidence=forecast_config['confidence']
+    )
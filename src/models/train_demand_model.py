@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Offline training for the demand forecast models scored by the stream processors
+
+Fits one ridge regression per horizon on lagged per-zone window demand plus
+calendar features, and writes the coefficients to the versioned model store.
+
+Usage:
+    python -m src.models.train_demand_model --input yellow_tripdata_2024-01.parquet
+    python -m src.models.train_demand_model --limit 50000   # NYC Open Data API
+"""
+
+import sys
+import argparse
+import logging
+from typing import Dict, Any, List, Tuple
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.linear_model import Ridge
+from src.utils.config import config
+from src.models.model_store import ModelStore, time_features
+
+logger = logging.getLogger(__name__)
+
+# Column names in our own records and in the TLC trip record files
+PICKUP_TIME_COLUMNS = ['pickup_datetime', 'tpep_pickup_datetime', 'lpep_pickup_datetime']
+PICKUP_ZONE_COLUMNS = ['pickup_location_id', 'PULocationID', 'pulocationid']
+
+
+def _pick_column(df: pd.DataFrame, candidates: List[str]) -> str:
+    for name in candidates:
+        if name in df.columns:
+            return name
+    raise ValueError(f"None of the columns {candidates} found in input")
+
+
+def load_trips(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extract pickup epoch seconds and pickup zones from a trips frame.
+    
+    Args:
+        df: Trips with one of the known pickup time and zone columns
+    
+    Returns:
+        Tuple of (event_times, zones) arrays with unparseable rows dropped
+    """
+    pickup_times = pd.to_datetime(df[_pick_column(df, PICKUP_TIME_COLUMNS)], errors='coerce')
+    if pickup_times.dt.tz is None:
+        # TLC timestamps are local New York time
+        pickup_times = pickup_times.dt.tz_localize('America/New_York', ambiguous='NaT', nonexistent='NaT')
+    zones = pd.to_numeric(df[_pick_column(df, PICKUP_ZONE_COLUMNS)], errors='coerce')
+    
+    valid = pickup_times.notna() & zones.notna()
+    event_times = pickup_times[valid].astype('int64').to_numpy() / 1e9
+    return event_times, zones[valid].to_numpy(dtype=np.int64)
+
+
+def demand_matrix(event_times: np.ndarray, zones: np.ndarray, num_zones: int,
+                  window_seconds: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count trips per zone per tumbling window.
+    
+    Returns:
+        Tuple of (demand with shape (zones, windows), window start times)
+    """
+    first_window = event_times.min() // window_seconds
+    windows = (event_times // window_seconds - first_window).astype(np.int64)
+    num_windows = int(windows.max()) + 1
+    
+    valid = (zones >= 0) & (zones < num_zones)
+    flat = zones[valid] * num_windows + windows[valid]
+    demand = np.bincount(flat, minlength=num_zones * num_windows).reshape(num_zones, num_windows)
+    window_starts = (first_window + np.arange(num_windows)) * window_seconds
+    return demand.astype(np.float64), window_starts
+
+
+def training_samples(demand: np.ndarray, window_starts: np.ndarray, lags: int,
+                     steps: int, window_seconds: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lagged features and targets for one horizon, for every zone at once.
+    
+    The features for window t are the demand of windows t-lags+1..t plus the
+    calendar encoding of window t+1 (the window the processor is in when it
+    scores); the target is the demand of window t+steps.
+    
+    Returns:
+        Tuple of (features with shape (zones, samples, lags + 5),
+        targets with shape (zones, samples))
+    """
+    num_zones, num_windows = demand.shape
+    num_samples = num_windows - lags - steps + 1
+    if num_samples <= 0:
+        raise ValueError(f"Need more than {lags + steps} windows of history, got {num_windows}")
+    
+    lagged = sliding_window_view(demand, lags, axis=1)[:, :num_samples]
+    current = np.arange(num_samples) + lags - 1
+    calendar = time_features(window_starts[current] + window_seconds)
+    
+    features = np.concatenate([lagged, np.broadcast_to(calendar, (num_zones,) + calendar.shape)], axis=2)
+    return features, demand[:, current + steps]
+
+
+def fit_horizon(features: np.ndarray, targets: np.ndarray, per_zone: bool,
+                ridge_alpha: float, min_trips: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fit a global model, then per-zone models for zones with enough demand.
+    
+    Returns:
+        Tuple of (coefficients with shape (zones, features), intercepts with shape (zones,))
+    """
+    num_zones, _, num_features = features.shape
+    
+    model = Ridge(alpha=ridge_alpha).fit(features.reshape(-1, num_features), targets.reshape(-1))
+    coefficients = np.tile(model.coef_, (num_zones, 1))
+    intercepts = np.full(num_zones, model.intercept_)
+    
+    if per_zone:
+        # Sparse zones keep the global fit
+        busy = np.flatnonzero(targets.sum(axis=1) >= min_trips)
+        for zone in busy:
+            zone_model = Ridge(alpha=ridge_alpha).fit(features[zone], targets[zone])
+            coefficients[zone] = zone_model.coef_
+            intercepts[zone] = zone_model.intercept_
+        logger.info(f"Fitted per-zone models for {len(busy)} of {num_zones} zones")
+    
+    return coefficients, intercepts
+
+
+def train(event_times: np.ndarray, zones: np.ndarray, num_zones: int, window_seconds: int,
+          lags: int, horizons_minutes: List[int], per_zone: bool = True, ridge_alpha: float = 1.0,
+          min_trips: int = 200, holdout: float = 0.2) -> Dict[str, Any]:
+    """
+    Fit one model per horizon and evaluate it on the most recent windows.
+    
+    Returns:
+        Dict with coefficients (horizons, zones, features), intercepts
+        (horizons, zones) and the manifest to store alongside them
+    """
+    demand, window_starts = demand_matrix(event_times, zones, num_zones, window_seconds)
+    logger.info(f"Demand matrix: {num_zones} zones x {demand.shape[1]} windows of {window_seconds}s")
+    
+    coefficients, intercepts, residual_std, metrics = [], [], [], []
+    for minutes in horizons_minutes:
+        steps = max(1, minutes * 60 // window_seconds)
+        features, targets = training_samples(demand, window_starts, lags, steps, window_seconds)
+        
+        split = int(features.shape[1] * (1 - holdout))
+        coef, intercept = fit_horizon(features[:, :split], targets[:, :split], per_zone, ridge_alpha, min_trips)
+        
+        # Score the held-out windows with the same batched call the processor uses
+        predicted = np.maximum(np.einsum('zsf,zf->zs', features[:, split:], coef) + intercept[:, None], 0)
+        residuals = targets[:, split:] - predicted
+        persistence = targets[:, split:] - features[:, split:, lags - 1]
+        
+        coefficients.append(coef)
+        intercepts.append(intercept)
+        residual_std.append(float(residuals.std()) if residuals.size else 0.0)
+        metrics.append({
+            'horizon_minutes': minutes,
+            'samples': int(targets.size),
+            'holdout_mae': float(np.abs(residuals).mean()) if residuals.size else None,
+            'persistence_mae': float(np.abs(persistence).mean()) if persistence.size else None
+        })
+        logger.info(f"Horizon {minutes}m: {metrics[-1]}")
+    
+    return {
+        'coefficients': np.stack(coefficients),
+        'intercepts': np.stack(intercepts),
+        'manifest': {
+            'model_type': 'ridge_per_zone' if per_zone else 'ridge_global',
+            'window_seconds': window_seconds,
+            'lags': lags,
+            'horizons_minutes': list(horizons_minutes),
+            'num_zones': num_zones,
+            'residual_std': residual_std,
+            'trained_on': {
+                'trips': int(len(event_times)),
+                'windows': int(demand.shape[1]),
+                'start': float(window_starts[0]),
+                'end': float(window_starts[-1] + window_seconds)
+            },
+            'metrics': metrics
+        }
+    }
+
+
+def main():
+    """Train demand models and publish a new version to the model store."""
+    forecast_config = config.get_forecast_config()
+    num_zones = config.get_processor_config()['num_zones']
+    
+    parser = argparse.ArgumentParser(description='Train demand forecast models on historical trips')
+    parser.add_argument('--input', help='Trips CSV or Parquet file (default: fetch from the NYC Open Data API)')
+    parser.add_argument('--limit', type=int, default=50000, help='Records to fetch from the API')
+    parser.add_argument('--store', default=forecast_config['model_store_path'], help='Model store directory')
+    parser.add_argument('--version', help='Version name (default: UTC timestamp)')
+    parser.add_argument('--window-seconds', type=int, default=forecast_config['window_seconds'])
+    parser.add_argument('--lags', type=int, default=forecast_config['model_lags'])
+    parser.add_argument('--horizons', default=','.join(str(m) for m in forecast_config['horizons_minutes']),
+                        help='Comma-separated forecast horizons in minutes')
+    parser.add_argument('--global-only', action='store_true', help='Fit a single model shared by all zones')
+    parser.add_argument('--ridge-alpha', type=float, default=1.0)
+    parser.add_argument('--min-trips', type=int, default=200,
+                        help='Trips a zone needs for its own model in per-zone mode')
+    args = parser.parse_args()
+    
+    config.setup_logging()
+    
+    if args.input:
+        trips = pd.read_parquet(args.input) if args.input.endswith('.parquet') else pd.read_csv(args.input)
+    else:
+        from src.collectors.nyc_taxi_collector import NYCTaxiCollector
+        trips = pd.DataFrame(NYCTaxiCollector().fetch_taxi_data(limit=args.limit))
+    
+    event_times, zones = load_trips(trips)
+    if len(event_times) == 0:
+        logger.error("No usable trips to train on")
+        sys.exit(1)
+    
+    result = train(
+        event_times, zones, num_zones,
+        window_seconds=args.window_seconds,
+        lags=args.lags,
+        horizons_minutes=[int(m) for m in args.horizons.split(',')],
+        per_zone=not args.global_only,
+        ridge_alpha=args.ridge_alpha,
+        min_trips=args.min_trips
+    )
+    
+    version = ModelStore(args.store).save(
+        result['coefficients'], result['intercepts'], result['manifest'], version=args.version
+    )
+    print(f"✅ Trained demand model version {version} ({result['manifest']['model_type']})")
+
+if __name__ == "__main__":
+    main()
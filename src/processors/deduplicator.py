@@ -0,0 +1,174 @@
+import hashlib
+import math
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys."""
+    
+    def __init__(self, capacity: int, error_rate: float = 1e-4):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+    
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+    
+    def add(self, key: str) -> bool:
+        """Add a key; return True if it was (probably) already present."""
+        present = True
+        for position in self._positions(key):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & bit:
+                present = False
+                self.bits[byte] |= bit
+        return present
+    
+    def __len__(self) -> int:
+        return len(self.bits)
+
+
+class _SeenSet:
+    """Exact seen-set with the same interface as BloomFilter."""
+    
+    def __init__(self):
+        self.keys = set()
+    
+    def add(self, key: str) -> bool:
+        if key in self.keys:
+            return True
+        self.keys.add(key)
+        return False
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class TripDeduplicator:
+    """Drops repeated trip_ids using watermark-bounded, time-bucketed state."""
+    
+    def __init__(self, bucket_seconds: int = 300, watermark_delay: int = 7200,
+                 mode: str = 'bloom', bucket_capacity: int = 100000, error_rate: float = 1e-4):
+        if mode not in ('bloom', 'set'):
+            raise ValueError(f"Unknown deduplication mode: {mode}")
+        
+        self.bucket_seconds = bucket_seconds
+        self.watermark_delay = watermark_delay
+        self.mode = mode
+        self.bucket_capacity = bucket_capacity
+        self.error_rate = error_rate
+        
+        # Event-time bucket start -> seen trip_ids for trips picked up in it.
+        # A duplicate carries the same pickup time, so only its own bucket
+        # needs checking, and buckets behind the watermark can be dropped.
+        self.buckets: Dict[int, Any] = {}
+        self.max_event_time = 0.0
+        
+        self.stats = {'seen': 0, 'duplicates': 0, 'late': 0, 'evicted_buckets': 0}
+    
+    @property
+    def watermark(self) -> float:
+        """Event time before which trips are considered too late."""
+        return self.max_event_time - self.watermark_delay
+    
+    def _new_bucket(self):
+        if self.mode == 'bloom':
+            return BloomFilter(self.bucket_capacity, self.error_rate)
+        return _SeenSet()
+    
+    def is_new(self, trip_id: Optional[str], event_time: Optional[float]) -> bool:
+        """Check-and-record one trip; False for duplicates and late trips."""
+        self.stats['seen'] += 1
+        
+        # Without a key or event time the trip cannot be bucketed, so it is
+        # passed through rather than allowed to move the watermark
+        if trip_id is None or event_time is None:
+            return True
+        
+        if event_time < self.watermark:
+            self.stats['late'] += 1
+            return False
+        
+        bucket_start = int(event_time // self.bucket_seconds) * self.bucket_seconds
+        bucket = self.buckets.get(bucket_start)
+        if bucket is None:
+            bucket = self.buckets[bucket_start] = self._new_bucket()
+        
+        if bucket.add(str(trip_id)):
+            self.stats['duplicates'] += 1
+            return False
+        
+        if event_time > self.max_event_time:
+            self.max_event_time = event_time
+        return True
+    
+    def filter_mask(self, trip_ids: Sequence[Optional[str]], event_times: Sequence[Optional[float]]) -> List[bool]:
+        """Keep-mask for a batch, then evict buckets behind the new watermark."""
+        mask = [self.is_new(trip_id, event_time) for trip_id, event_time in zip(trip_ids, event_times)]
+        self.evict()
+        return mask
+    
+    def filter(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop duplicate and late trip records from a batch."""
+        event_times = [event_time(r.get('pickup_datetime')) for r in records]
+        mask = self.filter_mask([r.get('trip_id') for r in records], event_times)
+        return [record for record, keep in zip(records, mask) if keep]
+    
+    def evict(self):
+        """Drop buckets that end before the watermark."""
+        watermark = self.watermark
+        expired = [start for start in self.buckets if start + self.bucket_seconds < watermark]
+        for start in expired:
+            del self.buckets[start]
+        self.stats['evicted_buckets'] += len(expired)
+    
+    def state_size(self) -> int:
+        """Bytes (bloom) or keys (set) currently held across all buckets."""
+        # Copy the buckets first: the metrics endpoint calls this from its
+        # own thread while the batch thread adds and evicts buckets
+        return sum(len(bucket) for bucket in list(self.buckets.values()))
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Deduplication counters and state size."""
+        return {
+            **self.stats,
+            'mode': self.mode,
+            'buckets': len(self.buckets),
+            'state_size': self.state_size(),
+            'watermark': self.watermark if self.max_event_time else None
+        }
+
+
+# Fields that together identify a trip when the source carries no trip_id
+TRIP_KEY_FIELDS = ('pickup_datetime', 'dropoff_datetime', 'pickup_location_id',
+                   'dropoff_location_id', 'vendor_id', 'fare_amount')
+
+
+def trip_key(record: Dict[str, Any]) -> str:
+    """Deterministic trip_id from a trip's content, so a re-published trip gets the same key."""
+    content = '|'.join(str(record.get(field)) for field in TRIP_KEY_FIELDS)
+    return 'trip_' + hashlib.blake2b(content.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def event_time(pickup_datetime: Optional[str]) -> Optional[float]:
+    """Epoch seconds of an ISO pickup timestamp, or None if unparseable."""
+    if not pickup_datetime:
+        return None
+    try:
+        return datetime.fromisoformat(pickup_datetime.replace('Z', '+00:00')).timestamp()
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def deduplicator_from_config(processor_config: Dict[str, Any]) -> TripDeduplicator:
+    """Build a deduplicator from the processor configuration section."""
+    return TripDeduplicator(
+        bucket_seconds=processor_config['dedup_bucket_seconds'],
+        watermark_delay=processor_config['dedup_watermark_seconds'],
+        mode=processor_config['dedup_mode'],
+        bucket_capacity=processor_config['dedup_bucket_capacity']
+    )
@@ -0,0 +1,223 @@
+import time
+import logging
+from statistics import NormalDist
+from typing import Dict, Any, List, Optional, Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class OnlineForecastEngine:
+    """Additive Holt-Winters demand forecaster holding state for every zone in NumPy arrays."""
+    
+    def __init__(self, num_zones: int, window_seconds: int = 300, season_length: int = 288,
+                 horizons: Sequence[int] = (12, 24), alpha: float = 0.3, beta: float = 0.05,
+                 gamma: float = 0.1, confidence: float = 0.9):
+        self.num_zones = num_zones
+        self.window_seconds = window_seconds
+        self.season_length = season_length
+        self.horizons = np.asarray(horizons, dtype=np.int64)
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.confidence = confidence
+        self.interval_z = NormalDist().inv_cdf((1 + confidence) / 2)
+        
+        # Smoothing state: one slot per zone, one season row per zone
+        self.level = np.zeros(num_zones)
+        self.trend = np.zeros(num_zones)
+        self.seasonal = np.zeros((num_zones, season_length))
+        self.residual_var = np.zeros(num_zones)
+        self.steps = 0
+        
+        # Demand accumulated for the window currently open
+        self.window_counts = np.zeros(num_zones)
+        self.last_window = np.zeros(num_zones)
+        self.window_start: Optional[float] = None
+        self.last_forecast: Optional[Dict[str, np.ndarray]] = None
+    
+    def update(self, demand: np.ndarray):
+        """Advance every zone by one window of observed demand."""
+        season_index = self.steps % self.season_length
+        
+        if self.steps == 0:
+            self.level[:] = demand
+        else:
+            seasonal = self.seasonal[:, season_index]
+            residual = demand - (self.level + self.trend + seasonal)
+            
+            previous_level = self.level
+            self.level = self.alpha * (demand - seasonal) + (1 - self.alpha) * (self.level + self.trend)
+            self.trend = self.beta * (self.level - previous_level) + (1 - self.beta) * self.trend
+            self.seasonal[:, season_index] = self.gamma * (demand - self.level) + (1 - self.gamma) * seasonal
+            self.residual_var += self.alpha * (residual * residual - self.residual_var)
+        
+        self.steps += 1
+    
+    def forecast(self) -> Dict[str, np.ndarray]:
+        """Point forecasts and prediction intervals, shape (zones, horizons)."""
+        season_index = (self.steps - 1 + self.horizons) % self.season_length
+        mean = self.level[:, None] + self.trend[:, None] * self.horizons + self.seasonal[:, season_index]
+        
+        # Error grows with the horizon as level updates compound
+        spread = self.interval_z * np.sqrt(
+            self.residual_var[:, None] * (1 + (self.horizons - 1) * self.alpha ** 2)
+        )
+        return {
+            'mean': np.maximum(mean, 0),
+            'lower': np.maximum(mean - spread, 0),
+            'upper': np.maximum(mean + spread, 0)
+        }
+    
+    def observe(self, location_ids: np.ndarray, trip_counts: np.ndarray,
+                timestamp: Optional[float] = None) -> bool:
+        """
+        Add a batch's per-zone demand; close and forecast finished windows.
+        
+        Args:
+            location_ids: Zones present in the batch
+            trip_counts: Trips per zone in the batch
+            timestamp: Batch time (defaults to now)
+        
+        Returns:
+            True if at least one window closed and forecasts were refreshed
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        window_start = timestamp - timestamp % self.window_seconds
+        
+        if self.window_start is None:
+            self.window_start = window_start
+        
+        closed = False
+        if window_start > self.window_start:
+            elapsed = int((window_start - self.window_start) // self.window_seconds)
+            self.update(self.window_counts)
+            
+            # Idle windows count as zero demand (at most one season of them)
+            for _ in range(min(elapsed - 1, self.season_length)):
+                self.update(np.zeros(self.num_zones))
+            
+            self.last_window = self.window_counts
+            self.window_counts = np.zeros(self.num_zones)
+            self.window_start = window_start
+            self.last_forecast = self.forecast()
+            closed = True
+        
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        valid = (location_ids >= 0) & (location_ids < self.num_zones)
+        np.add.at(self.window_counts, location_ids[valid], np.asarray(trip_counts, dtype=np.float64)[valid])
+        return closed
+    
+    def to_records(self, location_ids: Optional[np.ndarray] = None,
+                   horizon_minutes: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """Forecast records for the given zones (defaults to zones with any history)."""
+        if self.last_forecast is None:
+            return []
+        
+        if location_ids is None:
+            location_ids = np.flatnonzero(self.level + self.residual_var)
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        horizon_minutes = list(horizon_minutes or (self.horizons * self.window_seconds // 60).tolist())
+        
+        mean = np.round(self.last_forecast['mean'][location_ids], 2).tolist()
+        lower = np.round(self.last_forecast['lower'][location_ids], 2).tolist()
+        upper = np.round(self.last_forecast['upper'][location_ids], 2).tolist()
+        current = np.round(self.level[location_ids], 2).tolist()
+        now = time.time()
+        
+        records = []
+        for i, location_id in enumerate(location_ids.tolist()):
+            record = {
+                'location_id': location_id,
+                'current_demand': current[i],
+                'window_seconds': self.window_seconds,
+                'horizons': [
+                    {'minutes': minutes, 'forecast': mean[i][h], 'lower': lower[i][h], 'upper': upper[i][h]}
+                    for h, minutes in enumerate(horizon_minutes)
+                ],
+                'confidence': self.confidence,
+                'timestamp': now
+            }
+            
+            # Keep the original flat fields for existing consumers
+            for h, minutes in enumerate(horizon_minutes):
+                if minutes == 60:
+                    record['forecast_1_hour'] = mean[i][h]
+                elif minutes == 120:
+                    record['forecast_2_hours'] = mean[i][h]
+            records.append(record)
+        
+        return records
+
+
+def forecaster_from_config(forecast_config: Dict[str, Any], num_zones: int) -> OnlineForecastEngine:
+    """Build a forecast engine from the forecast configuration section."""
+    window_seconds = forecast_config['window_seconds']
+    return OnlineForecastEngine(
+        num_zones=num_zones,
+        window_seconds=window_seconds,
+        season_length=max(1, forecast_config['season_seconds'] // window_seconds),
+        horizons=[max(1, minutes * 60 // window_seconds) for minutes in forecast_config['horizons_minutes']],
+        alpha=forecast_config['alpha'],
+        beta=forecast_config['beta'],
+        gamma=forecast_config['gamma'],
+        confidence=forecast_config['confidence']
+    )
+
+
+def forecast_message(records: List[Dict[str, Any]], window_start: float) -> Dict[str, Any]:
+    """Wrap one window's forecast records as a single message for the forecasts topic."""
+    return {
+        'type': 'demand_forecast',
+        'window_start': window_start,
+        'forecasts': records,
+        'timestamp': time.time()
+    }
+
+
+class ForecastSnapshot:
+    """One window's forecasts, indexed by zone, with all-zone totals precomputed."""
+    
+    def __init__(self, message: Dict[str, Any]):
+        self.window_start = message.get('window_start')
+        self.timestamp = message.get('timestamp', time.time())
+        self.by_zone = {record['location_id']: record for record in message.get('forecasts', [])}
+        
+        records = list(self.by_zone.values())
+        self.horizons_minutes = [h['minutes'] for h in records[0]['horizons']] if records else []
+        self.model_version = records[0].get('model_version') if records else None
+        self.current_total = round(sum(r['current_demand'] for r in records), 2)
+        self.totals = [
+            {
+                'minutes': minutes,
+                'forecast': round(sum(r['horizons'][h]['forecast'] for r in records), 2),
+                'lower': round(sum(r['horizons'][h]['lower'] for r in records), 2),
+                'upper': round(sum(r['horizons'][h]['upper'] for r in records), 2)
+            }
+            for h, minutes in enumerate(self.horizons_minutes)
+        ]
+
+
+class ForecastCache:
+    """Latest zone × horizon forecasts for dashboards and APIs, replaced atomically per window."""
+    
+    def __init__(self):
+        self.latest: Optional[ForecastSnapshot] = None
+        self.updates = 0
+    
+    def publish(self, message: Dict[str, Any]) -> ForecastSnapshot:
+        """Build a snapshot off to the side, then swap it in with one assignment."""
+        snapshot = ForecastSnapshot(message)
+        self.latest = snapshot
+        self.updates += 1
+        return snapshot
+    
+    def get(self, location_id: int) -> Optional[Dict[str, Any]]:
+        """Latest forecast record for a zone."""
+        snapshot = self.latest
+        return snapshot.by_zone.get(location_id) if snapshot else None
+    
+    def totals(self) -> List[Dict[str, Any]]:
+        """All-zone forecast per horizon from the latest window."""
+        snapshot = self.latest
+        return snapshot.totals if snapshot else []
@@ -0,0 +1,204 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """Splits one batch's wall time into named stages."""
+    
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._last = time.perf_counter()
+    
+    def mark(self, stage: str):
+        """Close the stage that started at the previous mark."""
+        now = time.perf_counter()
+        self.stages[stage] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+
+class BatchMetricsBuffer:
+    """Fixed-size ring buffer of per-batch progress, stage timings and state sizes."""
+    
+    def __init__(self, capacity: int = 500):
+        self.batches = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.total_batches = 0
+        self.total_records = 0
+    
+    def record(self, num_records: int, processing_time: float, batch_interval: float,
+               stages: Optional[Dict[str, float]] = None, state: Optional[Dict[str, Any]] = None,
+               scheduling_delay: float = 0.0) -> Dict[str, Any]:
+        """
+        Append one completed batch.
+        
+        Args:
+            num_records: Records in the batch
+            processing_time: Seconds spent processing the batch
+            batch_interval: Seconds of input the batch covers
+            stages: Milliseconds per processing stage
+            state: Operator state sizes and watermark lag
+            scheduling_delay: Seconds the batch waited before processing
+        
+        Returns:
+            The recorded entry
+        """
+        entry = {
+            'timestamp': time.time(),
+            'num_records': num_records,
+            'input_rows_per_second': round(num_records / batch_interval, 1) if batch_interval > 0 else 0.0,
+            'processed_rows_per_second': round(num_records / processing_time, 1) if processing_time > 0 else 0.0,
+            'batch_duration_ms': round(processing_time * 1000, 2),
+            'scheduling_delay_ms': round(scheduling_delay * 1000, 2),
+            'stages_ms': dict(stages or {}),
+            'state': dict(state or {})
+        }
+        with self.lock:
+            self.batches.append(entry)
+            self.total_batches += 1
+            self.total_records += num_records
+        return entry
+    
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Copy of the buffered batches, oldest first."""
+        with self.lock:
+            return list(self.batches)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Compact view over the buffered batches: rates, duration percentiles and the slowest stage."""
+        batches = self.snapshot()
+        if not batches:
+            return {'batches': 0, 'total_batches': self.total_batches}
+        
+        durations = sorted(b['batch_duration_ms'] for b in batches)
+        stage_totals: Dict[str, float] = {}
+        for batch in batches:
+            for stage, ms in batch['stages_ms'].items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + ms
+        stages = {stage: round(total / len(batches), 2) for stage, total in stage_totals.items()}
+        
+        n = len(batches)
+        return {
+            'batches': n,
+            'total_batches': self.total_batches,
+            'total_records': self.total_records,
+            'input_rows_per_second': round(sum(b['input_rows_per_second'] for b in batches) / n, 1),
+            'processed_rows_per_second': round(sum(b['processed_rows_per_second'] for b in batches) / n, 1),
+            'batch_duration_ms': {
+                'avg': round(sum(durations) / n, 2),
+                'p95': durations[min(n - 1, int(0.95 * n))],
+                'max': durations[-1]
+            },
+            'scheduling_delay_ms': round(sum(b['scheduling_delay_ms'] for b in batches) / n, 2),
+            'stages_ms': stages,
+            'bottleneck_stage': max(stages, key=stages.get) if stages else None,
+            'state': batches[-1]['state']
+        }
+
+
+class MetricsServer:
+    """
+    Serves the metrics buffer as JSON: /metrics (summary) and /metrics/batches (ring buffer).
+    
+    Args:
+        buffer: Per-batch metrics buffer
+        host: Interface to bind
+        port: Port to bind
+        extra: Optional callable whose result is added to /metrics under 'processor'
+    """
+    
+    def __init__(self, buffer: BatchMetricsBuffer, host: str, port: int, extra=None):
+        self.buffer = buffer
+        self.host = host
+        self.port = port
+        self.extra = extra
+        self.server = None
+    
+    def start(self):
+        """Serve from a daemon thread."""
+        buffer, extra = self.buffer, self.extra
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    if self.path.rstrip('/') == '/metrics':
+                        body = buffer.summary()
+                        if extra is not None:
+                            body['processor'] = extra()
+                    elif self.path.rstrip('/') == '/metrics/batches':
+                        body = buffer.snapshot()
+                    else:
+                        self.send_error(404)
+                        return
+                except Exception as e:
+                    logger.error(f"Error collecting metrics: {e}")
+                    self.send_error(500)
+                    return
+                
+                payload = json.dumps(body, default=str).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+        
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            logger.error(f"Failed to start metrics endpoint on {self.host}:{self.port}: {e}")
+            return
+        
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"Metrics endpoint at http://{self.host}:{self.port}/metrics")
+    
+    def stop(self):
+        """Shut the server down."""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def state_metrics(deduplicator, od_windows, **extra) -> Dict[str, Any]:
+    """
+    Sizes of the stateful operators and how far the dedup watermark trails wall time.
+    
+    Args:
+        deduplicator: Trip deduplicator
+        od_windows: OD matrix window store
+        **extra: Engine-specific state sizes
+    
+    Returns:
+        Flat dict of state sizes
+    """
+    latest = od_windows.latest()
+    return {
+        'dedup_state_size': deduplicator.state_size(),
+        'dedup_buckets': len(deduplicator.buckets),
+        'watermark_lag_seconds': round(time.time() - deduplicator.watermark, 1) if deduplicator.max_event_time else None,
+        'od_windows': len(od_windows.windows),
+        'od_pairs': latest.nnz if latest is not None else 0,
+        **extra
+    }
+
+
+def metrics_buffer_from_config(processor_config: Dict[str, Any]) -> BatchMetricsBuffer:
+    """Build the per-batch metrics buffer from the processor configuration section."""
+    return BatchMetricsBuffer(processor_config['metrics_buffer_size'])
+
+
+def metrics_server_from_config(processor_config: Dict[str, Any], buffer: BatchMetricsBuffer,
+                               extra=None) -> Optional[MetricsServer]:
+    """Build the metrics endpoint, or None when PROCESSOR_METRICS_PORT is 0."""
+    if not processor_config['metrics_port']:
+        return None
+    return MetricsServer(buffer, processor_config['metrics_host'], processor_config['metrics_port'], extra)
@@ -0,0 +1,364 @@
+import json
+import time
+import logging
+from typing import Dict, Any, List
+import numpy as np
+from kafka import KafkaConsumer
+from src.utils.config import config
+from src.collectors.kafka_producer import TaxiDataProducer
+from src.processors.od_matrix import ODMatrixWindows, aggregate_pairs
+from src.processors.sketches import ZoneSketch
+from src.utils.geo_grid import grid_from_config
+from src.utils.zone_lookup import zone_lookup_from_config
+from src.processors.rate_controller import controller_from_config
+from src.processors.stages import detect_anomalies
+from src.processors.forecasting import forecaster_from_config, forecast_message, ForecastCache
+from src.models.model_store import scorer_from_config
+from src.processors.deduplicator import deduplicator_from_config
+from src.processors.sinks import fanout_from_config
+from src.processors.metrics import StageTimer, state_metrics, metrics_buffer_from_config, metrics_server_from_config
+
+logger = logging.getLogger(__name__)
+
+
+def trip_columns(records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Convert trip records into typed column arrays.
+    
+    Args:
+        records: Trip records; API records carry numeric fields as strings
+    
+    Returns:
+        Column arrays; missing zones and coordinates are 0, missing fares,
+        distances and passenger counts are NaN
+    """
+    n = len(records)
+    
+    def column(field, missing=0.0):
+        values = (r.get(field) for r in records)
+        return np.fromiter(
+            (missing if value is None or value == '' else value for value in values), dtype=np.float64, count=n
+        )
+    
+    return {
+        'pickup_location_id': column('pickup_location_id').astype(np.int64),
+        'dropoff_location_id': column('dropoff_location_id').astype(np.int64),
+        'passenger_count': column('passenger_count', np.nan),
+        'trip_distance': column('trip_distance', np.nan),
+        'fare_amount': column('fare_amount', np.nan),
+        'pickup_latitude': column('pickup_latitude'),
+        'pickup_longitude': column('pickup_longitude')
+    }
+
+
+def aggregate_zones(columns: Dict[str, np.ndarray], num_zones: int) -> Dict[str, np.ndarray]:
+    """
+    Aggregate a columnar batch by pickup zone with bincount kernels.
+    
+    Sums treat missing measures as 0 and averages divide by the number of
+    trips that have the measure, matching Spark's sum() and avg().
+    
+    Args:
+        columns: Batch columns from trip_columns
+        num_zones: Zone id upper bound
+    
+    Returns:
+        Per-zone aggregate columns for the zones with trips
+    """
+    zones = columns['pickup_location_id']
+    valid = (zones > 0) & (zones < num_zones)
+    if not valid.all():
+        zones = zones[valid]
+        columns = {name: values[valid] for name, values in columns.items()}
+    
+    trip_count = np.bincount(zones, minlength=num_zones)
+    location_ids = np.flatnonzero(trip_count)
+    aggregates = {
+        'pickup_location_id': location_ids,
+        'trip_count': trip_count[location_ids]
+    }
+    
+    for field, name in [('fare_amount', 'fare'), ('trip_distance', 'distance'), ('passenger_count', 'passengers')]:
+        values = columns[field]
+        present = ~np.isnan(values)
+        totals = np.bincount(zones, weights=np.where(present, values, 0.0), minlength=num_zones)[location_ids]
+        counts = np.bincount(zones, weights=present, minlength=num_zones)[location_ids]
+        aggregates[f'total_{name}'] = totals
+        aggregates[f'avg_{name}'] = np.divide(totals, counts, out=np.full(len(totals), np.nan), where=counts > 0)
+    
+    return aggregates
+
+
+def sketch_zones(records: List[Dict[str, Any]], zones: np.ndarray, num_zones: int) -> Dict[int, ZoneSketch]:
+    """
+    Build one ZoneSketch per pickup zone, keyed like the aggregates.
+    
+    Args:
+        records: Trip records, in the order trip_columns saw them
+        zones: Pickup zone column from trip_columns
+        num_zones: Zone id upper bound
+    
+    Returns:
+        Sketch per zone with trips
+    """
+    sketches: Dict[int, ZoneSketch] = {}
+    for zone, record in zip(zones.tolist(), records):
+        if not 0 < zone < num_zones:
+            continue
+        sketch = sketches.get(zone)
+        if sketch is None:
+            sketch = sketches[zone] = ZoneSketch()
+        sketch.add_trip(record)
+    return sketches
+
+
+class NumpyStreamProcessor:
+    """Single-node stream processor that aggregates columnar micro-batches with NumPy."""
+    
+    def __init__(self):
+        self.processor_config = config.get_processor_config()
+        self.kafka_config = config.get_kafka_config()
+        self.grid_config = config.get_grid_config()
+        
+        self.num_zones = self.processor_config['num_zones']
+        
+        # Sparse origin-destination matrices per tumbling window
+        self.od_windows = ODMatrixWindows(
+            window_seconds=self.processor_config['od_window_seconds'],
+            max_windows=self.processor_config['od_max_windows']
+        )
+        
+        # Hierarchical grid for binning raw pickup coordinates
+        self.grid = grid_from_config(self.grid_config)
+        
+        # Zone dimension table (borough, name, centroid), reloaded on file change
+        self.zone_lookup = zone_lookup_from_config(self.processor_config)
+        
+        # Holt-Winters state for every zone, updated once per window
+        self.forecast_config = config.get_forecast_config()
+        self.forecaster = forecaster_from_config(self.forecast_config, self.processor_config['num_zones'])
+        
+        # Offline-trained model from the versioned store, if one exists
+        self.model_scorer = scorer_from_config(self.forecast_config, self.processor_config['num_zones'])
+        
+        # Latest forecasts for O(1) reads, swapped once per window
+        self.forecast_cache = ForecastCache()
+        
+        # Drops re-published trip_ids before aggregation
+        self.deduplicator = deduplicator_from_config(self.processor_config)
+        
+        # Adapts trigger interval and batch size to the latency target
+        self.controller = controller_from_config(self.processor_config)
+        
+        # Per-batch progress, stage timings and state sizes, served over HTTP
+        self.batch_metrics = metrics_buffer_from_config(self.processor_config)
+        self.metrics_server = metrics_server_from_config(self.processor_config, self.batch_metrics, self.get_metrics)
+        self.stage_timings = {}
+        
+        self.running = False
+        self.consumer = None
+        self.producer = None
+        self.sinks = None
+        self._initialize_kafka()
+    
+    def _initialize_kafka(self):
+        """Initialize Kafka consumer and producer."""
+        try:
+            self.consumer = KafkaConsumer(
+                self.kafka_config['topic_taxi_data'],
+                bootstrap_servers=self.kafka_config['bootstrap_servers'],
+                value_deserializer=lambda x: json.loads(x.decode('utf-8')),
+                auto_offset_reset='latest',
+                enable_auto_commit=True,
+                group_id='numpy_processor'
+            )
+            self.producer = TaxiDataProducer()
+            self.sinks = fanout_from_config(self.kafka_config, self.processor_config, self.producer)
+            logger.info("NumPy stream processor initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize NumPy stream processor: {e}")
+            raise
+    
+    def to_columns(self, records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Convert a list of trip records into typed column arrays."""
+        return trip_columns(records)
+    
+    def aggregate_by_location(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Aggregate a columnar batch by pickup zone with bincount kernels."""
+        return aggregate_zones(columns, self.num_zones)
+    
+    def sketch_by_location(self, records: List[Dict[str, Any]], columns: Dict[str, np.ndarray]) -> Dict[int, ZoneSketch]:
+        """Per-zone quantile and distinct-count sketches for a batch."""
+        return sketch_zones(records, columns['pickup_location_id'], self.num_zones)
+    
+    def enrich(self, aggregates: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Add zone attributes to the aggregates by indexing the dimension arrays."""
+        self.zone_lookup.refresh()
+        aggregates.update(self.zone_lookup.enrich_columns(aggregates['pickup_location_id']))
+        return aggregates
+    
+    def detect_anomalies(self, aggregates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Detect demand and fare anomalies across all zones at once."""
+        return detect_anomalies(aggregates)
+    
+    def calculate_demand_forecast(self, aggregates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Feed batch demand to the forecaster; return forecasts when a window closes."""
+        if not self.forecaster.observe(aggregates['pickup_location_id'], aggregates['trip_count']):
+            return []
+        
+        forecasts = self.forecaster.to_records()
+        forecasts = self.model_scorer.score_window(
+            self.forecaster.last_window, self.forecaster.window_start, forecasts
+        )
+        logger.info(f"Demand forecast refreshed for {len(forecasts)} locations")
+        return forecasts
+    
+    def publish_forecast(self, forecasts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Swap a window's forecasts into the cache and return the topic message."""
+        message = forecast_message(forecasts, self.forecaster.window_start)
+        self.forecast_cache.publish(message)
+        return message
+    
+    def update_od_matrix(self, columns: Dict[str, np.ndarray]):
+        """Fold a batch's zone-to-zone flows into the current window's OD matrix."""
+        origins, destinations, trip_counts, total_fares = aggregate_pairs(
+            columns['pickup_location_id'],
+            columns['dropoff_location_id'],
+            np.nan_to_num(columns['fare_amount']),
+            self.num_zones
+        )
+        return self.od_windows.update(
+            origins.tolist(), destinations.tolist(), trip_counts.tolist(), total_fares.tolist()
+        )
+    
+    def to_records(self, aggregates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Convert columnar aggregates into JSON-ready records."""
+        names = list(aggregates.keys())
+        columns = [aggregates[name].tolist() for name in names]
+        return [dict(zip(names, row)) for row in zip(*columns)]
+    
+    def process_batch(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run all stages on one micro-batch of trip records, timing each stage."""
+        timer = StageTimer()
+        records = self.deduplicator.filter(records)
+        timer.mark('deduplicate')
+        columns = self.to_columns(records)
+        timer.mark('columns')
+        aggregates = self.enrich(self.aggregate_by_location(columns))
+        timer.mark('aggregate')
+        sketches = self.sketch_by_location(records, columns)
+        timer.mark('sketches')
+        anomalies = self.detect_anomalies(aggregates)
+        timer.mark('anomalies')
+        forecasts = self.calculate_demand_forecast(aggregates)
+        timer.mark('forecast')
+        od_matrix = self.update_od_matrix(columns)
+        timer.mark('od_matrix')
+        grid_cells = self.grid.bin_points(
+            columns['pickup_latitude'],
+            columns['pickup_longitude'],
+            self.grid_config['resolutions'],
+            weights=np.nan_to_num(columns['fare_amount'])
+        )
+        timer.mark('grid')
+        
+        # Same record shape as the Spark engine: quantile and distinct-count
+        # summaries plus the serialized sketches for merging downstream
+        aggregated_data = self.to_records(aggregates)
+        for data in aggregated_data:
+            sketch = sketches.get(data['pickup_location_id'])
+            if sketch is not None:
+                data.update(sketch.summary())
+                data['sketches'] = sketch.to_dict()
+        
+        result = {
+            'aggregates': aggregated_data,
+            'anomalies': anomalies,
+            'forecast': self.publish_forecast(forecasts) if forecasts else None,
+            'od_matrix': od_matrix.to_coo(),
+            'grid_cells': self.grid.to_records(grid_cells)
+        }
+        timer.mark('serialize')
+        
+        self.stage_timings = timer.stages
+        return result
+    
+    def _consumer_lag(self) -> int:
+        """Records still waiting in the assigned partitions."""
+        partitions = list(self.consumer.assignment())
+        if not partitions:
+            return 0
+        
+        end_offsets = self.consumer.end_offsets(partitions)
+        return sum(max(0, end_offsets[tp] - self.consumer.position(tp)) for tp in partitions)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Rate controller decisions, deduplication state and sink timings."""
+        return {
+            'rate_controller': self.controller.metrics(),
+            'deduplication': self.deduplicator.metrics(),
+            'sinks': self.sinks.metrics()
+        }
+    
+    def start_streaming(self):
+        """Consume Kafka in micro-batches until stopped."""
+        self.running = True
+        logger.info("Starting NumPy stream processor...")
+        if self.metrics_server:
+            self.metrics_server.start()
+        last_trigger = 0.0
+        
+        try:
+            while self.running:
+                # Wait in poll for whatever is left of the controller's interval,
+                # so an idle trigger takes one interval rather than two
+                remaining = self.controller.interval - (time.time() - last_trigger)
+                polled = self.consumer.poll(
+                    timeout_ms=max(0, int(remaining * 1000)),
+                    max_records=self.controller.max_records
+                )
+                last_trigger = time.time()
+                records = [message.value for messages in polled.values() for message in messages]
+                if not records:
+                    continue
+                
+                started = time.perf_counter()
+                result = self.process_batch(records)
+                
+                timings = self.sinks.write(result)
+                
+                processing_time = time.perf_counter() - started
+                metrics = self.controller.update(processing_time, len(records), self._consumer_lag())
+                
+                self.batch_metrics.record(
+                    len(records), processing_time, self.controller.interval,
+                    {**self.stage_timings, 'sinks': round(sum(timings.values()), 2)},
+                    state_metrics(self.deduplicator, self.od_windows)
+                )
+                
+                logger.info(
+                    f"Processed {len(records)} trips into {len(result['aggregates'])} "
+                    f"location aggregates in {processing_time * 1000:.1f} ms"
+                )
+                logger.debug(f"Sink timings (ms): {timings}")
+                logger.debug(f"Rate controller: {metrics}")
+        
+        except Exception as e:
+            logger.error(f"Error in NumPy stream processing: {e}")
+            raise
+        finally:
+            self.running = False
+    
+    def stop_streaming(self):
+        """Stop the stream processor."""
+        self.running = False
+        
+        if self.metrics_server:
+            self.metrics_server.stop()
+        
+        if self.consumer:
+            self.consumer.close()
+            logger.info("NumPy processor consumer stopped")
+        
+        if self.producer:
+            self.producer.close()
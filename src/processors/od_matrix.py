@@ -0,0 +1,156 @@
+import time
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+import numpy as np
+
+
+class ODMatrix:
+    """Sparse origin-destination trip count/fare matrix for one time window."""
+    
+    def __init__(self, window_start: float):
+        self.window_start = window_start
+        # Each cell is a [trip_count, total_fare] list shared by both indexes,
+        # so lookups by origin or destination cost O(row nnz)
+        self._by_origin: Dict[int, Dict[int, List[float]]] = {}
+        self._by_destination: Dict[int, Dict[int, List[float]]] = {}
+        self.nnz = 0
+    
+    def update(self, origins: Iterable[int], destinations: Iterable[int],
+               trip_counts: Iterable[int], total_fares: Iterable[float]):
+        """Add pre-aggregated (origin, destination) counts and fares; pairs missing a zone are skipped."""
+        for origin, destination, trip_count, total_fare in zip(origins, destinations, trip_counts, total_fares):
+            if origin is None or destination is None:
+                continue
+            
+            row = self._by_origin.get(origin)
+            if row is None:
+                row = self._by_origin[origin] = {}
+            
+            cell = row.get(destination)
+            if cell is None:
+                cell = row[destination] = [0, 0.0]
+                self._by_destination.setdefault(destination, {})[origin] = cell
+                self.nnz += 1
+            
+            cell[0] += trip_count
+            cell[1] += total_fare
+    
+    def by_origin(self, origin: int) -> Dict[int, Tuple[int, float]]:
+        """Trip counts and fares from one origin, keyed by destination."""
+        return {d: (c[0], c[1]) for d, c in self._by_origin.get(origin, {}).items()}
+    
+    def by_destination(self, destination: int) -> Dict[int, Tuple[int, float]]:
+        """Trip counts and fares into one destination, keyed by origin."""
+        return {o: (c[0], c[1]) for o, c in self._by_destination.get(destination, {}).items()}
+    
+    def to_coo(self) -> Dict[str, Any]:
+        """Serialize as a COO message (parallel arrays of non-zero cells)."""
+        origins, destinations, trip_counts, total_fares = [], [], [], []
+        for origin in sorted(self._by_origin):
+            row = self._by_origin[origin]
+            for destination in sorted(row):
+                cell = row[destination]
+                origins.append(origin)
+                destinations.append(destination)
+                trip_counts.append(cell[0])
+                total_fares.append(round(cell[1], 2))
+        
+        return {
+            'type': 'od_matrix',
+            'format': 'coo',
+            'window_start': self.window_start,
+            'nnz': self.nnz,
+            'origins': origins,
+            'destinations': destinations,
+            'trip_counts': trip_counts,
+            'total_fares': total_fares
+        }
+    
+    def to_csr(self) -> Dict[str, Any]:
+        """Serialize as a CSR message over the non-empty origin rows."""
+        row_ids, indptr, indices, trip_counts, total_fares = [], [0], [], [], []
+        for origin in sorted(self._by_origin):
+            row = self._by_origin[origin]
+            row_ids.append(origin)
+            for destination in sorted(row):
+                cell = row[destination]
+                indices.append(destination)
+                trip_counts.append(cell[0])
+                total_fares.append(round(cell[1], 2))
+            indptr.append(len(indices))
+        
+        return {
+            'type': 'od_matrix',
+            'format': 'csr',
+            'window_start': self.window_start,
+            'nnz': self.nnz,
+            'origins': row_ids,
+            'indptr': indptr,
+            'destinations': indices,
+            'trip_counts': trip_counts,
+            'total_fares': total_fares
+        }
+    
+    @classmethod
+    def from_coo(cls, message: Dict[str, Any]) -> 'ODMatrix':
+        """Rebuild a matrix from a `to_coo` message."""
+        matrix = cls(message['window_start'])
+        matrix.update(message['origins'], message['destinations'],
+                      message['trip_counts'], message['total_fares'])
+        return matrix
+
+
+class ODMatrixWindows:
+    """Tumbling-window store of OD matrices with bounded retention."""
+    
+    def __init__(self, window_seconds: int = 300, max_windows: int = 12):
+        self.window_seconds = window_seconds
+        self.max_windows = max_windows
+        self.windows: Dict[float, ODMatrix] = {}
+    
+    def window_start(self, timestamp: Optional[float] = None) -> float:
+        """Start of the window containing timestamp (defaults to now)."""
+        timestamp = time.time() if timestamp is None else timestamp
+        return timestamp - timestamp % self.window_seconds
+    
+    def update(self, origins: Iterable[int], destinations: Iterable[int],
+               trip_counts: Iterable[int], total_fares: Iterable[float],
+               timestamp: Optional[float] = None) -> ODMatrix:
+        """Apply one micro-batch of pair aggregates to its window."""
+        start = self.window_start(timestamp)
+        matrix = self.windows.get(start)
+        if matrix is None:
+            matrix = self.windows[start] = ODMatrix(start)
+            self._evict()
+        
+        matrix.update(origins, destinations, trip_counts, total_fares)
+        return matrix
+    
+    def get(self, window_start: float) -> Optional[ODMatrix]:
+        """Matrix for a window, if still retained."""
+        return self.windows.get(window_start)
+    
+    def latest(self) -> Optional[ODMatrix]:
+        """Most recent window's matrix."""
+        # Copied, as metrics read this from another thread than the batches
+        windows = dict(self.windows)
+        if not windows:
+            return None
+        return windows[max(windows)]
+    
+    def _evict(self):
+        """Drop the oldest windows beyond the retention limit."""
+        for start in sorted(self.windows)[:-self.max_windows]:
+            del self.windows[start]
+
+
+def aggregate_pairs(origins: np.ndarray, destinations: np.ndarray, fares: np.ndarray,
+                    num_zones: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Collapse a columnar batch into unique (origin, destination) count/fare sums."""
+    valid = (origins > 0) & (origins < num_zones) & (destinations > 0) & (destinations < num_zones)
+    pair_keys = origins[valid] * num_zones + destinations[valid]
+    
+    unique_keys, inverse = np.unique(pair_keys, return_inverse=True)
+    trip_counts = np.bincount(inverse, minlength=len(unique_keys))
+    total_fares = np.bincount(inverse, weights=fares[valid], minlength=len(unique_keys))
+    
+    return unique_keys // num_zones, unique_keys % num_zones, trip_counts, total_fares
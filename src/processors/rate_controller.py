@@ -0,0 +1,122 @@
+import time
+from typing import Dict, Any, Optional
+
+
+class AdaptiveTriggerController:
+    """Adjusts micro-batch trigger interval and batch size to hold a latency SLO."""
+    
+    def __init__(self, target_latency: float, min_interval: float, max_interval: float,
+                 min_records: int, max_records: int, initial_interval: Optional[float] = None,
+                 smoothing: float = 0.3):
+        self.target_latency = target_latency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.min_records = min_records
+        self.max_records_limit = max_records
+        
+        self.interval = self._clamp(initial_interval or min_interval, min_interval, max_interval)
+        self.max_records = max_records
+        self.smoothing = smoothing
+        
+        # Smoothed observations
+        self.processing_time = 0.0
+        self.throughput = 0.0  # records per second of processing time
+        self.consumer_lag = 0
+        self.latency_estimate = 0.0
+        
+        self.decisions = {'speed_up': 0, 'slow_down': 0, 'hold': 0}
+        self.last_decision = 'hold'
+        self.last_update = None
+    
+    @staticmethod
+    def _clamp(value, low, high):
+        return max(low, min(high, value))
+    
+    def _smooth(self, previous: float, value: float) -> float:
+        if previous == 0.0:
+            return value
+        return previous + self.smoothing * (value - previous)
+    
+    def update(self, processing_time: float, batch_records: int, consumer_lag: int = 0) -> Dict[str, Any]:
+        """
+        Record one completed batch and pick the next interval and batch size.
+        
+        Args:
+            processing_time: Seconds spent processing the batch
+            batch_records: Records in the batch
+            consumer_lag: Records still waiting in the source after the batch
+        
+        Returns:
+            The controller's metrics after the decision
+        """
+        self.processing_time = self._smooth(self.processing_time, processing_time)
+        if processing_time > 0 and batch_records > 0:
+            self.throughput = self._smooth(self.throughput, batch_records / processing_time)
+        self.consumer_lag = consumer_lag
+        
+        # A record arriving now waits for the trigger, the backlog ahead of
+        # it and its own batch's processing time
+        backlog_time = consumer_lag / self.throughput if self.throughput else 0.0
+        self.latency_estimate = self.interval + backlog_time + self.processing_time
+        
+        if self.latency_estimate > self.target_latency or self.processing_time > self.interval:
+            # Falling behind: trigger sooner and take bigger bites of the
+            # backlog, but keep each batch within the latency budget
+            self.interval = self._clamp(
+                max(self.interval * 0.5, self.processing_time), self.min_interval, self.max_interval
+            )
+            if consumer_lag > 0:
+                self.max_records = int(self._clamp(
+                    self.max_records * 2, self.min_records, self._records_budget()
+                ))
+            decision = 'speed_up'
+        elif self.latency_estimate < 0.5 * self.target_latency and consumer_lag == 0:
+            # Plenty of headroom: batch a little longer for efficiency
+            self.interval = self._clamp(
+                self.interval + 0.1 * self.target_latency, self.min_interval, self.max_interval
+            )
+            self.max_records = int(self._clamp(
+                self.max_records, self.min_records, self._records_budget()
+            ))
+            decision = 'slow_down'
+        else:
+            decision = 'hold'
+        
+        self.decisions[decision] += 1
+        self.last_decision = decision
+        self.last_update = time.time()
+        return self.metrics()
+    
+    def _records_budget(self) -> int:
+        """Largest batch that can be processed within half the latency target."""
+        if not self.throughput:
+            return self.max_records_limit
+        budget = int(self.throughput * self.target_latency * 0.5)
+        return int(self._clamp(budget, self.min_records, self.max_records_limit))
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Current decisions and the observations behind them."""
+        return {
+            'trigger_interval': round(self.interval, 3),
+            'max_records_per_batch': self.max_records,
+            'target_latency': self.target_latency,
+            'latency_estimate': round(self.latency_estimate, 3),
+            'processing_time': round(self.processing_time, 4),
+            'throughput': round(self.throughput, 1),
+            'consumer_lag': self.consumer_lag,
+            'last_decision': self.last_decision,
+            'decisions': dict(self.decisions),
+            'last_update': self.last_update
+        }
+
+
+def controller_from_config(processor_config: Dict[str, Any]) -> AdaptiveTriggerController:
+    """Build a controller from the processor configuration section."""
+    return AdaptiveTriggerController(
+        target_latency=processor_config['target_latency'],
+        min_interval=processor_config['min_batch_interval'],
+        max_interval=processor_config['max_batch_interval'],
+        min_records=processor_config['min_records'],
+        max_records=processor_config['max_records'],
+        initial_interval=processor_config['batch_interval']
+    )
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+
+class KafkaSink:
+    """Sends one field of a batch result to a Kafka topic."""
+    
+    def __init__(self, name: str, producer, topic: str, field: str, key_prefix: str):
+        self.name = name
+        self.producer = producer
+        self.topic = topic
+        self.field = field
+        self.key_prefix = key_prefix
+    
+    def write(self, batch: Dict[str, Any]) -> int:
+        records = batch.get(self.field)
+        if not records:
+            return 0
+        if isinstance(records, dict):
+            records = [records]
+        # Raising lets SinkFanout count the failure instead of the records
+        if not self.producer.send_records(self.topic, records, self.key_prefix):
+            raise RuntimeError(f"Failed to send {len(records)} records to {self.topic}")
+        return len(records)
+
+
+class FileSink:
+    """Appends one field of a batch result as JSON lines, one file per day."""
+    
+    def __init__(self, name: str, directory: str, field: str):
+        self.name = name
+        self.directory = os.path.join(directory, field)
+        self.field = field
+        os.makedirs(self.directory, exist_ok=True)
+    
+    def write(self, batch: Dict[str, Any]) -> int:
+        records = batch.get(self.field)
+        if not records:
+            return 0
+        if isinstance(records, dict):
+            records = [records]
+        
+        path = os.path.join(self.directory, f"{datetime.now():%Y-%m-%d}.jsonl")
+        with open(path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + '\n')
+        return len(records)
+
+
+class ParquetSink:
+    """Appends a batch's trips DataFrame to a Parquet dataset."""
+    
+    def __init__(self, name: str, path: str, field: str = 'trips'):
+        self.name = name
+        self.path = path
+        self.field = field
+    
+    def write(self, batch: Dict[str, Any]) -> int:
+        df = batch.get(self.field)
+        if df is None:
+            return 0
+        df.write.mode('append').partitionBy('pickup_year', 'pickup_month').parquet(self.path)
+        return 1
+
+
+class SinkFanout:
+    """Writes each batch result to every registered sink and times each write."""
+    
+    def __init__(self):
+        self.sinks: List[Any] = []
+        self.stats: Dict[str, Dict[str, Any]] = {}
+    
+    def register(self, sink):
+        """Add a sink; it receives every batch from the next write on."""
+        self.sinks.append(sink)
+        self.stats[sink.name] = {'writes': 0, 'records': 0, 'errors': 0, 'total_ms': 0.0, 'last_ms': 0.0}
+    
+    def write(self, batch: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Fan a batch result out to all sinks; one failing sink doesn't stop the others.
+        
+        Args:
+            batch: Batch outputs keyed by field (aggregates, anomalies, ...)
+        
+        Returns:
+            Milliseconds spent in each sink for this batch
+        """
+        timings = {}
+        for sink in self.sinks:
+            stats = self.stats[sink.name]
+            started = time.perf_counter()
+            try:
+                stats['records'] += sink.write(batch)
+                stats['writes'] += 1
+            except Exception as e:
+                stats['errors'] += 1
+                logger.error(f"Error writing to sink {sink.name}: {e}")
+            elapsed = (time.perf_counter() - started) * 1000
+            stats['last_ms'] = round(elapsed, 2)
+            stats['total_ms'] += elapsed
+            timings[sink.name] = round(elapsed, 2)
+        
+        logger.debug(f"Sink timings (ms): {timings}")
+        return timings
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Per-sink write counts and timings."""
+        return {
+            name: {**stats, 'total_ms': round(stats['total_ms'], 2)}
+            for name, stats in self.stats.items()
+        }
+
+
+def fanout_from_config(kafka_config: Dict[str, Any], processor_config: Dict[str, Any], producer) -> SinkFanout:
+    """Register the Kafka topic sinks plus the optional file store."""
+    fanout = SinkFanout()
+    fanout.register(KafkaSink('aggregates', producer, kafka_config['topic_aggregated'], 'aggregates', 'agg'))
+    fanout.register(KafkaSink('anomalies', producer, kafka_config['topic_anomalies'], 'anomalies', 'anomaly'))
+    fanout.register(KafkaSink('forecasts', producer, kafka_config['topic_forecasts'], 'forecast', 'forecast'))
+    fanout.register(KafkaSink('od_matrix', producer, kafka_config['topic_od_matrix'], 'od_matrix', 'od'))
+    fanout.register(KafkaSink('grid', producer, kafka_config['topic_grid'], 'grid_cells', 'grid'))
+    
+    if processor_config['file_sink_path']:
+        fanout.register(FileSink('file_aggregates', processor_config['file_sink_path'], 'aggregates'))
+    
+    return fanout
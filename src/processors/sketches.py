@@ -0,0 +1,276 @@
+import base64
+import hashlib
+import math
+from datetime import datetime
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class TDigest:
+    """Merging t-digest for streaming quantile estimation in bounded memory."""
+    
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.centroids: List[List[float]] = []  # [mean, weight] sorted by mean
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[List[float]] = []
+        self._buffer_limit = int(compression * 5)
+    
+    def add(self, value: float, weight: float = 1.0):
+        """Add a value to the digest."""
+        if value is None or weight <= 0:
+            return
+        value = float(value)
+        if math.isnan(value):
+            return
+        
+        self._buffer.append([value, weight])
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+    
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """Merge another digest into this one and return self."""
+        if other.count == 0:
+            return self
+        
+        self._buffer.extend([c[0], c[1]] for c in other.centroids)
+        self._buffer.extend([c[0], c[1]] for c in other._buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+    
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+    
+    def _k_inverse(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+    
+    def _compress(self):
+        """Fold buffered values into the centroid list."""
+        if not self._buffer:
+            return
+        
+        items = sorted(self.centroids + self._buffer, key=lambda c: c[0])
+        self._buffer = []
+        total = self.count
+        
+        merged = [list(items[0])]
+        weight_so_far = 0.0
+        weight_limit = total * self._k_inverse(self._k(0.0) + 1)
+        
+        for mean, weight in items[1:]:
+            current = merged[-1]
+            if weight_so_far + current[1] + weight <= weight_limit:
+                new_weight = current[1] + weight
+                current[0] += (mean - current[0]) * weight / new_weight
+                current[1] = new_weight
+            else:
+                weight_so_far += current[1]
+                weight_limit = total * self._k_inverse(self._k(weight_so_far / total) + 1)
+                merged.append([mean, weight])
+        
+        self.centroids = merged
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the value at quantile q (0..1)."""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        
+        target = q * self.count
+        cumulative = 0.0
+        previous_mean, previous_center = self.min, 0.0
+        
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                if span <= 0:
+                    return mean
+                return previous_mean + (mean - previous_mean) * (target - previous_center) / span
+            cumulative += weight
+            previous_mean, previous_center = mean, center
+        
+        span = self.count - previous_center
+        if span <= 0:
+            return self.max
+        return previous_mean + (self.max - previous_mean) * (target - previous_center) / span
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the digest to a JSON-friendly dict."""
+        self._compress()
+        return {
+            'compression': self.compression,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'centroids': [[round(m, 4), w] for m, w in self.centroids]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TDigest':
+        """Rebuild a digest from `to_dict` output."""
+        digest = cls(compression=data.get('compression', 100))
+        digest.centroids = [list(c) for c in data.get('centroids', [])]
+        digest.count = float(sum(c[1] for c in digest.centroids))
+        if digest.count:
+            digest.min = data['min']
+            digest.max = data['max']
+        return digest
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with mergeable fixed-size registers."""
+    
+    def __init__(self, precision: int = 10):
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+    
+    def add(self, value: Any):
+        """Add a value to the counter."""
+        if value is None:
+            return
+        
+        hashed = int.from_bytes(
+            hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big'
+        )
+        index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rest = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - rest.bit_length() + 1
+        
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Merge another counter (same precision) into this one and return self."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+    
+    def count(self) -> int:
+        """Estimate the number of distinct values added."""
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        
+        return int(round(estimate))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the counter to a JSON-friendly dict."""
+        return {
+            'precision': self.precision,
+            'registers': base64.b64encode(bytes(self.registers)).decode('ascii')
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HyperLogLog':
+        """Rebuild a counter from `to_dict` output."""
+        hll = cls(precision=data['precision'])
+        hll.registers = bytearray(base64.b64decode(data['registers']))
+        return hll
+
+
+class ZoneSketch:
+    """Per-zone quantile and distinct-count sketches for one or more windows."""
+    
+    QUANTILE_FIELDS = ('fare_amount', 'trip_distance', 'trip_duration')
+    DISTINCT_FIELDS = ('vendor_id', 'trip_id')
+    
+    def __init__(self, compression: float = 100, precision: int = 10):
+        self.digests = {field: TDigest(compression) for field in self.QUANTILE_FIELDS}
+        self.distinct = {field: HyperLogLog(precision) for field in self.DISTINCT_FIELDS}
+    
+    def add_trip(self, trip):
+        """Add a trip record (dict or Spark Row) to the sketches."""
+        self.digests['fare_amount'].add(trip['fare_amount'])
+        self.digests['trip_distance'].add(trip['trip_distance'])
+        self.digests['trip_duration'].add(
+            trip_duration_minutes(trip['pickup_datetime'], trip['dropoff_datetime'])
+        )
+        self.distinct['vendor_id'].add(trip['vendor_id'])
+        self.distinct['trip_id'].add(trip['trip_id'])
+    
+    def merge(self, other: 'ZoneSketch') -> 'ZoneSketch':
+        """Merge another zone sketch into this one and return self."""
+        for field, digest in self.digests.items():
+            digest.merge(other.digests[field])
+        for field, hll in self.distinct.items():
+            hll.merge(other.distinct[field])
+        return self
+    
+    def summary(self) -> Dict[str, Any]:
+        """Flat p50/p90/p99 and distinct-count fields for an aggregate record."""
+        result = {}
+        for field, digest in self.digests.items():
+            for q in QUANTILES:
+                value = digest.quantile(q)
+                result[f"{field}_p{int(q * 100)}"] = round(value, 2) if value is not None else None
+        result['distinct_vendors'] = self.distinct['vendor_id'].count()
+        result['distinct_trips'] = self.distinct['trip_id'].count()
+        return result
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize all sketches to a JSON-friendly dict."""
+        return {
+            'digests': {field: d.to_dict() for field, d in self.digests.items()},
+            'distinct': {field: h.to_dict() for field, h in self.distinct.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ZoneSketch':
+        """Rebuild a zone sketch from `to_dict` output."""
+        sketch = cls()
+        sketch.digests = {f: TDigest.from_dict(d) for f, d in data['digests'].items()}
+        sketch.distinct = {f: HyperLogLog.from_dict(h) for f, h in data['distinct'].items()}
+        return sketch
+
+
+def trip_duration_minutes(pickup_datetime: Optional[str], dropoff_datetime: Optional[str]) -> Optional[float]:
+    """Trip duration in minutes from ISO timestamps, or None if unavailable."""
+    if not pickup_datetime or not dropoff_datetime:
+        return None
+    try:
+        pickup = datetime.fromisoformat(pickup_datetime.replace('Z', '+00:00'))
+        dropoff = datetime.fromisoformat(dropoff_datetime.replace('Z', '+00:00'))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    
+    duration = (dropoff - pickup).total_seconds() / 60
+    return duration if duration >= 0 else None
+
+
+def sketch_partition(trips: Iterable) -> Iterator[Tuple[int, ZoneSketch]]:
+    """Build one ZoneSketch per pickup zone for a partition of trips."""
+    sketches: Dict[int, ZoneSketch] = {}
+    for trip in trips:
+        location_id = trip['pickup_location_id']
+        if location_id is None:
+            continue
+        sketch = sketches.get(location_id)
+        if sketch is None:
+            sketch = sketches[location_id] = ZoneSketch()
+        sketch.add_trip(trip)
+    return iter(sketches.items())
+
+
+def merge_sketches(left: ZoneSketch, right: ZoneSketch) -> ZoneSketch:
+    """Reduce function for combining partial zone sketches."""
+    return left.merge(right)
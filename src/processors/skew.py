@@ -0,0 +1,70 @@
+import logging
+from typing import Dict, Any, List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class HotKeyTracker:
+    """Finds zones that carry an outsized share of trips from decayed running counts."""
+    
+    def __init__(self, num_zones: int, hot_share: float = 0.05, max_hot_keys: int = 16,
+                 decay: float = 0.8, salt_buckets: int = 8):
+        self.num_zones = num_zones
+        self.hot_share = hot_share
+        self.max_hot_keys = max_hot_keys
+        self.decay = decay
+        self.salt_buckets = salt_buckets
+        
+        self.counts = np.zeros(num_zones)
+        self.hot: List[int] = []
+    
+    def update(self, location_ids: np.ndarray, trip_counts: np.ndarray) -> List[int]:
+        """
+        Fold one batch's per-zone counts into the running counts.
+        
+        Args:
+            location_ids: Zones present in the batch
+            trip_counts: Trips per zone in the batch
+        
+        Returns:
+            Zones to salt in the next batch
+        """
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        valid = (location_ids >= 0) & (location_ids < self.num_zones)
+        
+        self.counts *= self.decay
+        np.add.at(self.counts, location_ids[valid], np.asarray(trip_counts, dtype=np.float64)[valid])
+        
+        total = self.counts.sum()
+        if total == 0:
+            self.hot = []
+            return self.hot
+        
+        # Busiest zones first, keeping only those above the share threshold
+        candidates = np.argsort(self.counts)[::-1][:self.max_hot_keys]
+        hot = candidates[self.counts[candidates] / total >= self.hot_share].tolist()
+        
+        if hot != self.hot:
+            logger.info(f"Hot zones for salted aggregation: {hot}")
+        self.hot = hot
+        return self.hot
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Current hot zones and their share of recent trips."""
+        total = self.counts.sum()
+        return {
+            'hot_zones': list(self.hot),
+            'hot_share': round(float(self.counts[self.hot].sum() / total), 4) if total else 0.0,
+            'salt_buckets': self.salt_buckets
+        }
+
+
+def tracker_from_config(processor_config: Dict[str, Any]) -> HotKeyTracker:
+    """Build a hot-key tracker from the processor configuration section."""
+    return HotKeyTracker(
+        num_zones=processor_config['num_zones'],
+        hot_share=processor_config['skew_hot_share'],
+        max_hot_keys=processor_config['skew_max_hot_keys'],
+        salt_buckets=processor_config['skew_salt_buckets']
+    )
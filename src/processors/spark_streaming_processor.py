@@ -1,40 +1,195 @@
 import json
+import time
 import logging
+from contextlib import contextmanager
 from typing import Dict, Any, List
+import numpy as np
+import pandas as pd
+from pyspark import StorageLevel
 from pyspark.sql import SparkSession
 from pyspark.sql.functions import *
 from pyspark.sql.types import *
 from pyspark.streaming import StreamingContext
+from pyspark.streaming.listener import StreamingListener
 from pyspark.streaming.kafka import KafkaUtils
 from src.utils.config import config
+from src.collectors.kafka_producer import TaxiDataProducer
+from src.processors.sketches import sketch_partition, merge_sketches
+from src.processors.od_matrix import ODMatrixWindows
+from src.utils.geo_grid import grid_from_config
+from src.utils.zone_lookup import zone_lookup_from_config
+from src.processors.rate_controller import controller_from_config
+from src.processors.stages import detect_anomalies
+from src.processors.forecasting import forecaster_from_config, forecast_message, ForecastCache
+from src.models.model_store import scorer_from_config
+from src.processors.deduplicator import deduplicator_from_config, event_time
+from src.processors.skew import tracker_from_config
+from src.processors.sinks import fanout_from_config, ParquetSink
+from src.processors.metrics import StageTimer, state_metrics, metrics_buffer_from_config, metrics_server_from_config
 
 logger = logging.getLogger(__name__)
 
+class BatchRateListener(StreamingListener):
+    """
+    Feeds completed batch timings into the adaptive trigger controller.
+    
+    A DStream's batch duration is fixed when its StreamingContext is created
+    and Spark's backpressure sets the ingest rate, so in this engine the
+    controller's interval and batch size are advisory; the listener also
+    keeps the input rate the last batch actually saw.
+    """
+    
+    def __init__(self, controller, batch_duration: float):
+        self.controller = controller
+        self.batch_duration = batch_duration
+        self.input_rate = 0.0
+    
+    def onBatchCompleted(self, batchCompleted):
+        info = batchCompleted.batchInfo()
+        processing_time = (info.processingDelay() or 0) / 1000
+        scheduling_delay = (info.schedulingDelay() or 0) / 1000
+        self.input_rate = info.numRecords() / self.batch_duration
+        
+        # Batches queued behind this one show up as scheduling delay
+        backlog = int(self.controller.throughput * scheduling_delay)
+        metrics = self.controller.update(processing_time, info.numRecords(), backlog)
+        logger.debug(f"Rate controller: {metrics}")
+
+class BatchMetricsListener(StreamingListener):
+    """Records each completed batch's progress, stage timings and state sizes."""
+    
+    def __init__(self, processor):
+        self.processor = processor
+    
+    def onBatchCompleted(self, batchCompleted):
+        info = batchCompleted.batchInfo()
+        processor = self.processor
+        processor.batch_metrics.record(
+            info.numRecords(),
+            (info.processingDelay() or 0) / 1000,
+            processor.spark_config['batch_duration'],
+            processor.stage_timings,
+            processor.operator_state(),
+            scheduling_delay=(info.schedulingDelay() or 0) / 1000
+        )
+
 class SparkStreamingProcessor:
     """Spark Streaming processor for real-time taxi data analysis."""
     
     def __init__(self):
+        started = time.perf_counter()
+        self.startup_timings = {}
+        
         self.spark_config = config.get_spark_config()
+        self.warm_start = self.spark_config['startup_mode'] == 'warm'
         self.kafka_config = config.get_kafka_config()
+        self.processor_config = config.get_processor_config()
+        self.grid_config = config.get_grid_config()
+        
+        # Holt-Winters state for every zone, updated once per window
+        self.forecast_config = config.get_forecast_config()
+        self.forecaster = forecaster_from_config(self.forecast_config, self.processor_config['num_zones'])
+        
+        # Offline-trained model from the versioned store, if one exists
+        self.model_scorer = scorer_from_config(self.forecast_config, self.processor_config['num_zones'])
+        
+        # Latest forecasts for O(1) reads, swapped once per window
+        self.forecast_cache = ForecastCache()
+        
+        # Every output of a batch goes through one fan-out over the cached batch
+        self.producer = TaxiDataProducer()
+        self.sinks = fanout_from_config(self.kafka_config, self.processor_config, self.producer)
+        if self.processor_config['file_sink_path']:
+            self.sinks.register(ParquetSink(
+                'file_trips', f"{self.processor_config['file_sink_path']}/trips"
+            ))
+        
+        # Drops re-published trip_ids before aggregation
+        self.deduplicator = deduplicator_from_config(self.processor_config)
+        
+        # Adapts ingestion rate to the latency target
+        self.controller = controller_from_config(self.processor_config)
+        
+        # Zones whose running trip share makes them worth salting
+        self.hot_keys = tracker_from_config(self.processor_config)
+        
+        # Per-batch progress, stage timings and state sizes, served over HTTP
+        self.batch_metrics = metrics_buffer_from_config(self.processor_config)
+        self.metrics_server = metrics_server_from_config(self.processor_config, self.batch_metrics, self.get_metrics)
+        self.stage_timings = {}
         
         # Initialize Spark session
         self.spark = None
         self.ssc = None
+        self.rate_listener = None
         self._initialize_spark()
+        
+        # Sparse origin-destination matrices per tumbling window
+        self.od_windows = ODMatrixWindows(
+            window_seconds=self.processor_config['od_window_seconds'],
+            max_windows=self.processor_config['od_max_windows']
+        )
+        
+        # Hierarchical grid for binning raw pickup coordinates
+        self.grid = grid_from_config(self.grid_config)
+    
+        # Zone dimension table, broadcast to the executors for map-side joins
+        self.zone_lookup = zone_lookup_from_config(self.processor_config)
+        self.zone_table = None
+    
+        # Run the batch code paths once before the first real batch arrives
+        if self.warm_start:
+            with self._startup_phase('prewarm'):
+                self._prewarm()
+        
+        self.startup_timings['total'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Spark processor startup phases (s): {self.startup_timings}")
+    
+    @contextmanager
+    def _startup_phase(self, phase: str):
+        """Record how long a startup phase takes."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings[phase] = round(time.perf_counter() - started, 3)
     
     def _initialize_spark(self):
         """Initialize Spark session and streaming context."""
         try:
-            self.spark = SparkSession.builder \
+            # max_records caps a whole batch; the Kafka limit is per partition
+            batch_duration = self.spark_config['batch_duration']
+            max_rate = int(self.processor_config['max_records'] // batch_duration) or 1
+            partition_rate = max_rate // max(1, self.processor_config['kafka_partitions']) or 1
+            self.rate_limits = {'initial_rate': max_rate, 'max_rate_per_partition': partition_rate}
+            
+            builder = SparkSession.builder \
                 .appName(self.spark_config['app_name']) \
                 .master(self.spark_config['master']) \
                 .config("spark.sql.adaptive.enabled", "true") \
                 .config("spark.sql.adaptive.coalescePartitions.enabled", "true") \
                 .config("spark.sql.adaptive.skewJoin.enabled", "true") \
-                .getOrCreate()
+                .config("spark.sql.execution.arrow.pyspark.enabled", "true") \
+                .config("spark.sql.execution.arrow.pyspark.fallback.enabled", "true") \
+                .config("spark.streaming.backpressure.enabled", "true") \
+                .config("spark.streaming.backpressure.initialRate", str(max_rate)) \
+                .config("spark.streaming.kafka.maxRatePerPartition", str(partition_rate))
+            
+            if self.warm_start:
+                # No UI server, and shuffles sized for a micro-batch instead
+                # of the 200-partition default
+                builder = builder \
+                    .config("spark.ui.enabled", "false") \
+                    .config("spark.sql.shuffle.partitions", str(self.spark_config['shuffle_partitions']))
+            
+            # getOrCreate hands back the running session (and JVM) if a
+            # previous processor left it alive
+            with self._startup_phase('spark_session'):
+                self.spark = builder.getOrCreate()
             
             # Create streaming context
-            self.ssc = StreamingContext(self.spark.sparkContext, batchDuration=10)
+            with self._startup_phase('streaming_context'):
+                self._create_streaming_context()
             
             logger.info("Spark session and streaming context initialized successfully")
             
@@ -42,6 +197,30 @@ class SparkStreamingProcessor:
             logger.error(f"Failed to initialize Spark: {e}")
             raise
     
+    def _create_streaming_context(self):
+        """Create a streaming context on the current SparkContext."""
+        self.ssc = StreamingContext(self.spark.sparkContext, batchDuration=self.spark_config['batch_duration'])
+        self.rate_listener = BatchRateListener(self.controller, self.spark_config['batch_duration'])
+        self.ssc.addStreamingListener(self.rate_listener)
+        self.ssc.addStreamingListener(BatchMetricsListener(self))
+    
+    def _prewarm(self):
+        """Push a synthetic batch through the aggregation, Arrow and sketch paths."""
+        from src.collectors.mock_data_generator import MockTaxiDataGenerator
+        
+        schema = self.create_taxi_schema()
+        records = MockTaxiDataGenerator().generate_taxi_data(count=self.spark_config['prewarm_records'])
+        rows = [tuple(record.get(field.name) for field in schema.fields) for record in records]
+        
+        # Results are discarded; no processor state is touched
+        df = self.spark.createDataFrame(rows, schema).cache()
+        try:
+            self.aggregate_locations(df).toPandas()
+            self.bin_grid_cells(df)
+            df.rdd.mapPartitions(sketch_partition).reduceByKey(merge_sketches).count()
+        finally:
+            df.unpersist()
+    
     def create_taxi_schema(self) -> StructType:
         """Create schema for taxi data."""
         return StructType([
@@ -73,6 +252,27 @@ class SparkStreamingProcessor:
             StructField("is_rush_hour", BooleanType(), True)
         ])
     
+    def create_zone_schema(self) -> StructType:
+        """Create schema for the zone dimension table."""
+        return StructType([
+            StructField("pickup_location_id", IntegerType(), False),
+            StructField("borough", StringType(), True),
+            StructField("zone_name", StringType(), True),
+            StructField("service_zone", StringType(), True),
+            StructField("zone_latitude", DoubleType(), True),
+            StructField("zone_longitude", DoubleType(), True)
+        ])
+    
+    def zone_dimension(self):
+        """Cached zone dimension DataFrame, rebuilt when the lookup file changes."""
+        if self.zone_lookup.refresh() or (self.zone_table is None and self.zone_lookup.loaded):
+            if self.zone_table is not None:
+                self.zone_table.unpersist()
+            self.zone_table = self.spark.createDataFrame(
+                self.zone_lookup.to_rows(), self.create_zone_schema()
+            ).cache()
+        return self.zone_table
+    
     def process_taxi_stream(self):
         """Process taxi data stream from Kafka."""
         try:
@@ -124,179 +324,296 @@ class SparkStreamingProcessor:
                 if rdd.isEmpty():
                     return
                 
-                # Convert to DataFrame
-                df = self.spark.createDataFrame(rdd, self.create_taxi_schema())
+                # Convert to DataFrame and materialize it once; deduplication
+                # and every output below read the cached batch instead of
+                # re-parsing Kafka
+                timer = StageTimer()
+                parsed = self.spark.createDataFrame(rdd, self.create_taxi_schema()) \
+                    .persist(StorageLevel.MEMORY_AND_DISK)
+                df = None
                 
-                # Aggregate by location
-                location_agg = df.groupBy("pickup_location_id") \
-                    .agg(
-                        count("*").alias("trip_count"),
-                        sum("fare_amount").alias("total_fare"),
-                        avg("fare_amount").alias("avg_fare"),
-                        sum("trip_distance").alias("total_distance"),
-                        avg("trip_distance").alias("avg_distance"),
-                        sum("passenger_count").alias("total_passengers"),
-                        avg("passenger_count").alias("avg_passengers")
-                    )
-                
-                # Convert to JSON and send to aggregated topic
-                aggregated_data = location_agg.toJSON().collect()
-                for record in aggregated_data:
-                    logger.info(f"Aggregated data: {record}")
-                
-                return aggregated_data
+                try:
+                    df = self.deduplicate(parsed).persist(StorageLevel.MEMORY_AND_DISK)
+                    timer.mark('deduplicate')
+                    self.write_batch(df, timer)
+                finally:
+                    if df is not None:
+                        df.unpersist()
+                    parsed.unpersist()
+                    self.stage_timings = timer.stages
             
             # Apply aggregation
             taxi_df_with_schema.foreachRDD(aggregate_by_location)
             
             logger.info("Taxi stream processing started")
-            
+        
         except Exception as e:
             logger.error(f"Error in process_taxi_stream: {e}")
             raise
     
-    def detect_anomalies(self):
-        """Detect anomalies in taxi demand patterns."""
-        try:
-            # Create Kafka stream for aggregated data
-            kafka_stream = KafkaUtils.createDirectStream(
-                self.ssc,
-                [self.kafka_config['topic_aggregated']],
-                {"metadata.broker.list": self.kafka_config['bootstrap_servers']}
+    def write_batch(self, df, timer: StageTimer = None):
+        """
+        Compute every output of a cached micro-batch and fan it out to the sinks.
+        
+        Args:
+            df: Deduplicated, persisted batch DataFrame
+            timer: Stage timer for the batch; Spark evaluates lazily, so each
+                stage's time is that of the driver action that closes it
+        """
+        timer = timer or StageTimer()
+        
+        # Aggregate by location
+        location_agg = self.aggregate_locations(df)
+        
+        # Broadcast hash join: the small zone table is shipped to every
+        # executor, so the aggregates are enriched without a shuffle
+        zones = self.zone_dimension()
+        if zones is not None:
+            location_agg = location_agg.join(broadcast(zones), on="pickup_location_id", how="left")
+        
+        # Zone-to-zone flows, only for pairs that actually occur
+        od_pairs = df.filter(col("pickup_location_id").isNotNull() & col("dropoff_location_id").isNotNull()) \
+            .groupBy("pickup_location_id", "dropoff_location_id") \
+            .agg(
+                count("*").alias("trip_count"),
+                sum("fare_amount").alias("total_fare")
+            ) \
+            .toPandas()
+        
+        # Arrow columns straight into the matrix; tolist() gives plain Python
+        # numbers for the JSON messages built from it
+        od_matrix = self.od_windows.update(
+            od_pairs['pickup_location_id'].tolist(),
+            od_pairs['dropoff_location_id'].tolist(),
+            od_pairs['trip_count'].tolist(),
+            od_pairs['total_fare'].fillna(0.0).tolist()
+        )
+        logger.info(f"OD matrix window {od_matrix.window_start}: {od_matrix.nnz} zone pairs")
+        timer.mark('od_matrix')
+        
+        grid_cells = self.bin_grid_cells(df)
+        timer.mark('grid')
+        
+        # Build mergeable per-zone sketches on the executors and
+        # combine the partition-level partials; these are Python objects,
+        # so unlike the columnar results they come back pickled
+        zone_sketches = df.rdd \
+            .mapPartitions(sketch_partition) \
+            .reduceByKey(merge_sketches) \
+            .collectAsMap()
+        timer.mark('sketches')
+        
+        # Bring the aggregates back as Arrow record batches; the
+        # downstream stages work on the columns directly
+        aggregates = location_agg.toPandas()
+        self.hot_keys.update(aggregates['pickup_location_id'].to_numpy(), aggregates['trip_count'].to_numpy())
+        timer.mark('aggregate')
+        
+        anomalies = self.detect_anomalies(aggregates)
+        timer.mark('anomalies')
+        forecasts = self.calculate_demand_forecast(aggregates)
+        timer.mark('forecast')
+        
+        aggregated_data = []
+        for data in aggregates.to_dict('records'):
+            sketch = zone_sketches.get(data.get('pickup_location_id'))
+            if sketch is not None:
+                data.update(sketch.summary())
+                data['sketches'] = sketch.to_dict()
+            aggregated_data.append(data)
+        
+        timings = self.sinks.write({
+            'trips': df,
+            'aggregates': aggregated_data,
+            'anomalies': anomalies,
+            'forecast': self.publish_forecast(forecasts) if forecasts else None,
+            'od_matrix': od_matrix.to_coo(),
+            'grid_cells': self.grid.to_records(self.binned_cells(grid_cells))
+        })
+        timer.mark('sinks')
+        logger.info(f"Wrote {len(aggregated_data)} location aggregates; sink timings (ms): {timings}")
+    
+    def bin_grid_cells(self, df) -> pd.DataFrame:
+        """Summed trip counts per non-empty grid cell across all configured resolutions."""
+        # Bin pickup coordinates per Arrow batch with vectorized
+        # integer math, then sum the non-empty cells across partitions
+        grid = self.grid
+        resolutions = self.grid_config['resolutions']
+        
+        def bin_arrow_batches(batches):
+            import pyarrow as pa
+            for batch in batches:
+                latitudes = batch.column(0).fill_null(0.0).to_numpy()
+                longitudes = batch.column(1).fill_null(0.0).to_numpy()
+                binned = grid.bin_points(latitudes, longitudes, resolutions)
+                for cells in binned.values():
+                    yield pa.RecordBatch.from_arrays(
+                        [pa.array(cells['cell_ids']), pa.array(cells['counts'])],
+                        names=['cell_id', 'trip_count']
+                    )
+        
+        grid_cells = df.select("pickup_latitude", "pickup_longitude") \
+            .mapInArrow(bin_arrow_batches, "cell_id long, trip_count long") \
+            .groupBy("cell_id") \
+            .agg(sum("trip_count").alias("trip_count")) \
+            .toPandas()
+        logger.info(f"Grid binning: {len(grid_cells)} non-empty cells across resolutions {resolutions}")
+        return grid_cells
+    
+    def aggregate_locations(self, df):
+        """Per-zone aggregates; hot zones are pre-aggregated over salted sub-keys."""
+        hot_zones = self.hot_keys.hot if self.processor_config['skew_mode'] == 'auto' else []
+        if not hot_zones:
+            return df.groupBy("pickup_location_id") \
+                .agg(
+                    count("*").alias("trip_count"),
+                    sum("fare_amount").alias("total_fare"),
+                    avg("fare_amount").alias("avg_fare"),
+                    sum("trip_distance").alias("total_distance"),
+                    avg("trip_distance").alias("avg_distance"),
+                    sum("passenger_count").alias("total_passengers"),
+                    avg("passenger_count").alias("avg_passengers")
+                )
+        
+        # Spread each hot zone over salt_buckets sub-keys so no single task
+        # holds all of its trips; other zones keep salt 0
+        salt = when(
+            col("pickup_location_id").isin(hot_zones),
+            pmod(xxhash64("trip_id"), lit(self.hot_keys.salt_buckets))
+        ).otherwise(lit(0))
+        
+        # Partial sums and non-null counts merge exactly into the averages
+        partials = df.withColumn("salt", salt) \
+            .groupBy("pickup_location_id", "salt") \
+            .agg(
+                count("*").alias("trip_count"),
+                sum("fare_amount").alias("total_fare"),
+                count("fare_amount").alias("fare_count"),
+                sum("trip_distance").alias("total_distance"),
+                count("trip_distance").alias("distance_count"),
+                sum("passenger_count").alias("total_passengers"),
+                count("passenger_count").alias("passenger_records")
             )
-            
-            # Parse JSON messages
-            parsed_stream = kafka_stream.map(lambda x: json.loads(x[1]))
-            
-            def detect_anomalies_in_batch(rdd):
-                if rdd.isEmpty():
-                    return
-                
-                # Convert to list for processing
-                records = rdd.collect()
-                
-                for record in records:
-                    try:
-                        data = json.loads(record) if isinstance(record, str) else record
-                        
-                        # Simple anomaly detection based on trip count
-                        trip_count = data.get('trip_count', 0)
-                        avg_fare = data.get('avg_fare', 0)
-                        
-                        # Define anomaly thresholds
-                        high_demand_threshold = 20  # trips per location
-                        low_demand_threshold = 2    # trips per location
-                        fare_anomaly_threshold = 50  # dollars
-                        
-                        anomalies = []
-                        
-                        if trip_count > high_demand_threshold:
-                            anomalies.append({
-                                'type': 'high_demand',
-                                'location_id': data.get('pickup_location_id'),
-                                'value': trip_count,
-                                'threshold': high_demand_threshold,
-                                'timestamp': time.time()
-                            })
-                        
-                        if trip_count < low_demand_threshold and trip_count > 0:
-                            anomalies.append({
-                                'type': 'low_demand',
-                                'location_id': data.get('pickup_location_id'),
-                                'value': trip_count,
-                                'threshold': low_demand_threshold,
-                                'timestamp': time.time()
-                            })
-                        
-                        if avg_fare > fare_anomaly_threshold:
-                            anomalies.append({
-                                'type': 'high_fare',
-                                'location_id': data.get('pickup_location_id'),
-                                'value': avg_fare,
-                                'threshold': fare_anomaly_threshold,
-                                'timestamp': time.time()
-                            })
-                        
-                        # Log anomalies
-                        for anomaly in anomalies:
-                            logger.warning(f"Anomaly detected: {anomaly}")
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing record for anomaly detection: {e}")
-                        continue
-            
-            # Apply anomaly detection
-            parsed_stream.foreachRDD(detect_anomalies_in_batch)
-            
-            logger.info("Anomaly detection started")
-            
+        
+        return partials.groupBy("pickup_location_id") \
+            .agg(
+                sum("trip_count").alias("trip_count"),
+                sum("total_fare").alias("total_fare"),
+                (sum("total_fare") / sum("fare_count")).alias("avg_fare"),
+                sum("total_distance").alias("total_distance"),
+                (sum("total_distance") / sum("distance_count")).alias("avg_distance"),
+                sum("total_passengers").alias("total_passengers"),
+                (sum("total_passengers") / sum("passenger_records")).alias("avg_passengers")
+            )
+    
+    def deduplicate(self, df):
+        """Drop trips whose trip_id was already seen within the watermark."""
+        # Trips without a trip_id can't be keyed; as in TripDeduplicator.is_new
+        # they pass through rather than collapsing into one row
+        unkeyed = df.filter(col("trip_id").isNull())
+        keyed = df.filter(col("trip_id").isNotNull()).dropDuplicates(["trip_id"])
+        
+        # Only the keys travel to the driver, which holds the bounded state
+        keys = keyed.select("trip_id", "pickup_datetime").toPandas()
+        mask = self.deduplicator.filter_mask(
+            keys['trip_id'].tolist(),
+            [event_time(t) for t in keys['pickup_datetime'].tolist()]
+        )
+        if not all(mask):
+            fresh = self.spark.createDataFrame(keys.loc[mask, ['trip_id']], "trip_id string")
+            logger.info(f"Dropped {mask.count(False)} duplicate or late trips")
+            keyed = keyed.join(broadcast(fresh), on="trip_id", how="left_semi")
+        
+        return keyed.unionByName(unkeyed)
+    
+    def detect_anomalies(self, aggregates: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Detect anomalies in taxi demand patterns from columnar aggregates."""
+        try:
+            return detect_anomalies(aggregates)
         except Exception as e:
             logger.error(f"Error in detect_anomalies: {e}")
-            raise
+            return []
     
-    def calculate_demand_forecast(self):
-        """Calculate demand forecast based on historical patterns."""
+    def calculate_demand_forecast(self, aggregates: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Feed batch demand to the forecaster; return forecasts when a window closes."""
         try:
-            # Create Kafka stream for aggregated data
-            kafka_stream = KafkaUtils.createDirectStream(
-                self.ssc,
-                [self.kafka_config['topic_aggregated']],
-                {"metadata.broker.list": self.kafka_config['bootstrap_servers']}
-            )
-            
-            # Parse JSON messages
-            parsed_stream = kafka_stream.map(lambda x: json.loads(x[1]))
-            
-            def forecast_demand(rdd):
-                if rdd.isEmpty():
-                    return
-                
-                # Convert to list for processing
-                records = rdd.collect()
-                
-                for record in records:
-                    try:
-                        data = json.loads(record) if isinstance(record, str) else record
-                        
-                        # Simple forecasting based on current demand
-                        current_demand = data.get('trip_count', 0)
-                        location_id = data.get('pickup_location_id')
-                        
-                        # Simple forecasting logic (can be enhanced with ML models)
-                        forecast_next_hour = int(current_demand * 1.1)  # 10% increase
-                        forecast_next_2_hours = int(current_demand * 1.2)  # 20% increase
-                        
-                        forecast_data = {
-                            'location_id': location_id,
-                            'current_demand': current_demand,
-                            'forecast_1_hour': forecast_next_hour,
-                            'forecast_2_hours': forecast_next_2_hours,
-                            'confidence': 0.8,
-                            'timestamp': time.time()
-                        }
-                        
-                        logger.info(f"Demand forecast: {forecast_data}")
-                        
-                    except Exception as e:
-                        logger.error(f"Error in demand forecasting: {e}")
-                        continue
-            
-            # Apply forecasting
-            parsed_stream.foreachRDD(forecast_demand)
-            
-            logger.info("Demand forecasting started")
+            if not self.forecaster.observe(aggregates['pickup_location_id'].to_numpy(),
+                                           aggregates['trip_count'].to_numpy()):
+                return []
             
+            forecasts = self.forecaster.to_records()
+            forecasts = self.model_scorer.score_window(
+                self.forecaster.last_window, self.forecaster.window_start, forecasts
+            )
+            logger.info(f"Demand forecast refreshed for {len(forecasts)} locations")
+            return forecasts
         except Exception as e:
             logger.error(f"Error in calculate_demand_forecast: {e}")
-            raise
+            return []
+    
+    def publish_forecast(self, forecasts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Swap a window's forecasts into the cache and return the topic message."""
+        message = forecast_message(forecasts, self.forecaster.window_start)
+        self.forecast_cache.publish(message)
+        return message
+    
+    def binned_cells(self, grid_cells: pd.DataFrame) -> Dict[int, Dict[str, np.ndarray]]:
+        """Split summed grid cells back into per-resolution arrays."""
+        cell_ids = grid_cells['cell_id'].to_numpy(dtype=np.int64)
+        counts = grid_cells['trip_count'].to_numpy(dtype=np.int64)
+        resolutions = self.grid.unpack(cell_ids)[0]
+        return {
+            int(resolution): {'cell_ids': cell_ids[resolutions == resolution], 'counts': counts[resolutions == resolution]}
+            for resolution in np.unique(resolutions)
+        }
+    
+    def operator_state(self) -> Dict[str, Any]:
+        """Sizes of the driver-side operator state."""
+        return state_metrics(
+            self.deduplicator, self.od_windows,
+            hot_zones=len(self.hot_keys.hot)
+        )
+    
+    def batching_metrics(self) -> Dict[str, Any]:
+        """The batch duration and backpressure limits actually in effect."""
+        batch_duration = self.spark_config['batch_duration']
+        partitions = max(1, self.processor_config['kafka_partitions'])
+        return {
+            'batch_duration': batch_duration,
+            'backpressure': True,
+            'initial_rate': self.rate_limits['initial_rate'],
+            'max_rate_per_partition': self.rate_limits['max_rate_per_partition'],
+            'max_records_per_batch': int(self.rate_limits['max_rate_per_partition'] * partitions * batch_duration),
+            'input_rate': round(self.rate_listener.input_rate, 1) if self.rate_listener else 0.0
+        }
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Batching in effect, advisory controller decisions, dedup state, hot zones, sink and startup timings."""
+        return {
+            'batching': self.batching_metrics(),
+            # The interval and batch size the controller would pick; Spark
+            # keeps the batch duration and backpressure limits above
+            'rate_controller': {**self.controller.metrics(), 'advisory': True},
+            'deduplication': self.deduplicator.metrics(),
+            'skew': self.hot_keys.metrics(),
+            'sinks': self.sinks.metrics(),
+            'startup': dict(self.startup_timings)
+        }
     
     def start_streaming(self):
         """Start the Spark streaming context."""
         try:
-            # Start processing streams
+            # A stopped streaming context can't be restarted, but in warm-start
+            # mode its SparkContext is still alive and is reused
+            if self.ssc is None:
+                self._create_streaming_context()
+            
+            if self.metrics_server:
+                self.metrics_server.start()
+            
+            # Start processing streams (anomaly detection and forecasting
+            # run on each aggregated batch)
             self.process_taxi_stream()
-            self.detect_anomalies()
-            self.calculate_demand_forecast()
             
             # Start the streaming context
             logger.info("Starting Spark streaming context...")
@@ -305,20 +622,30 @@ class SparkStreamingProcessor:
             
         except KeyboardInterrupt:
             logger.info("Stopping Spark streaming context...")
-            self.ssc.stop(stopSparkContext=True, stopGraceFully=True)
+            self.stop_streaming()
         except Exception as e:
             logger.error(f"Error in start_streaming: {e}")
-            self.ssc.stop(stopSparkContext=True, stopGraceFully=True)
+            self.stop_streaming()
             raise
     
     def stop_streaming(self):
-        """Stop the Spark streaming context."""
+        """Stop the Spark streaming context (and the session and producer unless warm-starting)."""
+        if self.metrics_server:
+            self.metrics_server.stop()
+        
         if self.ssc:
-            self.ssc.stop(stopSparkContext=True, stopGraceFully=True)
+            self.ssc.stop(stopSparkContext=not self.warm_start, stopGraceFully=True)
+            self.ssc = None
             logger.info("Spark streaming context stopped")
         
-        if self.spark:
+        if self.spark and not self.warm_start:
             self.spark.stop()
+            self.spark = None
             logger.info("Spark session stopped")
 
+        # A warm processor can be started again, and its Kafka sinks write
+        # through this producer; every send already flushes
+        if self.producer and not self.warm_start:
+            self.producer.close()
+
 import time 
\ No newline at end of file
@@ -0,0 +1,50 @@
+import time
+import logging
+from typing import Dict, Any, List, Mapping
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Anomaly thresholds
+HIGH_DEMAND_THRESHOLD = 20  # trips per location
+LOW_DEMAND_THRESHOLD = 2    # trips per location
+FARE_ANOMALY_THRESHOLD = 50  # dollars
+
+
+def detect_anomalies(aggregates: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Detect demand and fare anomalies across all zones of a columnar batch.
+    
+    Args:
+        aggregates: Column mapping (dict of arrays or Arrow-backed DataFrame)
+            with pickup_location_id, trip_count and avg_fare
+    
+    Returns:
+        List of anomaly records
+    """
+    location_ids = np.asarray(aggregates['pickup_location_id'])
+    trip_count = np.asarray(aggregates['trip_count'])
+    avg_fare = np.asarray(aggregates['avg_fare'], dtype=np.float64)
+    now = time.time()
+    
+    checks = [
+        ('high_demand', trip_count, trip_count > HIGH_DEMAND_THRESHOLD, HIGH_DEMAND_THRESHOLD),
+        ('low_demand', trip_count, (trip_count < LOW_DEMAND_THRESHOLD) & (trip_count > 0), LOW_DEMAND_THRESHOLD),
+        ('high_fare', avg_fare, avg_fare > FARE_ANOMALY_THRESHOLD, FARE_ANOMALY_THRESHOLD)
+    ]
+    
+    anomalies = []
+    for anomaly_type, values, mask, threshold in checks:
+        for location_id, value in zip(location_ids[mask].tolist(), values[mask].tolist()):
+            anomalies.append({
+                'type': anomaly_type,
+                'location_id': location_id,
+                'value': value,
+                'threshold': threshold,
+                'timestamp': now
+            })
+    
+    for anomaly in anomalies:
+        logger.warning(f"Anomaly detected: {anomaly}")
+    
+    return anomalies
@@ -14,7 +14,10 @@ class Config:
             'bootstrap_servers': os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092'),
             'topic_taxi_data': os.getenv('KAFKA_TOPIC_TAXI_DATA', 'taxi_data'),
             'topic_aggregated': os.getenv('KAFKA_TOPIC_AGGREGATED', 'taxi_aggregated'),
-            'topic_anomalies': os.getenv('KAFKA_TOPIC_ANOMALIES', 'taxi_anomalies')
+            'topic_anomalies': os.getenv('KAFKA_TOPIC_ANOMALIES', 'taxi_anomalies'),
+            'topic_od_matrix': os.getenv('KAFKA_TOPIC_OD_MATRIX', 'taxi_od_matrix'),
+            'topic_grid': os.getenv('KAFKA_TOPIC_GRID', 'taxi_grid_cells'),
+            'topic_forecasts': os.getenv('KAFKA_TOPIC_FORECASTS', 'taxi_forecasts')
         }
         
         self.nyc_api_config = {
@@ -25,14 +28,75 @@ class Config:
         
         self.spark_config = {
             'master': os.getenv('SPARK_MASTER', 'local[*]'),
-            'app_name': os.getenv('SPARK_APP_NAME', 'TaxiDemandForecasting')
+            'app_name': os.getenv('SPARK_APP_NAME', 'TaxiDemandForecasting'),
+            'batch_duration': float(os.getenv('SPARK_BATCH_DURATION', '10')),
+            'startup_mode': os.getenv('SPARK_STARTUP_MODE', 'standard'),
+            'shuffle_partitions': int(os.getenv('SPARK_SHUFFLE_PARTITIONS', '8')),
+            'prewarm_records': int(os.getenv('SPARK_PREWARM_RECORDS', '200'))
+        }
+        
+        self.processor_config = {
+            'engine': os.getenv('PROCESSOR_ENGINE', 'spark'),
+            'batch_interval': float(os.getenv('PROCESSOR_BATCH_INTERVAL', '1.0')),
+            'max_records': int(os.getenv('PROCESSOR_MAX_RECORDS', '50000')),
+            'kafka_partitions': int(os.getenv('PROCESSOR_KAFKA_PARTITIONS', '1')),
+            'min_records': int(os.getenv('PROCESSOR_MIN_RECORDS', '500')),
+            'min_batch_interval': float(os.getenv('PROCESSOR_MIN_BATCH_INTERVAL', '0.1')),
+            'max_batch_interval': float(os.getenv('PROCESSOR_MAX_BATCH_INTERVAL', '10.0')),
+            'target_latency': float(os.getenv('PROCESSOR_TARGET_LATENCY', '5.0')),
+            'dedup_mode': os.getenv('PROCESSOR_DEDUP_MODE', 'bloom'),
+            'dedup_bucket_seconds': int(os.getenv('PROCESSOR_DEDUP_BUCKET_SECONDS', '300')),
+            'dedup_watermark_seconds': int(os.getenv('PROCESSOR_DEDUP_WATERMARK_SECONDS', '7200')),
+            'dedup_bucket_capacity': int(os.getenv('PROCESSOR_DEDUP_BUCKET_CAPACITY', '100000')),
+            'num_zones': int(os.getenv('PROCESSOR_NUM_ZONES', '266')),
+            'od_window_seconds': int(os.getenv('PROCESSOR_OD_WINDOW_SECONDS', '300')),
+            'od_max_windows': int(os.getenv('PROCESSOR_OD_MAX_WINDOWS', '12')),
+            'skew_mode': os.getenv('PROCESSOR_SKEW_MODE', 'auto'),
+            'skew_hot_share': float(os.getenv('PROCESSOR_SKEW_HOT_SHARE', '0.05')),
+            'skew_max_hot_keys': int(os.getenv('PROCESSOR_SKEW_MAX_HOT_KEYS', '16')),
+            'skew_salt_buckets': int(os.getenv('PROCESSOR_SKEW_SALT_BUCKETS', '8')),
+            'zone_lookup_path': os.getenv('ZONE_LOOKUP_PATH', 'data/taxi_zone_lookup.csv'),
+            'file_sink_path': os.getenv('PROCESSOR_FILE_SINK_PATH', ''),
+            'metrics_host': os.getenv('PROCESSOR_METRICS_HOST', '0.0.0.0'),
+            'metrics_port': int(os.getenv('PROCESSOR_METRICS_PORT', '9108')),
+            'metrics_buffer_size': int(os.getenv('PROCESSOR_METRICS_BUFFER_SIZE', '500'))
+        }
+        
+        self.forecast_config = {
+            'window_seconds': int(os.getenv('FORECAST_WINDOW_SECONDS', '300')),
+            'season_seconds': int(os.getenv('FORECAST_SEASON_SECONDS', '86400')),
+            'horizons_minutes': [int(m) for m in os.getenv('FORECAST_HORIZONS_MINUTES', '60,120').split(',')],
+            'alpha': float(os.getenv('FORECAST_ALPHA', '0.3')),
+            'beta': float(os.getenv('FORECAST_BETA', '0.05')),
+            'gamma': float(os.getenv('FORECAST_GAMMA', '0.1')),
+            'confidence': float(os.getenv('FORECAST_CONFIDENCE', '0.9')),
+            'model_store_path': os.getenv('FORECAST_MODEL_STORE_PATH', 'models'),
+            'model_lags': int(os.getenv('FORECAST_MODEL_LAGS', '6')),
+            'model_check_interval': float(os.getenv('FORECAST_MODEL_CHECK_INTERVAL', '30'))
+        }
+        
+        self.grid_config = {
+            'lat_min': float(os.getenv('GRID_LAT_MIN', '40.49')),
+            'lat_max': float(os.getenv('GRID_LAT_MAX', '40.92')),
+            'lon_min': float(os.getenv('GRID_LON_MIN', '-74.27')),
+            'lon_max': float(os.getenv('GRID_LON_MAX', '-73.68')),
+            'max_resolution': int(os.getenv('GRID_MAX_RESOLUTION', '14')),
+            'resolutions': [int(r) for r in os.getenv('GRID_RESOLUTIONS', '6,8,10').split(',')]
         }
         
         self.dashboard_config = {
             'host': os.getenv('DASHBOARD_HOST', '0.0.0.0'),
             'port': int(os.getenv('DASHBOARD_PORT', '8050')),
             'flask_host': os.getenv('FLASK_HOST', '0.0.0.0'),
-            'flask_port': int(os.getenv('FLASK_PORT', '5000'))
+            'flask_port': int(os.getenv('FLASK_PORT', '5000')),
+            'history_size': int(os.getenv('DASHBOARD_HISTORY_SIZE', '100000')),
+            'anomaly_history_size': int(os.getenv('DASHBOARD_ANOMALY_HISTORY_SIZE', '1000')),
+            'push_interval': float(os.getenv('DASHBOARD_PUSH_INTERVAL', '1.0')),
+            'downsample_method': os.getenv('DASHBOARD_DOWNSAMPLE_METHOD', 'lttb'),
+            'workers': int(os.getenv('DASHBOARD_WORKERS', '4')),
+            'shared_store': os.getenv('DASHBOARD_SHARED_STORE', 'taxi_dashboard'),
+            'shared_meta_bytes': int(os.getenv('DASHBOARD_SHARED_META_BYTES', str(4 << 20))),
+            'poll_max_records': int(os.getenv('DASHBOARD_POLL_MAX_RECORDS', '2000'))
         }
         
         self.logging_config = {
@@ -52,6 +116,18 @@ class Config:
         """Get Spark configuration."""
         return self.spark_config
     
+    def get_processor_config(self) -> Dict[str, Any]:
+        """Get stream processor configuration."""
+        return self.processor_config
+    
+    def get_forecast_config(self) -> Dict[str, Any]:
+        """Get demand forecasting configuration."""
+        return self.forecast_config
+    
+    def get_grid_config(self) -> Dict[str, Any]:
+        """Get geospatial grid configuration."""
+        return self.grid_config
+    
     def get_dashboard_config(self) -> Dict[str, Any]:
         """Get dashboard configuration."""
         return self.dashboard_config
@@ -0,0 +1,144 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Bits reserved for the row and column of a cell inside the packed cell id
+_AXIS_BITS = 24
+_AXIS_MASK = (1 << _AXIS_BITS) - 1
+
+# Above this many cells per resolution, bin with np.unique instead of a
+# dense bincount so memory stays proportional to the number of points
+_DENSE_CELL_LIMIT = 1 << 22
+
+
+class GeoGrid:
+    """Hierarchical square grid over a lat/lon bounding box (quadtree cells)."""
+    
+    def __init__(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float,
+                 max_resolution: int = 14):
+        if max_resolution > _AXIS_BITS:
+            raise ValueError(f"max_resolution must be at most {_AXIS_BITS}")
+        
+        self.lat_min = lat_min
+        self.lat_max = lat_max
+        self.lon_min = lon_min
+        self.lon_max = lon_max
+        self.max_resolution = max_resolution
+        
+        # Resolution r splits each axis into 2**r cells; a cell's parent is
+        # found by shifting its row/column right by one bit
+        self._lat_scale = (1 << max_resolution) / (lat_max - lat_min)
+        self._lon_scale = (1 << max_resolution) / (lon_max - lon_min)
+    
+    def fine_cells(self, latitudes: np.ndarray, longitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Rows/columns at max resolution and the mask of in-bounds points."""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        
+        valid = (
+            (latitudes >= self.lat_min) & (latitudes < self.lat_max) &
+            (longitudes >= self.lon_min) & (longitudes < self.lon_max)
+        )
+        rows = ((latitudes[valid] - self.lat_min) * self._lat_scale).astype(np.int64)
+        cols = ((longitudes[valid] - self.lon_min) * self._lon_scale).astype(np.int64)
+        return rows, cols, valid
+    
+    def bin_points(self, latitudes: np.ndarray, longitudes: np.ndarray,
+                   resolutions: Sequence[int], weights: Optional[np.ndarray] = None) -> Dict[int, Dict[str, np.ndarray]]:
+        """
+        Count points per non-empty cell at each requested resolution.
+        
+        Args:
+            latitudes: Point latitudes
+            longitudes: Point longitudes
+            resolutions: Grid resolutions to emit (0..max_resolution)
+            weights: Optional per-point values to sum per cell (e.g. fares)
+        
+        Returns:
+            Mapping of resolution to 'cell_ids', 'counts' and (if weights
+            were given) 'sums' arrays, holding non-empty cells only
+        """
+        rows, cols, valid = self.fine_cells(latitudes, longitudes)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)[valid]
+        
+        result = {}
+        for resolution in resolutions:
+            shift = self.max_resolution - resolution
+            res_rows = rows >> shift
+            res_cols = cols >> shift
+            side = 1 << resolution
+            
+            if side * side <= _DENSE_CELL_LIMIT:
+                flat = res_rows * side + res_cols
+                counts = np.bincount(flat, minlength=side * side)
+                occupied = np.flatnonzero(counts)
+                binned = {
+                    'cell_ids': self._pack(resolution, occupied // side, occupied % side),
+                    'counts': counts[occupied]
+                }
+                if weights is not None:
+                    binned['sums'] = np.bincount(flat, weights=weights, minlength=side * side)[occupied]
+            else:
+                packed = self._pack(resolution, res_rows, res_cols)
+                cell_ids, inverse, counts = np.unique(packed, return_inverse=True, return_counts=True)
+                binned = {'cell_ids': cell_ids, 'counts': counts}
+                if weights is not None:
+                    binned['sums'] = np.bincount(inverse, weights=weights, minlength=len(cell_ids))
+            
+            result[resolution] = binned
+        
+        return result
+    
+    def cell_centers(self, cell_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitude/longitude centers of packed cell ids."""
+        resolutions, rows, cols = self.unpack(cell_ids)
+        side = (1 << resolutions).astype(np.float64)
+        latitudes = self.lat_min + (rows + 0.5) * (self.lat_max - self.lat_min) / side
+        longitudes = self.lon_min + (cols + 0.5) * (self.lon_max - self.lon_min) / side
+        return latitudes, longitudes
+    
+    def parent(self, cell_ids: np.ndarray, resolution: int) -> np.ndarray:
+        """Ancestor cell ids at a coarser resolution."""
+        resolutions, rows, cols = self.unpack(cell_ids)
+        shift = resolutions - resolution
+        return self._pack(resolution, rows >> shift, cols >> shift)
+    
+    def to_records(self, binned: Dict[int, Dict[str, np.ndarray]]) -> List[Dict[str, Any]]:
+        """Flatten bin_points output into one JSON-ready message per resolution."""
+        messages = []
+        for resolution, cells in binned.items():
+            latitudes, longitudes = self.cell_centers(cells['cell_ids'])
+            message = {
+                'type': 'grid_heatmap',
+                'resolution': resolution,
+                'cell_ids': cells['cell_ids'].tolist(),
+                'trip_counts': cells['counts'].tolist(),
+                'latitudes': np.round(latitudes, 6).tolist(),
+                'longitudes': np.round(longitudes, 6).tolist()
+            }
+            if 'sums' in cells:
+                message['total_fares'] = np.round(cells['sums'], 2).tolist()
+            messages.append(message)
+        return messages
+    
+    @staticmethod
+    def _pack(resolution, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        resolution = np.asarray(resolution, dtype=np.int64)
+        return (resolution << (2 * _AXIS_BITS)) | (rows << _AXIS_BITS) | cols
+    
+    @staticmethod
+    def unpack(cell_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Split packed cell ids into (resolution, row, column) arrays."""
+        cell_ids = np.asarray(cell_ids, dtype=np.int64)
+        return cell_ids >> (2 * _AXIS_BITS), (cell_ids >> _AXIS_BITS) & _AXIS_MASK, cell_ids & _AXIS_MASK
+
+
+def grid_from_config(grid_config: Dict[str, Any]) -> GeoGrid:
+    """Build a GeoGrid from the grid configuration section."""
+    return GeoGrid(
+        lat_min=grid_config['lat_min'],
+        lat_max=grid_config['lat_max'],
+        lon_min=grid_config['lon_min'],
+        lon_max=grid_config['lon_max'],
+        max_resolution=grid_config['max_resolution']
+    )
@@ -0,0 +1,109 @@
+import os
+import csv
+import logging
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# TLC taxi_zone_lookup.csv column -> enriched field; centroid columns are optional
+ZONE_COLUMNS = {
+    'Borough': 'borough',
+    'Zone': 'zone_name',
+    'service_zone': 'service_zone',
+    'latitude': 'zone_latitude',
+    'longitude': 'zone_longitude'
+}
+NUMERIC_FIELDS = {'zone_latitude', 'zone_longitude'}
+
+
+class ZoneLookup:
+    """Zone dimension table keyed by LocationID, reloaded when the file changes."""
+    
+    def __init__(self, path: str, num_zones: int):
+        self.path = path
+        self.num_zones = num_zones
+        self.columns: Dict[str, np.ndarray] = {}
+        self.location_ids: List[int] = []
+        self.mtime: Optional[float] = None
+        self.missing = False
+        self.version = 0
+        self.refresh()
+    
+    @property
+    def loaded(self) -> bool:
+        return bool(self.columns)
+    
+    def refresh(self) -> bool:
+        """Reload the table if the file changed since the last load; return True on reload."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            if not self.missing:
+                logger.warning(f"Zone lookup file {self.path} not found; keeping the current table")
+                self.missing = True
+            return False
+        self.missing = False
+        
+        if mtime == self.mtime:
+            return False
+        
+        try:
+            columns, location_ids = self._load()
+        except Exception as e:
+            logger.error(f"Failed to load zone lookup {self.path}: {e}")
+            return False
+        
+        # Swap the whole table at once so readers never see a partial reload
+        self.columns = columns
+        self.location_ids = location_ids
+        self.mtime = mtime
+        self.version += 1
+        logger.info(f"Loaded zone lookup version {self.version} from {self.path}")
+        return True
+    
+    def _load(self):
+        columns = {field: np.full(self.num_zones, None, dtype=object) for field in ZONE_COLUMNS.values()}
+        location_ids = []
+        with open(self.path, newline='') as f:
+            for row in csv.DictReader(f):
+                location_id = int(row['LocationID'])
+                if not 0 <= location_id < self.num_zones:
+                    continue
+                location_ids.append(location_id)
+                for column, field in ZONE_COLUMNS.items():
+                    value = row.get(column)
+                    if value in (None, ''):
+                        continue
+                    columns[field][location_id] = float(value) if field in NUMERIC_FIELDS else value
+        return columns, location_ids
+    
+    def enrich_columns(self, location_ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """Zone attributes for an array of location IDs, one vectorized take per field."""
+        columns = self.columns
+        if not columns:
+            return {}
+        
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        valid = (location_ids >= 0) & (location_ids < self.num_zones)
+        index = np.where(valid, location_ids, 0)
+        
+        enriched = {}
+        for field, values in columns.items():
+            taken = values[index]
+            taken[~valid] = None
+            enriched[field] = taken
+        return enriched
+    
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """One row per known zone, for building a broadcast table."""
+        columns, location_ids = self.columns, self.location_ids
+        return [
+            {'pickup_location_id': location_id, **{field: values[location_id] for field, values in columns.items()}}
+            for location_id in location_ids
+        ]
+
+
+def zone_lookup_from_config(processor_config: Dict[str, Any]) -> ZoneLookup:
+    """Build a zone lookup from the processor configuration section."""
+    return ZoneLookup(processor_config['zone_lookup_path'], processor_config['num_zones'])
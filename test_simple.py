@@ -7,9 +7,21 @@ Simple test script for Real-Time Taxi Demand Forecasting System
 import sys
 import time
 import logging
+import threading
+import numpy as np
 from src.utils.config import config
 from src.collectors.mock_data_generator import MockTaxiDataGenerator
 from src.dashboard.simple_dashboard import SimpleDashboard
+from src.processors.sketches import ZoneSketch, sketch_partition
+from src.processors.forecasting import OnlineForecastEngine
+from src.processors.metrics import BatchMetricsBuffer
+from src.processors.numpy_stream_processor import trip_columns, aggregate_zones, sketch_zones
+from src.processors.od_matrix import ODMatrix, ODMatrixWindows
+from src.processors.deduplicator import TripDeduplicator
+from src.collectors.nyc_taxi_collector import NYCTaxiCollector
+from src.dashboard.data_store import ColumnarRingBuffer, DashboardStore, StaleSnapshot, DEMAND_FIELDS
+from src.dashboard.downsample import lttb, minmax
+from src.dashboard.shared_store import SharedSnapshotWriter, SharedSnapshotReader
 
 def test_mock_generator():
     """Test mock data generator."""
@@ -109,6 +121,350 @@ def test_mock_data_flow():
         print(f"❌ Mock data flow test failed: {e}")
         return False
 
+def test_zone_sketches():
+    """Test mergeable quantile and distinct-count sketches."""
+    print("🧪 Testing Zone Sketches...")
+    
+    try:
+        generator = MockTaxiDataGenerator()
+        taxi_data = generator.generate_taxi_data(count=200)
+        
+        # Sketch two halves separately, then merge the partials
+        left = dict(sketch_partition(taxi_data[:100]))
+        right = dict(sketch_partition(taxi_data[100:]))
+        for location_id, sketch in right.items():
+            if location_id in left:
+                left[location_id].merge(sketch)
+            else:
+                left[location_id] = sketch
+        
+        total_trips = sum(s.distinct['trip_id'].count() for s in left.values())
+        print(f"✅ Sketched {len(left)} zones, ~{total_trips} distinct trips")
+        
+        location_id, sketch = next(iter(left.items()))
+        restored = ZoneSketch.from_dict(sketch.to_dict())
+        print(f"📊 Zone {location_id} summary: {restored.summary()}")
+        
+        return restored.summary() == sketch.summary() and abs(total_trips - 200) <= 10
+    
+    except Exception as e:
+        print(f"❌ Zone sketch test failed: {e}")
+        return False
+
+def test_demand_forecaster():
+    """Test the per-zone Holt-Winters forecaster."""
+    print("🧪 Testing Demand Forecaster...")
+    
+    try:
+        forecaster = OnlineForecastEngine(num_zones=4, window_seconds=60, season_length=4, horizons=(1, 2))
+        
+        # Zone 1 follows a repeating pattern; zone 3 stays flat
+        pattern = [10, 20, 30, 20]
+        for step in range(40):
+            forecaster.observe([1, 3], [pattern[step % 4], 5], timestamp=step * 60)
+        
+        forecasts = {f['location_id']: f for f in forecaster.to_records()}
+        print(f"📊 Zone 1 forecast: {forecasts[1]['horizons']}")
+        
+        flat = forecasts[3]['horizons'][0]
+        return set(forecasts) == {1, 3} and abs(flat['forecast'] - 5) < 0.5 and flat['lower'] <= flat['upper']
+    
+    except Exception as e:
+        print(f"❌ Demand forecaster test failed: {e}")
+        return False
+
+def test_batch_metrics():
+    """Test the per-batch metrics ring buffer and its summary."""
+    print("🧪 Testing Batch Metrics...")
+    
+    try:
+        buffer = BatchMetricsBuffer(capacity=5)
+        for batch in range(8):
+            buffer.record(1000, 0.5, 1.0, {'aggregate': 100.0, 'sinks': 300.0 + batch}, {'dedup_state_size': batch})
+        
+        summary = buffer.summary()
+        print(f"📊 Summary: {summary}")
+        
+        return (summary['batches'] == 5 and summary['total_batches'] == 8
+                and summary['processed_rows_per_second'] == 2000.0
+                and summary['bottleneck_stage'] == 'sinks'
+                and summary['state']['dedup_state_size'] == 7)
+    
+    except Exception as e:
+        print(f"❌ Batch metrics test failed: {e}")
+        return False
+
+def test_trip_deduplication():
+    """Test collector trip keys keep distinct trips and drop re-fetched ones."""
+    print("🧪 Testing Trip Deduplication...")
+    
+    try:
+        # API-style records without a trip_id, built in the same millisecond
+        raw = [{
+            'pickup_datetime': f"2024-01-15T08:{i // 60 % 60:02d}:{i % 60:02d}",
+            'dropoff_datetime': f"2024-01-15T09:{i // 60 % 60:02d}:{i % 60:02d}",
+            'pulocationid': str(i % 50 + 1),
+            'dolocationid': str(i % 30 + 1),
+            'vendorid': '1',
+            'fare_amount': str(10 + i % 17)
+        } for i in range(1000)]
+        trips = NYCTaxiCollector()._process_raw_data(raw)
+        
+        deduplicator = TripDeduplicator(mode='bloom')
+        first = deduplicator.filter(trips)
+        refetched = deduplicator.filter(NYCTaxiCollector()._process_raw_data(raw[:100]))
+        
+        # Trips with no key at all pass through, every time
+        unkeyed = [dict(trip, trip_id=None) for trip in trips[:20]]
+        passed = deduplicator.filter(unkeyed) + deduplicator.filter(unkeyed)
+        
+        print(f"📊 Kept {len(first)}/1000 distinct, {len(refetched)}/100 re-fetched, {len(passed)}/40 unkeyed")
+        return len(first) == 1000 and not refetched and len(passed) == 40
+    
+    except Exception as e:
+        print(f"❌ Trip deduplication test failed: {e}")
+        return False
+
+def test_od_matrix():
+    """Test OD matrix updates, lookups and COO round trip."""
+    print("🧪 Testing OD Matrix...")
+    
+    try:
+        windows = ODMatrixWindows(window_seconds=300, max_windows=2)
+        matrix = windows.update([1, 1, 2, None, 3], [2, 5, 1, 4, None], [3, 1, 2, 9, 9], [30.0, 12.5, 21.0, 99.0, 99.0],
+                                timestamp=1700000000)
+        windows.update([1], [2], [1], [8.0], timestamp=1700000010)
+        
+        coo = matrix.to_coo()
+        rebuilt = ODMatrix.from_coo(coo)
+        print(f"📊 {matrix.nnz} zone pairs, origins {coo['origins']}")
+        return (matrix.nnz == 3 and matrix.by_origin(1) == {2: (4, 38.0), 5: (1, 12.5)}
+                and matrix.by_destination(1) == {2: (2, 21.0)} and coo['origins'] == [1, 1, 2]
+                and rebuilt.by_origin(1) == matrix.by_origin(1) and windows.latest() is matrix)
+    
+    except Exception as e:
+        print(f"❌ OD matrix test failed: {e}")
+        return False
+
+def test_numpy_aggregation():
+    """Test the NumPy engine's per-zone aggregate on mock data, with missing fares."""
+    print("🧪 Testing NumPy Aggregation...")
+    
+    try:
+        generator = MockTaxiDataGenerator()
+        taxi_data = generator.generate_taxi_data(count=500)
+        for trip in taxi_data[::5]:
+            trip['fare_amount'] = None
+        
+        columns = trip_columns(taxi_data)
+        aggregates = aggregate_zones(columns, num_zones=266)
+        
+        # Reference: per-zone trip counts and averages over the trips that have a fare
+        ok = int(aggregates['trip_count'].sum()) == len(taxi_data)
+        for location_id, count, avg_fare in zip(aggregates['pickup_location_id'].tolist(),
+                                                aggregates['trip_count'].tolist(),
+                                                aggregates['avg_fare'].tolist()):
+            trips = [t for t in taxi_data if t['pickup_location_id'] == location_id]
+            fares = [t['fare_amount'] for t in trips if t['fare_amount'] is not None]
+            expected = sum(fares) / len(fares) if fares else None
+            ok = ok and count == len(trips) and (
+                np.isnan(avg_fare) if expected is None else abs(avg_fare - expected) < 1e-9
+            )
+        
+        # Sketches match the Spark engine's per-partition ones, zone for zone
+        sketches = sketch_zones(taxi_data, columns['pickup_location_id'], num_zones=266)
+        expected_sketches = dict(sketch_partition(taxi_data))
+        ok = ok and sorted(sketches) == aggregates['pickup_location_id'].tolist()
+        ok = ok and all(sketch.summary() == expected_sketches[zone].summary() for zone, sketch in sketches.items())
+        
+        print(f"📊 {len(aggregates['pickup_location_id'])} zones aggregated")
+        return ok
+    
+    except Exception as e:
+        print(f"❌ NumPy aggregation test failed: {e}")
+        return False
+
+def test_ring_buffer():
+    """Test the dashboard's columnar ring buffer across wraparound."""
+    print("🧪 Testing Columnar Ring Buffer...")
+    
+    try:
+        buffer = ColumnarRingBuffer(DEMAND_FIELDS, capacity=4)
+        evicted = None
+        for i in range(7):
+            evicted = buffer.append({'pickup_location_id': i, 'trip_count': i * 10, 'avg_fare': 12.5})
+        
+        recent = buffer.last(3)
+        print(f"📊 Last 3 trip counts: {recent['trip_count'].tolist()}")
+        
+        return (len(buffer) == 4 and evicted['pickup_location_id'] == 2
+                and recent['trip_count'].tolist() == [40, 50, 60]
+                and recent['trip_count'].base is not None
+                and buffer.last()['pickup_location_id'].tolist() == [3, 4, 5, 6])
+    
+    except Exception as e:
+        print(f"❌ Ring buffer test failed: {e}")
+        return False
+
+def test_snapshot_handoff():
+    """Stress concurrent snapshot readers against a high-rate writer."""
+    print("🧪 Testing Snapshot Handoff...")
+    
+    try:
+        store = DashboardStore(history_size=500, anomaly_history_size=50, num_zones=266)
+        stop = threading.Event()
+        torn = []
+        reads = []
+        
+        def reader():
+            count = 0
+            while not stop.is_set():
+                snapshot = store.snapshot
+                counts = snapshot.demand['trip_count']
+                count += 1
+                if len(counts) == 0:
+                    continue
+                # Rows were written with consecutive trip counts, so any mix of
+                # two publishes breaks the sequence or disagrees with the totals
+                if ((np.diff(counts) != 1).any() or counts[-1] != snapshot.demand_total - 1
+                        or len(counts) != min(snapshot.demand_total, 500)
+                        or snapshot.total_trips != counts.sum()):
+                    torn.append(snapshot.demand_total)
+            reads.append(count)
+        
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        
+        for i in range(20000):
+            store.add_demand({'pickup_location_id': i % 50, 'trip_count': i, 'avg_fare': 10.0})
+            if i % 50 == 0:
+                store.publish()
+        store.publish()
+        
+        stop.set()
+        for thread in readers:
+            thread.join()
+        
+        snapshot = store.snapshot
+        try:
+            snapshot.demand['trip_count'][0] = -1
+            writable = True
+        except ValueError:
+            writable = False
+        
+        print(f"📊 {sum(reads)} snapshot reads, {len(torn)} torn")
+        return not torn and not writable and snapshot.demand_total == 20000 and snapshot.active_locations == 50
+    
+    except Exception as e:
+        print(f"❌ Snapshot handoff test failed: {e}")
+        return False
+
+def test_downsampling():
+    """Test LTTB and min/max downsampling keep the shape of a long series."""
+    print("🧪 Testing Downsampling...")
+    
+    try:
+        x = np.arange(100000, dtype=np.float64)
+        y = np.sin(x / 5000) * 100
+        y[42424] = 1000  # one spike that must survive
+        
+        kept = lttb(x, y, 800)
+        decimated = minmax(y, 800)
+        print(f"📊 LTTB kept {len(kept)} points, min/max kept {len(decimated)}")
+        
+        return (len(kept) == 800 and kept[0] == 0 and kept[-1] == len(x) - 1
+                and (np.diff(kept) > 0).all() and 42424 in kept
+                and len(decimated) <= 800 and 42424 in decimated)
+    
+    except Exception as e:
+        print(f"❌ Downsampling test failed: {e}")
+        return False
+
+def test_shared_store():
+    """Test snapshots published to shared memory read back intact in another handle."""
+    print("🧪 Testing Shared Snapshot Store...")
+    
+    writer = None
+    reader = None
+    try:
+        store = DashboardStore(history_size=200, anomaly_history_size=10, num_zones=266)
+        writer = SharedSnapshotWriter('taxi_dashboard_test', capacity=200, num_zones=266, meta_bytes=1 << 16)
+        reader = SharedSnapshotReader('taxi_dashboard_test')
+        
+        for i in range(500):
+            store.add_demand({'pickup_location_id': i % 20, 'trip_count': i, 'avg_fare': 12.5})
+        store.add_anomaly({'location_id': 7, 'type': 'high_demand', 'value': 90, 'threshold': 40})
+        store.set_heatmap([{'location_id': 7, 'latitude': 40.75, 'longitude': -73.99, 'trip_count': 30}])
+        store.publish()
+        writer.write(store.snapshot)
+        
+        local, shared = store.snapshot, reader.snapshot
+        same_demand = all((local.demand[name] == shared.demand[name]).all() for name in DEMAND_FIELDS)
+        print(f"📊 {shared.demand_rows} rows, {shared.total_trips} trips, {shared.anomaly_total} anomalies")
+        passed = (same_demand and shared.demand_rows == 200 and shared.total_trips == local.total_trips
+                  and shared.recent_anomalies[0]['location_id'] == 7 and list(shared.heatmap_geometry.location_ids) == [7]
+                  and shared.versions == local.versions and not reader.refresh())
+        shared.check()
+        
+        # Three more publishes bring the writer back round to the held slot
+        for i in range(3):
+            store.add_demand({'pickup_location_id': 1, 'trip_count': 1000 + i, 'avg_fare': 12.5})
+            store.publish()
+            writer.write(store.snapshot)
+        try:
+            shared.check()
+            detected = False
+        except StaleSnapshot:
+            detected = True
+        latest = reader.snapshot
+        latest.check()
+        
+        print(f"📊 Recycled slot detected: {detected}, latest row {latest.demand['trip_count'][-1]}")
+        passed = passed and detected and latest.demand['trip_count'][-1] == 1002
+        
+        # Views of the segment must be released before it can be closed
+        del shared, latest
+        return passed
+    
+    except Exception as e:
+        print(f"❌ Shared store test failed: {e}")
+        return False
+    
+    finally:
+        if reader is not None:
+            reader.close()
+        if writer is not None:
+            writer.close()
+
+def test_batched_ingest():
+    """Test batched columnar appends match one-at-a-time appends."""
+    print("🧪 Testing Batched Ingest...")
+    
+    try:
+        records = [{'pickup_location_id': i % 30, 'trip_count': i, 'avg_fare': 8.0 + i % 7, 'timestamp': 1700000000 + i}
+                   for i in range(1000)]
+        single = DashboardStore(history_size=300, anomaly_history_size=10, num_zones=266)
+        batched = DashboardStore(history_size=300, anomaly_history_size=10, num_zones=266)
+        
+        for record in records:
+            single.add_demand(record)
+        # Uneven batches, including one larger than the buffer
+        for start, end in [(0, 7), (7, 150), (150, 600), (600, 1000)]:
+            batched.add_demand_batch(records[start:end])
+        single.publish()
+        batched.publish()
+        
+        a, b = single.snapshot, batched.snapshot
+        same = all((a.demand[name] == b.demand[name]).all() for name in DEMAND_FIELDS)
+        print(f"📊 {b.demand_rows} rows retained, {b.total_trips} trips, {b.active_locations} locations")
+        return (same and a.demand_total == b.demand_total == 1000 and a.total_trips == b.total_trips
+                and a.active_locations == b.active_locations and abs(a.avg_fare - b.avg_fare) < 1e-9)
+    
+    except Exception as e:
+        print(f"❌ Batched ingest test failed: {e}")
+        return False
+
 def main():
     """Run all tests."""
     print("🚕 Real-Time Taxi Demand Forecasting System - Simple Test Suite")
@@ -122,6 +478,17 @@ def main():
         ("Mock Data Generator", test_mock_generator),
         ("Dashboard", test_dashboard),
         ("Mock Data Flow", test_mock_data_flow),
+        ("Zone Sketches", test_zone_sketches),
+        ("Demand Forecaster", test_demand_forecaster),
+        ("Batch Metrics", test_batch_metrics),
+        ("Trip Deduplication", test_trip_deduplication),
+        ("OD Matrix", test_od_matrix),
+        ("NumPy Aggregation", test_numpy_aggregation),
+        ("Columnar Ring Buffer", test_ring_buffer),
+        ("Snapshot Handoff", test_snapshot_handoff),
+        ("Downsampling", test_downsampling),
+        ("Shared Snapshot Store", test_shared_store),
+        ("Batched Ingest", test_batched_ingest),
     ]
     
     results = []